@@ -0,0 +1,139 @@
+from fastapi import Depends, FastAPI, Header, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional
+import hmac
+import json
+import uuid
+import os
+
+from sale_core import (
+    KAKAO_VARIANTS, assemble_kakao_variants, llm_error_message, get_random_customer_info,
+    aget_script_response, aget_chatbot_response, aget_kakao_response, astream_kakao_variants,
+    telemetry_metrics,
+)
+
+# 상담 스크립트 / 추가 질문 / 카카오톡 문자 생성을 Streamlit 화면 없이 제공하는 HTTP API (SSE 스트리밍)
+# 실행: uvicorn api_sale:app --host 0.0.0.0 --port 8100 --workers 4
+# - 여러 워커 / 서버로 늘릴 때는 세션 히스토리를 공유하도록 HISTORY_BACKEND=sqlite 를 사용하세요.
+# - 응답 이벤트: token (텍스트 조각) → done (전체 텍스트) / 실패 시 error
+
+# ======================== 설정 ========================
+# 설정하면 X-API-Key 헤더가 일치하는 요청만 허용
+SALE_API_KEY = os.getenv("SALE_API_KEY", "")
+
+app = FastAPI(title="Goodrich sale assistant API")
+
+def check_api_key(x_api_key: Optional[str] = Header(default=None)):
+    # 길이 / 내용에 따라 비교 시간이 달라지지 않도록 상수 시간 비교
+    if SALE_API_KEY and not hmac.compare_digest((x_api_key or "").encode("utf-8"), SALE_API_KEY.encode("utf-8")):
+        raise HTTPException(status_code=401, detail="invalid api key")
+
+# ======================== 요청 형식 ========================
+class CustomerInfo(BaseModel):
+    name: str
+    age_group: str = ""
+    gender: str = ""
+    insurance_status: str = ""
+    interest: str = ""
+    reaction: str = ""
+    etc: str = ""
+
+class ScriptRequest(BaseModel):
+    consultant_name: str = "상담원"
+    customer: CustomerInfo
+    session_id: Optional[str] = None
+    use_cache: bool = True
+
+class ChatRequest(BaseModel):
+    session_id: str
+    message: str = Field(min_length=1)
+    script_context: str = ""
+
+class Message(BaseModel):
+    role: str
+    content: str
+
+class KakaoRequest(BaseModel):
+    session_id: str
+    script_context: str = ""
+    message_list: List[Message] = []
+    # 세 유형을 동시에 생성 (token 이벤트에 유형 번호 index 포함)
+    parallel: bool = False
+
+# ======================== SSE ========================
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def sse_response(events, session_id):
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Session-Id": session_id},
+    )
+
+async def stream_events(async_stream, session_id):
+    # 텍스트 조각을 token 이벤트로 전달하고, 끝나면 전체 텍스트를 done 이벤트로 전달
+    # 클라이언트가 연결을 끊으면 생성도 함께 취소됨
+    chunks = []
+    try:
+        async for chunk in async_stream:
+            chunks.append(chunk)
+            yield sse("token", {"text": chunk})
+    except Exception as e:
+        print("🔥 예외:", e)
+        yield sse("error", {"message": llm_error_message(e, "오류가 발생했습니다."), "type": type(e).__name__})
+        return
+    yield sse("done", {"session_id": session_id, "text": "".join(chunks)})
+
+async def stream_variant_events(async_stream, session_id):
+    texts = [""] * len(KAKAO_VARIANTS)
+    try:
+        async for index, chunk in async_stream:
+            texts[index] += chunk
+            yield sse("token", {"index": index, "text": chunk})
+    except Exception as e:
+        print("🔥 예외:", e)
+        yield sse("error", {"message": llm_error_message(e, "오류가 발생했습니다."), "type": type(e).__name__})
+        return
+    yield sse("done", {"session_id": session_id, "text": assemble_kakao_variants(texts), "variants": texts})
+
+# ======================== API ========================
+@app.post("/v1/script", dependencies=[Depends(check_api_key)])
+async def create_script(request: ScriptRequest):
+    session_id = request.session_id or uuid.uuid4().hex
+    customer = request.customer
+    stream = aget_script_response(
+        customer.name, customer.age_group, customer.gender, customer.insurance_status,
+        customer.interest, customer.reaction, customer.etc,
+        consultant_name=request.consultant_name, session_id=session_id, use_cache=request.use_cache,
+    )
+    return sse_response(stream_events(stream, session_id), session_id)
+
+@app.post("/v1/chat", dependencies=[Depends(check_api_key)])
+async def chat(request: ChatRequest):
+    stream = aget_chatbot_response(request.message, request.script_context, session_id=request.session_id)
+    return sse_response(stream_events(stream, request.session_id), request.session_id)
+
+@app.post("/v1/kakao", dependencies=[Depends(check_api_key)])
+async def kakao(request: KakaoRequest):
+    message_list = [message.model_dump() for message in request.message_list]
+    if request.parallel:
+        stream = astream_kakao_variants(request.script_context, message_list, session_id=request.session_id)
+        return sse_response(stream_variant_events(stream, request.session_id), request.session_id)
+    stream = aget_kakao_response(request.script_context, message_list, session_id=request.session_id)
+    return sse_response(stream_events(stream, request.session_id), request.session_id)
+
+@app.get("/v1/customer-profile", dependencies=[Depends(check_api_key)])
+async def random_customer_profile():
+    # 미리 생성해 둔 프로필 풀에서 꺼냄 (LLM 호출 없이 즉시 응답)
+    return get_random_customer_info()
+
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    # Prometheus 형식의 LLM 호출 지표 (워커별)
+    return telemetry_metrics.render()
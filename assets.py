@@ -0,0 +1,60 @@
+from functools import lru_cache
+import hashlib
+import os
+
+# ======================== 설정 ========================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# 원본 이미지 / 화면용으로 줄인 이미지 (Streamlit 정적 파일 제공: .streamlit/config.toml 의 server.enableStaticServing)
+IMAGE_DIR = os.path.join(BASE_DIR, "image")
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+STATIC_URL = "app/static"
+
+# 화면 표시 너비(px) — 고해상도 화면을 고려해 2배 크기로 줄여서 static/ 에 저장
+IMAGE_DISPLAY_WIDTHS = {
+    "logo.png": 50,
+    "user_avatar.png": 50,
+    "ai_avatar.png": 50,
+    "top_box.png": 1000,
+    "bottom_box.png": 1000,
+}
+IMAGE_SCALE = 2
+
+def image_path(name):
+    return os.path.join(IMAGE_DIR, name)
+
+def static_path(name):
+    return os.path.join(STATIC_DIR, name)
+
+# ======================== 정적 이미지 URL ========================
+@lru_cache(maxsize=None)
+def static_url(name):
+    # 페이지에는 URL 만 넣고 이미지는 브라우저가 따로 받아 캐시 (재실행마다 이미지 데이터를 다시 보내지 않음)
+    # 파일 내용 해시를 v= 로 붙이면 Streamlit(tornado)이 장기 캐시 헤더를 보내고, 이미지가 바뀌면 URL 도 바뀜
+    with open(static_path(name), "rb") as f:
+        version = hashlib.sha1(f.read()).hexdigest()[:12]
+    return f"{STATIC_URL}/{name}?v={version}"
+
+@lru_cache(maxsize=None)
+def avatar_css():
+    # 아바타는 CSS 클래스로 한 번만 정의하고, 메시지마다 이미지 주소를 반복하지 않음
+    return "\n".join(
+        f'.avatar-{role} {{ background-image: url("{static_url(f"{role}_avatar.png")}"); }}'
+        for role in ("user", "ai")
+    )
+
+# ======================== 화면용 이미지 생성 ========================
+def build_static_images():
+    # image/ 의 원본을 화면 표시 크기로 줄여 static/ 에 저장 (원본 이미지를 바꾼 뒤 python assets.py 로 다시 생성)
+    from PIL import Image
+
+    os.makedirs(STATIC_DIR, exist_ok=True)
+    for name, width in IMAGE_DISPLAY_WIDTHS.items():
+        image = Image.open(image_path(name))
+        target = width * IMAGE_SCALE
+        if image.width > target:
+            image = image.resize((target, max(1, round(image.height * target / image.width))), Image.LANCZOS)
+        image.save(static_path(name), format="PNG", optimize=True)
+        print(f"💾 {name}: {os.path.getsize(image_path(name)):,} → {os.path.getsize(static_path(name)):,} bytes")
+
+if __name__ == "__main__":
+    build_static_images()
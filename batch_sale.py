@@ -0,0 +1,203 @@
+# 리드 목록(CSV / JSONL)의 상담 스크립트를 미리 생성해 상담원별 대화 기록으로 저장하는 배치 도구
+# 사용법: python batch_sale.py leads.csv [--concurrency 4] [--checkpoint leads.csv.checkpoint.jsonl] [--history-root /data/sale/history]
+# - 각 행: user_folder(상담원 폴더, 예: 홍길동_1234), name, age_group, gender, insurance_status, interest, reaction, etc
+#   (선택) lead_id — 없으면 행 내용으로 만듦 / consultant_name — 없으면 user_folder 의 이름 부분
+# - 저장 형식은 화면에서 스크립트를 생성했을 때와 같아서 대화 기록 목록에서 바로 불러올 수 있습니다.
+# - 진행 상황을 체크포인트 파일에 기록하므로 중단된 뒤 같은 명령을 다시 실행하면 끝나지 않은 리드만 이어서 처리합니다.
+import argparse
+import asyncio
+import hashlib
+import json
+import csv
+import sys
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from chat_storage import KST, conversation_filename, save_conversation
+from history_catalog import get_catalog
+from sale_core import async_runner, store, aget_script_response, llm_error_message
+
+HISTORY_ROOT = os.getenv("HISTORY_ROOT", "/data/sale/history")
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+
+CUSTOMER_FIELDS = ("name", "age_group", "gender", "insurance_status", "interest", "reaction", "etc")
+
+# ======================== 입력 ========================
+def read_leads(path):
+    if path.endswith(".jsonl"):
+        with open(path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    # 엑셀에서 내려받은 CSV 는 BOM 이 붙어 있는 경우가 많음
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        return list(csv.DictReader(f))
+
+def normalize_lead(row):
+    # 필수 항목(user_folder, name)이 없으면 ValueError
+    lead = {key: str(row.get(key) or "").strip() for key in CUSTOMER_FIELDS + ("user_folder", "consultant_name", "lead_id")}
+    if not lead["user_folder"] or not lead["name"]:
+        raise ValueError("user_folder 와 name 은 필수입니다")
+    if "/" in lead["user_folder"] or lead["user_folder"].startswith("."):
+        raise ValueError(f"잘못된 user_folder: {lead['user_folder']}")
+    lead["consultant_name"] = lead["consultant_name"] or lead["user_folder"].split("_")[0]
+    if not lead["lead_id"]:
+        payload = json.dumps([lead[key] for key in ("user_folder",) + CUSTOMER_FIELDS], ensure_ascii=False)
+        lead["lead_id"] = hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+    return lead
+
+# ======================== 체크포인트 ========================
+class Checkpoint:
+    # 리드별 진행 상태를 JSONL 로 이어 쓰기 (같은 리드는 마지막 기록이 유효)
+    # - started: 저장할 파일명을 먼저 기록 → 중단 후 다시 실행해도 같은 파일에 덮어써서 중복 파일이 생기지 않음
+    # - done: 저장 완료 / error: 실패 (다음 실행에서 다시 시도)
+
+    def __init__(self, path):
+        self.path = path
+        self.states = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # 기록 도중 중단되어 잘린 마지막 줄
+                    self.states[record["lead_id"]] = record
+        self._file = open(path, "a", encoding="utf-8")
+
+    def is_done(self, lead_id):
+        return self.states.get(lead_id, {}).get("status") == "done"
+
+    def filename_for(self, lead_id):
+        return self.states.get(lead_id, {}).get("file")
+
+    def record(self, lead_id, status, **fields):
+        record = {"lead_id": lead_id, "status": status, "ts": time.time(), **fields}
+        self.states[lead_id] = record
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+# ======================== 생성 / 저장 ========================
+class BatchRunner:
+    def __init__(self, checkpoint, history_root=HISTORY_ROOT, concurrency=BATCH_CONCURRENCY, use_cache=True):
+        self.checkpoint = checkpoint
+        self.history_root = history_root
+        self.concurrency = concurrency
+        self.use_cache = use_cache
+        self._reserved = set()
+        self.counts = {"done": 0, "skipped": 0, "error": 0}
+
+    def reserve_filename(self, user_path, customer_name):
+        # 화면과 같은 {고객명}_{yymmdd-HHMMSS} 형식 — 같은 상담원에게 같은 이름의 리드가 같은 초에 몰리면 1초씩 뒤로 미룸
+        now = datetime.now(KST)
+        offset = 0
+        while True:
+            filename = conversation_filename(customer_name, now + timedelta(seconds=offset))
+            path = os.path.join(user_path, filename)
+            if path not in self._reserved and not os.path.exists(path):
+                self._reserved.add(path)
+                return filename
+            offset += 1
+
+    async def generate(self, lead):
+        session_id = f"batch_{uuid.uuid4().hex}"
+        chunks = []
+        try:
+            async for chunk in aget_script_response(
+                *(lead[key] for key in CUSTOMER_FIELDS),
+                consultant_name=lead["consultant_name"],
+                session_id=session_id,
+                use_cache=self.use_cache,
+            ):
+                chunks.append(chunk)
+        finally:
+            store.pop(session_id)  # 배치 세션 히스토리는 다시 쓰지 않음
+        return "".join(chunks)
+
+    def save(self, user_path, filename, lead, script_text):
+        # chatbot_sale.save_current_conversation 과 같은 항목
+        data = {
+            "customer_name": lead["name"],
+            "customer_insurance": lead["insurance_status"],
+            "customer_interest": lead["interest"],
+            "customer_reaction": lead["reaction"],
+            "customer_etc": lead["etc"],
+            "script_context": script_text,
+            "message_list": [{"role": "ai", "content": script_text}],
+        }
+        save_conversation(user_path, filename, data)
+        get_catalog(user_path).upsert(filename, data)
+
+    async def process(self, lead, semaphore):
+        lead_id = lead["lead_id"]
+        if self.checkpoint.is_done(lead_id):
+            self.counts["skipped"] += 1
+            return
+        async with semaphore:
+            user_path = os.path.join(self.history_root, lead["user_folder"])
+            filename = self.checkpoint.filename_for(lead_id) or self.reserve_filename(user_path, lead["name"])
+            self.checkpoint.record(lead_id, "started", user_folder=lead["user_folder"], file=filename)
+            started = time.perf_counter()
+            try:
+                script_text = await self.generate(lead)
+                if not script_text.strip():
+                    raise ValueError("빈 스크립트")
+                await asyncio.to_thread(self.save, user_path, filename, lead, script_text)
+            except Exception as e:
+                self.counts["error"] += 1
+                print(f"🔥 [{lead_id}] {lead['user_folder']} / {lead['name']}: {llm_error_message(e, str(e))}")
+                self.checkpoint.record(lead_id, "error", user_folder=lead["user_folder"], file=filename, error=f"{type(e).__name__}: {e}")
+                return
+            self.counts["done"] += 1
+            self.checkpoint.record(lead_id, "done", user_folder=lead["user_folder"], file=filename)
+            print(f"✅ [{lead_id}] {lead['user_folder']} / {filename} ({time.perf_counter() - started:.1f}s)")
+
+    async def run(self, leads):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        await asyncio.gather(*(self.process(lead, semaphore) for lead in leads))
+        return self.counts
+
+# ======================== 실행 ========================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="리드 목록의 상담 스크립트 일괄 생성")
+    parser.add_argument("input", help="CSV 또는 JSONL 파일")
+    parser.add_argument("--checkpoint", default=None, help="기본값: <input>.checkpoint.jsonl")
+    parser.add_argument("--history-root", default=HISTORY_ROOT)
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    parser.add_argument("--no-cache", action="store_true", help="스크립트 캐시를 사용하지 않고 새로 생성")
+    args = parser.parse_args(argv)
+
+    leads, lead_ids, invalid = [], set(), 0
+    for line_number, row in enumerate(read_leads(args.input), start=1):
+        try:
+            lead = normalize_lead(row)
+        except ValueError as e:
+            invalid += 1
+            print(f"⚠️ {line_number}번째 리드 건너뜀: {e}")
+            continue
+        if lead["lead_id"] in lead_ids:
+            print(f"⚠️ {line_number}번째 리드 건너뜀: 중복된 lead_id {lead['lead_id']}")
+            continue
+        lead_ids.add(lead["lead_id"])
+        leads.append(lead)
+
+    checkpoint = Checkpoint(args.checkpoint or f"{args.input}.checkpoint.jsonl")
+    runner = BatchRunner(checkpoint, args.history_root, max(1, args.concurrency), use_cache=not args.no_cache)
+    started = time.perf_counter()
+    try:
+        # 앱과 같은 공용 이벤트 루프에서 실행 (모델별 동시 호출 제한 공유)
+        counts = async_runner.run(runner.run(leads))
+    finally:
+        checkpoint.close()
+    print(
+        f"📈 완료 {counts['done']} / 이전 실행에서 완료 {counts['skipped']} / 실패 {counts['error']} / 입력 오류 {invalid}"
+        f" — {time.perf_counter() - started:.1f}s"
+    )
+    return 1 if counts["error"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+# 요청당 체인 구성 비용(Python 오버헤드) 측정
+# 요청마다 프롬프트 / RunnableWithMessageHistory 를 새로 만드는 방식과 한 번 만든 체인을 재사용하는 방식을 비교합니다.
+# 실제 API 를 호출하지 않도록 LLM 은 즉시 응답하는 가짜 모델로 바꿔서 측정합니다.
+# 사용법: python benchmarks/bench_chain_overhead.py
+import argparse
+import itertools
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables.history import RunnableWithMessageHistory
+
+import sale_core
+
+# langchain 이 임포트될 때 자체 경고 필터를 추가하므로 다시 적용
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+CONSULTANT_NAME = "김상담"
+CUSTOMER_INFO = sale_core.build_customer_info(
+    "홍길동", "40대", "남성", "10년 전 가입한 실손보험", "비갱신형 암보험", "보험료가 부담됨", "가족력 있음"
+)
+
+def use_fake_llm():
+    fake = GenericFakeChatModel(messages=itertools.repeat(AIMessage(content="상담 스크립트")))
+    sale_core.get_llm = lambda model=sale_core.DEFAULT_MODEL: fake
+    sale_core.get_script_chain.cache_clear()
+    return fake
+
+def build_script_chain_per_request(consultant_name, customer_info):
+    # 변경 전 방식: 요청마다 고객 정보를 문자열로 채워 넣고 체인을 새로 구성
+    dynamic_prompt = (
+        sale_core.SCRIPT_CONTEXT_TEMPLATE
+        .replace("{consultant_name}", consultant_name)
+        .replace("{customer_info}", customer_info)
+    )
+    return RunnableWithMessageHistory(
+        ChatPromptTemplate.from_messages([
+            ("system", sale_core.SCRIPT_SYSTEM_PROMPT),
+            ("system", dynamic_prompt),
+            MessagesPlaceholder("chat_history"),
+            ("human", "{customer_info}")
+        ]) | sale_core.get_llm() | StrOutputParser(),
+        sale_core.get_session_history,
+        input_messages_key="customer_info",
+        history_messages_key="chat_history",
+    )
+
+def measure(func, repeat):
+    start = time.perf_counter()
+    for i in range(repeat):
+        func(i)
+    return (time.perf_counter() - start) / repeat * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=300)
+    args = parser.parse_args()
+    use_fake_llm()
+
+    def build_before(i):
+        build_script_chain_per_request(CONSULTANT_NAME, CUSTOMER_INFO)
+
+    def build_after(i):
+        sale_core.get_script_chain()
+
+    def invoke_before(i):
+        build_script_chain_per_request(CONSULTANT_NAME, CUSTOMER_INFO).invoke(
+            {"customer_info": CUSTOMER_INFO},
+            config={"configurable": {"session_id": f"bench-before-{i}"}}
+        )
+
+    def invoke_after(i):
+        sale_core.get_script_chain().invoke(
+            {"customer_info": CUSTOMER_INFO, "consultant_name": CONSULTANT_NAME},
+            config={"configurable": {"session_id": f"bench-after-{i}"}}
+        )
+
+    # 첫 호출(임포트 / 캐시 준비) 비용은 제외
+    invoke_before(-1)
+    invoke_after(-1)
+
+    print(f"{'':>22}  {'per-request (ms)':>16}  {'reuse (ms)':>10}")
+    print(f"{'chain construction':>22}  {measure(build_before, args.repeat):>16.3f}  {measure(build_after, args.repeat):>10.3f}")
+    print(f"{'invoke (fake LLM)':>22}  {measure(invoke_before, args.repeat):>16.3f}  {measure(invoke_after, args.repeat):>10.3f}")
+
+if __name__ == "__main__":
+    main()
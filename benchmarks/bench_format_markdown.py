@@ -0,0 +1,62 @@
+# 챗봇 화면 재실행(rerun) 시 메시지 렌더링 비용 측정
+# 메시지 수가 늘어날 때 캐시 없이 매번 정리하는 경우와 캐시를 사용하는 경우를 비교합니다.
+# 사용법: python benchmarks/bench_format_markdown.py
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from formatting import format_markdown, format_markdown_cached
+
+SCRIPT = "\n".join(
+    [f"#### {i}. 상담 단계\n고객님, 안녕하세요 😊 오늘 연락드린 이유는요...\n" for i in range(1, 7)]
+    + ["📌 상담 TIP"]
+    + ["▶️ 고객의 걱정을 먼저 공감해 주세요."] * 3
+    + ["- **보장 구성**", "- 암 진단비", "- 표적항암 치료비", "• 중입자 치료비"] * 5
+)
+ANSWER = (
+    "**👉 상담 멘트 예시**\n"
+    "> \"고객님, 보험료가 부담되시는 부분 충분히 이해합니다.\"\n"
+    "- **활용 팁**\n- 고객의 반응을 먼저 확인하세요.\n- 비교 자료를 함께 보여주세요.\n"
+)
+
+def build_messages(count):
+    # 첫 메시지는 긴 스크립트, 이후 질문/답변이 번갈아 쌓인 상담
+    messages = [{"role": "ai", "content": SCRIPT}]
+    for i in range(count - 1):
+        if i % 2 == 0:
+            messages.append({"role": "user", "content": f"고객이 {i}번째로 망설이면 어떻게 말할까요?"})
+        else:
+            messages.append({"role": "ai", "content": ANSWER + f"\n(답변 {i})"})
+    return messages
+
+def rerun(messages, formatter):
+    for message in messages:
+        if message["role"] == "ai":
+            formatter(message["content"])
+
+def measure(messages, formatter, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        rerun(messages, formatter)
+    return (time.perf_counter() - start) / repeat * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--counts", default="10,50,100,200,500")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'messages':>8}  {'uncached ms/rerun':>18}  {'cached ms/rerun':>16}")
+    for count in [int(c) for c in args.counts.split(",")]:
+        messages = build_messages(count)
+        format_markdown_cached.cache_clear()
+        rerun(messages, format_markdown_cached)  # 첫 렌더링으로 캐시 채우기
+        uncached = measure(messages, format_markdown, args.repeat)
+        cached = measure(messages, format_markdown_cached, args.repeat)
+        print(f"{count:>8}  {uncached:>18.3f}  {cached:>16.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# SQLite 세션 히스토리 저장소의 append / read 지연시간 측정
+# 사용법: python benchmarks/bench_history_sqlite.py --sessions 10000 --turns 3
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import AIMessage, HumanMessage
+from history_store import SQLiteHistoryStore
+
+def percentile(values, p):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[index]
+
+def report(label, samples):
+    ms = [s * 1000 for s in samples]
+    print(
+        f"{label:<8} n={len(ms):>7}  "
+        f"mean={statistics.mean(ms):.3f}ms  p50={percentile(ms, 50):.3f}ms  "
+        f"p95={percentile(ms, 95):.3f}ms  p99={percentile(ms, 99):.3f}ms"
+    )
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--reads", type=int, default=5000)
+    parser.add_argument("--db", default=None, help="기본값: 임시 디렉토리")
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(), "bench_history.db")
+    store = SQLiteHistoryStore(path)
+    question = "고객이 보험료가 부담된다고 하면 어떻게 말해야 할까요?"
+    answer = "**👉 상담 멘트 예시**\n> \"고객님, 부담되시는 부분 충분히 이해합니다.\"\n" * 10
+
+    append_samples = []
+    for turn in range(args.turns):
+        for i in range(args.sessions):
+            history = store.get(f"agent_{i}")
+            start = time.perf_counter()
+            history.add_messages([HumanMessage(content=question), AIMessage(content=answer)])
+            append_samples.append(time.perf_counter() - start)
+
+    read_samples = []
+    for _ in range(args.reads):
+        history = store.get(f"agent_{random.randrange(args.sessions)}")
+        start = time.perf_counter()
+        messages = history.messages
+        read_samples.append(time.perf_counter() - start)
+        assert len(messages) == args.turns * 2
+
+    stats = store.stats()
+    print(f"db={path}  sessions={stats['sessions']}  bytes={stats['bytes']:,}")
+    report("append", append_samples)
+    report("read", read_samples)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# 모듈 import 시간 측정 (python -X importtime)
+# 로그인 화면까지 필요한 모듈과, 로그인 이후로 미룬 LLM 모듈(sale_core: langchain / ChatOpenAI)을 새 프로세스에서 불러와
+# 전체 시간과 시간이 많이 걸린 패키지를 출력합니다. 매번 새 인터프리터에서 측정하므로 컨테이너 / 워커 최초 기동 시간에 해당합니다.
+# --output 을 지정하면 같은 내용을 파일로 기록합니다 (benchmarks/import_time_report.txt 에 측정 결과를 보관).
+# 사용법: python benchmarks/bench_import_time.py [--repeat 5] [--top 10] [--output benchmarks/import_time_report.txt]
+import argparse
+import platform
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# chatbot_sale.py 가 로그인 화면을 그리기 전에 불러오는 모듈 / 로그인 이후에 불러오는 모듈
+LOGIN_MODULES = ["streamlit", "formatting", "history_catalog", "chat_storage", "assets", "llm_warmup"]
+# 이전에는 로그인 화면 전에 llm_sale(= sale_core + streamlit), langchain_community, history_store 를 함께 import 했음
+DEFERRED_MODULES = ["sale_core", "langchain_community.chat_message_histories", "history_store"]
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def profile_import(modules):
+    # 새 프로세스에서 modules 를 불러오고 (전체 시간 초, {최상위 패키지: 자체 시간 초}) 반환 — 실패하면 RuntimeError
+    env = {**os.environ, "PYTHONWARNINGS": "ignore"}
+    env.setdefault("OPENAI_API_KEY", "sk-import-time")
+    env.setdefault("LLM_CALL_LOG", "")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + ", ".join(modules)],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        lines = result.stderr.strip().splitlines()
+        raise RuntimeError(lines[-1] if lines else "import 실패")
+
+    total = 0
+    packages = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        if len(indent) == 1:  # import 문이 직접 불러온 모듈 → 누적 시간의 합이 전체 시간
+            total += int(cumulative_us)
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + int(self_us) / 1e6
+    return total / 1e6, packages
+
+def importable(modules):
+    # 이 환경에서 불러올 수 없는 모듈은 제외하고 알림
+    available = []
+    for module in modules:
+        try:
+            profile_import([module])
+            available.append(module)
+        except RuntimeError as e:
+            print(f"⚠️ {module} 제외: {e}")
+    return available
+
+def measure(modules, repeat):
+    runs = [profile_import(modules) for _ in range(repeat)]
+    runs.sort(key=lambda run: run[0])
+    return runs[len(runs) // 2], [total for total, _ in runs]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--output", default="", help="측정 결과를 기록할 파일 경로")
+    args = parser.parse_args()
+
+    lines = []
+    def emit(line=""):
+        print(line)
+        lines.append(line)
+
+    login_modules = importable(LOGIN_MODULES)
+    deferred_modules = importable(DEFERRED_MODULES)
+    excluded = [module for module in LOGIN_MODULES + DEFERRED_MODULES if module not in login_modules + deferred_modules]
+
+    emit(f"python {sys.version.split()[0]} / {platform.platform()} / {args.repeat}회 측정 (중앙값, 최소 - 최대)")
+    if excluded:
+        emit(f"⚠️ 이 환경에서 불러올 수 없어 제외: {', '.join(excluded)} (두 측정 모두에서 빠지므로 차이에는 영향 없음)")
+    (login_total, _), login_totals = measure(login_modules, args.repeat)
+    (full_total, packages), full_totals = measure(login_modules + deferred_modules, args.repeat)
+    emit(f"이전: 로그인 전에 LLM 모듈까지 import  {full_total:7.3f}s  ({min(full_totals):.3f} - {max(full_totals):.3f})  {', '.join(login_modules + deferred_modules)}")
+    emit(f"이후: 로그인 화면까지 import           {login_total:7.3f}s  ({min(login_totals):.3f} - {max(login_totals):.3f})  {', '.join(login_modules)}")
+    emit(f"⚡ 로그인 화면 표시 전에 불러오지 않게 된 시간 {full_total - login_total:.3f}s")
+
+    emit()
+    emit(f"자체 import 시간이 긴 패키지 (전체 import, 상위 {args.top})")
+    for package, seconds in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        emit(f"  {package:<28}{seconds:>8.3f}s")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        print(f"💾 측정 결과 저장: {args.output}")
+
+if __name__ == "__main__":
+    main()
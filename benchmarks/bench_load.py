@@ -0,0 +1,255 @@
+# 오프라인 부하 테스트 — 동시 상담원 수에 따른 처리량 / 응답 시간 / 메모리 측정
+# get_llm() 을 네트워크 없이 동작하는 가짜 스트리밍 모델(첫 토큰 지연, 초당 토큰 수 설정)로 바꾸고,
+# 상담원 N 명이 동시에 스크립트 생성 → 추가 질문 → 카카오톡 문자 → 대화 저장을 수행합니다.
+# LLM 호출은 앱과 같은 공용 이벤트 루프(sale_core.async_runner)와 모델별 동시 호출 제한을 거칩니다.
+# 라운드마다 세션 히스토리 저장소(store) 크기와 프로세스 메모리(RSS)를 출력해 메모리 증가를 확인할 수 있습니다.
+# 사용법: python benchmarks/bench_load.py --agents 50 --rounds 3 --turns 3 --ttft 0.4 --tps 80
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+# 부하 테스트 기록이 운영 호출 기록 / 지표에 섞이지 않도록
+os.environ.setdefault("LLM_CALL_LOG", "")
+os.environ.setdefault("METRICS_PORT", "0")
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from chat_storage import assign_filename, save_conversation
+from history_catalog import get_catalog
+from llm_metrics import percentile
+import sale_core
+
+# langchain 이 임포트될 때 자체 경고 필터를 추가하므로 다시 적용
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+WORDS = (
+    "고객님 안녕하세요 보험 상담 보장 암진단비 실손 비갱신형 납입 기간 보험료 부담 가족력 "
+    "건강검진 리모델링 특약 갱신 만기 환급 설계 추천 비교 안내 확인 가입 청구 혜택"
+).split()
+
+CUSTOMERS = [
+    ("김민수", "40대", "남성", "10년 전 가입한 실손보험", "비갱신형 암보험", "보험료가 부담됨", "가족력 있음"),
+    ("이서연", "30대", "여성", "종신보험 1건", "어린이보험", "설명을 더 듣고 싶어 함", "출산 예정"),
+    ("박지훈", "50대", "남성", "갱신형 건강보험", "간병보험", "갱신 보험료 인상이 걱정됨", "부모님 부양"),
+    ("최유진", "60대", "여성", "가입 보험 없음", "치매보험", "필요성을 잘 모름", "혼자 거주"),
+]
+QUESTIONS = [
+    "고객이 보험료가 비싸다고 하면 어떻게 말해야 하나요?",
+    "기존 실손보험과 중복되는 보장은 없나요?",
+    "가족력에 대해 더 물어보려면 어떤 질문이 좋을까요?",
+    "지금 바로 가입을 권유해도 될까요?",
+]
+
+# ======================== 가짜 스트리밍 모델 ========================
+class FakeStreamingChatModel(BaseChatModel):
+    # 네트워크 없이 응답하는 결정적 가짜 모델
+    # - 첫 토큰까지 first_token_latency 초, 이후 초당 tokens_per_second 개의 토큰을 스트리밍
+    # - 같은 입력에는 항상 같은 응답 (마지막 메시지 내용으로 난수 시드)
+
+    first_token_latency: float = 0.4
+    tokens_per_second: float = 80.0
+    reply_tokens: int = 120
+
+    @property
+    def _llm_type(self):
+        return "fake-streaming"
+
+    def _tokens(self, messages):
+        seed = hashlib.md5(str(messages[-1].content).encode("utf-8")).hexdigest()
+        rng = random.Random(seed)
+        return [rng.choice(WORDS) + " " for _ in range(self.reply_tokens)]
+
+    def _usage(self, messages, tokens):
+        prompt_tokens = sum(len(str(message.content)) for message in messages) // 2
+        return {"input_tokens": prompt_tokens, "output_tokens": len(tokens), "total_tokens": prompt_tokens + len(tokens)}
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens = self._tokens(messages)
+        time.sleep(self.first_token_latency + len(tokens) / self.tokens_per_second)
+        message = AIMessage(content="".join(tokens), usage_metadata=self._usage(messages, tokens))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens = self._tokens(messages)
+        time.sleep(self.first_token_latency)
+        for token in tokens:
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+            time.sleep(1 / self.tokens_per_second)
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages, tokens)))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens = self._tokens(messages)
+        await asyncio.sleep(self.first_token_latency)
+        for token in tokens:
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+            await asyncio.sleep(1 / self.tokens_per_second)
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages, tokens)))
+
+def use_fake_llm(args):
+    fake = FakeStreamingChatModel(
+        first_token_latency=args.ttft,
+        tokens_per_second=args.tps,
+        reply_tokens=args.reply_tokens,
+        callbacks=[sale_core.prompt_cache_tracker, sale_core.latency_tracker],
+    )
+    sale_core.get_llm = lambda model=sale_core.DEFAULT_MODEL: fake
+    for getter in (sale_core.get_script_chain, sale_core.get_chatbot_chain, sale_core.get_kakao_chain, sale_core.get_kakao_variant_chain):
+        getter.cache_clear()
+    return fake
+
+# ======================== 상담 흐름 ========================
+class StepTimer:
+    def __init__(self):
+        self.ttft = {}
+        self.total = {}
+        self.errors = {}
+
+    async def stream(self, step, async_stream):
+        start = time.perf_counter()
+        chunks = []
+        try:
+            async for chunk in async_stream:
+                if not chunks:
+                    self.ttft.setdefault(step, []).append(time.perf_counter() - start)
+                chunks.append(chunk)
+        except Exception:
+            self.errors[step] = self.errors.get(step, 0) + 1
+            raise
+        self.total.setdefault(step, []).append(time.perf_counter() - start)
+        return "".join(chunks)
+
+    async def call(self, step, func, *args):
+        start = time.perf_counter()
+        result = await asyncio.to_thread(func, *args)
+        self.total.setdefault(step, []).append(time.perf_counter() - start)
+        return result
+
+async def run_agent(agent, round_index, args, timer, root):
+    session_id = f"bench-{round_index}-{agent}"
+    name, age_group, gender, insurance_status, interest, reaction, etc = CUSTOMERS[agent % len(CUSTOMERS)]
+    customer_name = f"{name}{agent}"
+
+    script = await timer.stream("script", sale_core.aget_script_response(
+        customer_name, age_group, gender, insurance_status, interest, reaction, etc,
+        consultant_name=f"상담원{agent}", session_id=session_id, use_cache=False,
+    ))
+    message_list = [{"role": "ai", "content": script}]
+
+    for turn in range(args.turns):
+        await asyncio.sleep(args.think_time)
+        question = QUESTIONS[(agent + turn) % len(QUESTIONS)]
+        answer = await timer.stream("chat", sale_core.aget_chatbot_response(question, script, session_id=session_id))
+        message_list += [{"role": "user", "content": question}, {"role": "ai", "content": answer}]
+
+    await asyncio.sleep(args.think_time)
+    if args.kakao_variants:
+        await timer.stream("kakao", (chunk async for _, chunk in sale_core.astream_kakao_variants(script, message_list, session_id=session_id)))
+    else:
+        await timer.stream("kakao", sale_core.aget_kakao_response(script, message_list, session_id=session_id))
+
+    # 화면의 저장 버튼과 같은 경로: 대화 로그 파일 + 목록 / 전문 검색 색인
+    user_path = os.path.join(root, "history", f"agent{agent}")
+    data = {"customer_name": customer_name, "customer_interest": interest, "script_context": script, "message_list": message_list}
+    filename, replaces = assign_filename(None, f"{customer_name}-r{round_index}")
+
+    def save():
+        saved = save_conversation(user_path, filename, data, replaces=replaces)
+        get_catalog(user_path).upsert(saved, data)
+
+    await timer.call("save", save)
+
+async def run_round(round_index, args, timer, root):
+    results = await asyncio.gather(*(run_agent(agent, round_index, args, timer, root) for agent in range(args.agents)), return_exceptions=True)
+    return sum(1 for result in results if isinstance(result, Exception))
+
+# ======================== 결과 출력 ========================
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError):
+        # /proc 가 없으면 최대 RSS (macOS 는 bytes, Linux 는 KB)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+def store_stats():
+    stats = sale_core.store.stats() if hasattr(sale_core.store, "stats") else {"sessions": len(sale_core.store)}
+    return f"sessions {stats.get('sessions', 0)}, {stats.get('bytes', 0) / 1024 / 1024:.1f} MB"
+
+def print_steps(timer):
+    print(f"{'step':<8}{'count':>7}{'err':>5}{'ttft p50':>10}{'p95':>8}{'p99':>8}{'total p50':>11}{'p95':>8}{'p99':>8}")
+    for step in ("script", "chat", "kakao", "save"):
+        ttft, total = timer.ttft.get(step, []), timer.total.get(step, [])
+        ttft_cols = f"{percentile(ttft, 50):>10.2f}{percentile(ttft, 95):>8.2f}{percentile(ttft, 99):>8.2f}" if ttft else f"{'-':>10}{'-':>8}{'-':>8}"
+        print(
+            f"{step:<8}{len(total):>7}{timer.errors.get(step, 0):>5}{ttft_cols}"
+            f"{percentile(total, 50):>11.2f}{percentile(total, 95):>8.2f}{percentile(total, 99):>8.2f}"
+        )
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--agents", type=int, default=20, help="동시 상담원 수")
+    parser.add_argument("--rounds", type=int, default=3, help="상담원 N 명의 상담 흐름을 반복할 횟수")
+    parser.add_argument("--turns", type=int, default=3, help="상담원별 추가 질문 수")
+    parser.add_argument("--think-time", type=float, default=0.0, help="단계 사이 상담원 대기 시간(초)")
+    parser.add_argument("--ttft", type=float, default=0.4, help="가짜 모델 첫 토큰 지연(초)")
+    parser.add_argument("--tps", type=float, default=80.0, help="가짜 모델 초당 토큰 수")
+    parser.add_argument("--reply-tokens", type=int, default=120)
+    parser.add_argument("--kakao-variants", action="store_true", help="카카오톡 문자 3가지 유형 병렬 생성 사용")
+    parser.add_argument("--out", default=None, help="대화 저장 폴더 (기본: 임시 폴더, 종료 시 삭제)")
+    parser.add_argument("--verbose", action="store_true", help="요청별 로그 출력")
+    args = parser.parse_args()
+
+    use_fake_llm(args)
+    root = args.out or tempfile.mkdtemp(prefix="bench_load_")
+    timer = StepTimer()
+    llm_calls = 1 + args.turns + (3 if args.kakao_variants else 1)
+
+    print(f"agents {args.agents} x rounds {args.rounds}, LLM 동시 호출 제한 {sale_core.model_limiter.limit_for(sale_core.DEFAULT_MODEL)}")
+    print(f"시작: RSS {rss_mb():.0f} MB, store {store_stats()}")
+    try:
+        start = time.perf_counter()
+        for round_index in range(args.rounds):
+            round_start = time.perf_counter()
+            with contextlib.ExitStack() as stack:
+                if not args.verbose:
+                    devnull = stack.enter_context(open(os.devnull, "w"))
+                    stack.enter_context(contextlib.redirect_stdout(devnull))
+                failures = sale_core.async_runner.run(run_round(round_index, args, timer, root))
+            elapsed = time.perf_counter() - round_start
+            print(
+                f"round {round_index + 1}: {elapsed:.1f}s, {args.agents / elapsed:.2f} flows/s, "
+                f"{args.agents * llm_calls / elapsed:.1f} LLM calls/s, 실패 {failures}, "
+                f"RSS {rss_mb():.0f} MB, store {store_stats()}"
+            )
+        elapsed = time.perf_counter() - start
+    finally:
+        if args.out is None:
+            shutil.rmtree(root, ignore_errors=True)
+
+    flows = args.agents * args.rounds
+    print(f"\n전체: {flows} flows / {elapsed:.1f}s = {flows / elapsed:.2f} flows/s, {flows * llm_calls / elapsed:.1f} LLM calls/s")
+    print_steps(timer)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# 재시도 / 헤지 요청 / 서킷 브레이커 효과 측정
+# 가짜 OpenAI 서버(fake_openai_server.py)를 같은 프로세스에서 띄우고 오류·지연을 섞어
+# SDK 를 그대로 호출할 때와 ResilientLLM 으로 감쌌을 때의 성공률 / 응답 시간을 비교합니다.
+# 사용법: python benchmarks/bench_resilience.py --requests 100 --concurrency 8 --error-rate 0.2 --slow-rate 0.05 --hedge
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_openai_server import create_server, parse_args as parse_server_args
+from llm_clients import ModelRegistry
+from llm_metrics import LatencyTracker, percentile
+import llm_resilience
+
+MESSAGES = [("system", "당신은 보험 상담을 돕는 AI 어시스턴트입니다."), ("human", "암보험 상담 멘트를 알려주세요.")]
+
+async def run_requests(llm, count, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, failures = [], {}
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                async for _ in llm.astream(MESSAGES, config={"metadata": {"task": "chat"}}):
+                    pass
+                latencies.append(time.perf_counter() - start)
+            except Exception as e:
+                failures[type(e).__name__] = failures.get(type(e).__name__, 0) + 1
+
+    await asyncio.gather(*(one(i) for i in range(count)))
+    return latencies, failures
+
+def report(name, latencies, failures, count, elapsed):
+    print(f"[{name}] 성공 {len(latencies)}/{count} ({len(latencies) / count:.0%}), 소요 {elapsed:.1f}s")
+    if latencies:
+        print(f"  응답 시간 p50 {percentile(latencies, 50):.2f}s / p95 {percentile(latencies, 95):.2f}s / p99 {percentile(latencies, 99):.2f}s")
+    if failures:
+        print(f"  실패: {failures}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--error-rate", type=float, default=0.2)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--slow-delay", type=float, default=3.0)
+    parser.add_argument("--deadline", type=float, default=20.0)
+    parser.add_argument("--hedge", action="store_true")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    server = create_server(parse_server_args([
+        "--port", "0", "--error-rate", str(args.error_rate), "--slow-rate", str(args.slow_rate),
+        "--slow-delay", str(args.slow_delay), "--seed", str(args.seed),
+    ]))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}/v1"
+
+    # 기본값보다 짧게: 헤지 지연 계산에 필요한 기록 수 / 서킷 브레이커 차단 시간
+    llm_resilience.LLM_HEDGE_MIN_SAMPLES = 10
+    latency = LatencyTracker(verbose=False)
+    registry = ModelRegistry(callbacks=[latency], max_retries=0, base_url=base_url, api_key="sk-fake")
+    raw = registry.get("fake-model")
+    breaker = llm_resilience.CircuitBreaker("fake-model", failure_threshold=20, reset_timeout=2)
+    resilient = llm_resilience.ResilientLLM(raw, "fake-model", "chat", deadline=args.deadline, hedge=args.hedge, breaker=breaker, latency=latency)
+
+    async def compare():
+        # 비동기 연결 풀은 이벤트 루프에 묶이므로 한 루프에서 차례로 실행
+        for name, llm in (("SDK 직접 호출", raw), ("ResilientLLM", resilient)):
+            start = time.perf_counter()
+            latencies, failures = await run_requests(llm, args.requests, args.concurrency)
+            report(name, latencies, failures, args.requests, time.perf_counter() - start)
+
+    asyncio.run(compare())
+    print(f"  {llm_resilience.get_resilience_stats()}")
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# OpenAI 호환 가짜 모델 서버 (/v1/chat/completions, 스트리밍 / 일반 응답)
+# 실제 API 없이 재시도 / 헤지 요청 / 서킷 브레이커 / 연결 재사용 / 프롬프트 캐시 집계를 확인할 때 사용합니다.
+# - 응답 지연(첫 토큰, 토큰 간격), 일정 비율의 오류(429 / 503), 느린 응답(헤지 요청 확인용)을 흉내 냄
+# - 같은 system 메시지(정적 지침)가 다시 오면 그 길이만큼을 캐시된 프롬프트 토큰으로 보고
+# 사용법: python benchmarks/fake_openai_server.py --port 8199 --error-rate 0.2 --slow-rate 0.1
+#         OPENAI_BASE_URL=http://127.0.0.1:8199/v1 OPENAI_API_KEY=sk-fake streamlit run chatbot_sale.py
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import threading
+import random
+import json
+import time
+
+REPLY = "안녕하세요, 고객님. 상담을 도와드릴 AI 어시스턴트입니다."
+# JSON 모드 요청(예시 고객 정보 생성)의 응답 — customer_pool.CustomerProfileBatch 스키마를 만족하는 값
+JSON_REPLY = json.dumps({"customers": [
+    {"name": "김민준", "age_group": "40대", "gender": "남성", "insurance_status": "실손보험만 가입",
+     "interest": "비갱신형 암보험", "reaction": "보험료 부담이 걱정됨", "etc": "맞벌이, 자녀 2명"},
+    {"name": "이서연", "age_group": "30대", "gender": "여성", "insurance_status": "회사 단체보험 외에 개인 보험 없음",
+     "interest": "태아보험", "reaction": "출산 전에 준비하고 싶어함", "etc": "임신 20주"},
+]}, ensure_ascii=False)
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    options = None
+    seen_prefixes = set()
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        options = self.options
+        with self.lock:
+            roll = random.random()
+        fail = roll < options.error_rate
+        slow = not fail and roll < options.error_rate + options.slow_rate
+
+        if fail:
+            return self.send_error_json(options.error_status)
+
+        time.sleep(options.first_token_delay + (options.slow_delay if slow else 0))
+        messages = body.get("messages", [])
+        prompt_tokens, cached_tokens = self.prompt_usage(messages)
+        content = options.reply
+        if (body.get("response_format") or {}).get("type") == "json_object":
+            content = options.json_reply
+        pieces = [content[i:i + options.chunk_chars] for i in range(0, len(content), options.chunk_chars)]
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(pieces),
+            "total_tokens": prompt_tokens + len(pieces),
+            "prompt_tokens_details": {"cached_tokens": cached_tokens},
+        }
+        base = {"id": "chatcmpl-fake", "created": int(time.time()), "model": body.get("model", "fake")}
+
+        if not body.get("stream"):
+            time.sleep(options.token_delay * len(pieces))
+            return self.send_json(200, {
+                **base,
+                "object": "chat.completion",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        base["object"] = "chat.completion.chunk"
+        try:
+            for i, piece in enumerate(pieces):
+                if i:
+                    time.sleep(options.token_delay)
+                self.send_event({**base, "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]})
+            self.send_event({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+            if (body.get("stream_options") or {}).get("include_usage"):
+                self.send_event({**base, "choices": [], "usage": usage})
+            self.send_event("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # 헤지 요청에서 진 쪽 / 중단된 요청은 클라이언트가 연결을 끊음
+            self.close_connection = True
+
+    def prompt_usage(self, messages):
+        # 글자 2개를 토큰 1개로 계산 (정확한 값이 아니라 비율 확인용)
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 2
+        prefix = json.dumps(messages[:1], ensure_ascii=False)
+        with self.lock:
+            hit = prefix in self.seen_prefixes
+            self.seen_prefixes.add(prefix)
+        # 공급자 캐시처럼 128 토큰 단위로만 캐시됨
+        cached_tokens = len(prefix) // 2 // 128 * 128 if hit else 0
+        return prompt_tokens, min(cached_tokens, prompt_tokens)
+
+    def send_event(self, obj):
+        data = f"data: {obj if isinstance(obj, str) else json.dumps(obj, ensure_ascii=False)}\n\n".encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def send_json(self, status, obj, headers=None):
+        data = json.dumps(obj, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_error_json(self, status):
+        headers = {"Retry-After": "1"} if status == 429 else None
+        message = "Rate limit reached" if status == 429 else "The server is overloaded"
+        self.send_json(status, {"error": {"message": message, "type": "fake_error", "code": status}}, headers)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8199)
+    parser.add_argument("--reply", default=REPLY)
+    parser.add_argument("--json-reply", default=JSON_REPLY)
+    parser.add_argument("--chunk-chars", type=int, default=4)
+    parser.add_argument("--first-token-delay", type=float, default=0.2)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-delay", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args(argv)
+
+def create_server(options):
+    random.seed(options.seed)
+    handler = type("Handler", (FakeOpenAIHandler,), {"options": options, "seen_prefixes": set(), "lock": threading.Lock()})
+    return ThreadingHTTPServer((options.host, options.port), handler)
+
+def main():
+    options = parse_args()
+    server = create_server(options)
+    print(f"🧪 가짜 OpenAI 서버: http://{options.host}:{server.server_port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# LLM 호출 기록(JSONL, llm_telemetry.CallLogWriter) 요약
+# 작업(task) / 모델별 호출 수, 오류율, 응답 캐시 적중률, 첫 토큰 시간과 전체 응답 시간의 p50 / p95 / p99, 토큰 사용량을 출력합니다.
+# 응답 시간에는 캐시 적중 호출도 포함하고, 토큰 사용량은 실제 LLM 호출 기준입니다.
+# 교체된 파일(llm_calls.jsonl.1 ...)도 함께 읽습니다.
+# 사용법: python benchmarks/report_llm_calls.py [--path /data/sale/metrics/llm_calls.jsonl] [--since-hours 24] [--by-model]
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_metrics import percentile
+from llm_telemetry import LLM_CALL_LOG, call_log_files
+
+def read_records(path, since=None):
+    for file in call_log_files(path):
+        with open(file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if since is None or record.get("ts", 0) >= since:
+                    yield record
+
+def summarize(records, by_model=False):
+    groups = {}
+    for record in records:
+        key = (record["task"], record["model"]) if by_model else (record["task"],)
+        group = groups.setdefault(key, {"ok": 0, "error": 0, "cancelled": 0, "cache_hit": 0, "latency": [], "ttft": [], "prompt": 0, "completion": 0, "cached": 0})
+        group[record["status"]] = group.get(record["status"], 0) + 1
+        if record["status"] != "ok":
+            continue
+        if record.get("cache_hit"):
+            group["cache_hit"] += 1
+        group["latency"].append(record["latency"])
+        if record.get("ttft") is not None:
+            group["ttft"].append(record["ttft"])
+        group["prompt"] += record.get("prompt_tokens") or 0
+        group["completion"] += record.get("completion_tokens") or 0
+        group["cached"] += record.get("cached_tokens") or 0
+    return groups
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--path", default=LLM_CALL_LOG)
+    parser.add_argument("--since-hours", type=float, default=None)
+    parser.add_argument("--by-model", action="store_true")
+    args = parser.parse_args()
+
+    since = time.time() - args.since_hours * 3600 if args.since_hours else None
+    groups = summarize(read_records(args.path, since), by_model=args.by_model)
+    if not groups:
+        print(f"기록이 없습니다: {args.path}")
+        return
+
+    name_width = max(len(" / ".join(key)) for key in groups) + 2
+    print(
+        f"{'task':<{name_width}}{'calls':>7}{'err%':>7}{'cache%':>8}"
+        f"{'ttft p50':>10}{'p95':>8}{'p99':>8}"
+        f"{'total p50':>11}{'p95':>8}{'p99':>8}"
+        f"{'prompt/call':>13}{'out/call':>10}{'cached%':>9}"
+    )
+    for key, group in sorted(groups.items()):
+        calls = group["ok"] + group["error"]
+        llm_calls = max(group["ok"] - group["cache_hit"], 1)
+        print(
+            f"{' / '.join(key):<{name_width}}{calls:>7}{group['error'] / max(calls, 1):>7.1%}{group['cache_hit'] / max(calls, 1):>8.1%}"
+            f"{percentile(group['ttft'], 50):>10.2f}{percentile(group['ttft'], 95):>8.2f}{percentile(group['ttft'], 99):>8.2f}"
+            f"{percentile(group['latency'], 50):>11.2f}{percentile(group['latency'], 95):>8.2f}{percentile(group['latency'], 99):>8.2f}"
+            f"{group['prompt'] / llm_calls:>13.0f}{group['completion'] / llm_calls:>10.0f}"
+            f"{group['cached'] / group['prompt'] if group['prompt'] else 0:>9.1%}"
+        )
+
+if __name__ == "__main__":
+    main()
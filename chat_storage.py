@@ -0,0 +1,310 @@
+from datetime import datetime, timezone, timedelta
+import threading
+import gzip
+import time
+import json
+import zlib
+import os
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# ======================== 설정 ========================
+# 저장 파일 압축 방식: none | gzip | zstd (zstd 는 zstandard 패키지가 있을 때만 사용, 없으면 gzip)
+HISTORY_COMPRESSION = os.getenv("HISTORY_COMPRESSION", "none").lower()
+# AUTOSAVE=1 이면 AI 답변마다 백그라운드로 자동 저장 (대화별로 AUTOSAVE_INTERVAL 초에 최대 한 번 기록)
+AUTOSAVE_ENABLED = os.getenv("AUTOSAVE", "0") == "1"
+AUTOSAVE_INTERVAL = float(os.getenv("AUTOSAVE_INTERVAL", "5"))
+
+LEGACY_SUFFIX = ".json"
+LOG_SUFFIXES = {"none": ".jsonl", "gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}
+LOG_FORMAT_VERSION = 1
+
+KST = timezone(timedelta(hours=9))
+
+def _compression():
+    if HISTORY_COMPRESSION == "zstd" and zstandard is None:
+        return "gzip"
+    return HISTORY_COMPRESSION if HISTORY_COMPRESSION in LOG_SUFFIXES else "none"
+
+def _compression_for(filename):
+    if filename.endswith(LOG_SUFFIXES["gzip"]):
+        return "gzip"
+    if filename.endswith(LOG_SUFFIXES["zstd"]):
+        return "zstd"
+    return "none"
+
+# ======================== 파일명 ========================
+def conversation_filename(customer_name, now=None):
+    # {고객명}_{yymmdd-HHMMSS}.jsonl[.gz|.zst] — 한 번 정해지면 이후 저장에서도 그대로 유지
+    stamp = (now or datetime.now(KST)).strftime("%y%m%d-%H%M%S")
+    return f"{customer_name}_{stamp}{LOG_SUFFIXES[_compression()]}"
+
+def is_log_file(filename):
+    return any(filename.endswith(suffix) for suffix in LOG_SUFFIXES.values())
+
+def is_conversation_file(filename):
+    # 임시 파일(.으로 시작)은 제외
+    return not filename.startswith(".") and (filename.endswith(LEGACY_SUFFIX) or is_log_file(filename))
+
+def strip_suffix(filename):
+    for suffix in sorted(LOG_SUFFIXES.values(), key=len, reverse=True) + [LEGACY_SUFFIX]:
+        if filename.endswith(suffix):
+            return filename[:-len(suffix)]
+    return filename
+
+# ======================== 인코딩 ========================
+def _encode(records, compression):
+    payload = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode("utf-8")
+    if compression == "gzip":
+        return gzip.compress(payload)
+    if compression == "zstd":
+        return zstandard.ZstdCompressor().compress(payload)
+    return payload
+
+def _decompress_frames(raw, new_decompressor, error_types):
+    # 이어 쓴 압축 프레임(gzip member / zstd frame)을 순서대로 풀고, 손상된 프레임을 만나면 그 앞까지만 사용
+    chunks = []
+    while raw:
+        decompressor = new_decompressor()
+        try:
+            chunks.append(decompressor.decompress(raw))
+        except error_types:
+            return b"".join(chunks), False
+        if not decompressor.eof:
+            return b"".join(chunks), False
+        raw = decompressor.unused_data
+    return b"".join(chunks), True
+
+def _read_lines(path):
+    # (줄 목록, 손상 없이 끝까지 읽었는지) — 저장 도중 중단되어 잘린 꼬리는 버리고 앞부분만 사용
+    compression = _compression_for(path)
+    with open(path, "rb") as f:
+        raw = f.read()
+    intact = True
+    if compression == "gzip":
+        raw, intact = _decompress_frames(raw, lambda: zlib.decompressobj(wbits=31), zlib.error)
+    elif compression == "zstd":
+        raw, intact = _decompress_frames(raw, lambda: zstandard.ZstdDecompressor().decompressobj(), zstandard.ZstdError)
+
+    lines = raw.decode("utf-8", errors="replace").split("\n")
+    if lines[-1] != "":
+        intact = False  # 마지막 줄바꿈 전에 끊긴 기록
+    return [line for line in lines[:-1] if line.strip()], intact
+
+# ======================== 읽기 ========================
+def _read_log(path):
+    # (meta, message_list, intact) — meta 기록은 여러 번 추가될 수 있고 마지막 값이 유효
+    lines, intact = _read_lines(path)
+    meta, messages = {}, []
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            intact = False
+            break
+        if record.get("type") == "meta":
+            meta = {key: value for key, value in record.items() if key not in ("type", "version")}
+        elif record.get("type") == "message":
+            messages.append(record["message"])
+    return meta, messages, intact
+
+def load_conversation(path):
+    # 저장된 대화 읽기
+    # - 새 형식(.jsonl 로그): dict (customer_* / script_context / message_list)
+    # - 구버전 .json: 저장된 list / dict 그대로 반환
+    if is_log_file(path):
+        meta, messages, _ = _read_log(path)
+        return {**meta, "message_list": messages}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+# ======================== 저장 ========================
+# 경로별로 마지막으로 기록한 (파일 크기, 메시지 수, meta) — 다음 저장에서 파일을 다시 읽지 않기 위해 사용
+_log_state = {}
+_log_state_lock = threading.Lock()
+
+def _write_atomic(path, records, compression):
+    tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(_encode(records, compression))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def _meta_record(meta):
+    return {"type": "meta", "version": LOG_FORMAT_VERSION, **meta}
+
+def assign_filename(filename, customer_name):
+    # 저장할 로그 파일명과, 이번 저장으로 대체될 구버전 .json 파일명(없으면 None) 반환
+    if filename and is_log_file(filename):
+        return filename, None
+    if filename:
+        # 구버전 파일명({고객명}_{날짜})을 그대로 유지 → 사이드바의 상담 날짜 / 목록 순서가 바뀌지 않음
+        return strip_suffix(filename) + LOG_SUFFIXES[_compression()], filename
+    return conversation_filename(customer_name), None
+
+def save_conversation(user_path, filename, data, replaces=None):
+    # 대화를 로그 파일에 저장하고 (변경될 수 있는) 파일명 반환
+    # - 처음 저장 / 구버전 .json / 손상된 로그: 전체를 임시 파일에 쓴 뒤 os.replace 로 교체
+    # - 기존 로그: 새로 추가된 메시지(및 바뀐 고객 정보)만 이어 쓰기
+    message_list = list(data.get("message_list", []))
+    meta = {key: value for key, value in data.items() if key != "message_list"}
+    os.makedirs(user_path, exist_ok=True)
+
+    filename, legacy_filename = assign_filename(filename, meta.get("customer_name", "고객명미입력"))
+    replaces = replaces or legacy_filename
+    legacy_path = os.path.join(user_path, replaces) if replaces else None
+    path = os.path.join(user_path, filename)
+    compression = _compression_for(filename)
+
+    with _log_state_lock:
+        state = _log_state.get(path)
+        size = os.path.getsize(path) if os.path.exists(path) else None
+        if size is None:
+            state = None
+        elif state is None or state[0] != size:
+            stored_meta, stored_messages, intact = _read_log(path)
+            state = (size, len(stored_messages), stored_meta) if intact else None
+
+        if state is None or len(message_list) < state[1]:
+            _write_atomic(path, [_meta_record(meta)] + [{"type": "message", "message": m} for m in message_list], compression)
+        else:
+            records = [] if state[2] == meta else [_meta_record(meta)]
+            records += [{"type": "message", "message": m} for m in message_list[state[1]:]]
+            if records:
+                with open(path, "ab") as f:
+                    f.write(_encode(records, compression))
+                    f.flush()
+                    os.fsync(f.fileno())
+        _log_state[path] = (os.path.getsize(path), len(message_list), meta)
+
+    if legacy_path and os.path.exists(legacy_path):
+        os.remove(legacy_path)
+    return filename
+
+def forget_conversation(path):
+    with _log_state_lock:
+        _log_state.pop(path, None)
+
+# ======================== 자동 저장 ========================
+class AutosaveWriter:
+    # 대화별 최신 스냅샷만 보관(coalescing)하고 백그라운드 스레드가 디스크에 기록
+    # - 같은 대화는 interval 초에 최대 한 번만 기록하고, 그 사이 요청은 마지막 스냅샷으로 합쳐짐
+    # - schedule() 은 스냅샷만 넘기고 바로 반환하므로 화면 처리가 디스크 I/O 를 기다리지 않음
+    # - flush() 는 대기 중인 저장을 즉시 기록하고 끝날 때까지 기다림 (로그아웃 / 새 상담 / 저장 버튼)
+    # - 기록에 실패한 스냅샷은 버리지 않고 interval 후 다시 시도하며, flush() 는 실패 / 시간 초과를 돌려줌
+
+    def __init__(self, interval=AUTOSAVE_INTERVAL):
+        self.interval = interval
+        self._cond = threading.Condition()
+        self._pending = {}
+        self._last_write = {}
+        self._in_flight = None
+        self._flush_keys = set()
+        self._worker = None
+        self._attempts = 0
+        self._results = {}  # key → (시도 번호, 실패 시 예외 / 성공 시 None)
+        self._counters = {"scheduled": 0, "coalesced": 0, "written": 0, "errors": 0}
+
+    def schedule(self, user_path, filename, data, replaces=None, on_saved=None):
+        # on_saved(filename, data, replaces): 기록 후 색인 갱신 등에 사용 (백그라운드 스레드에서 호출)
+        key = os.path.join(user_path, filename)
+        snapshot = {**data, "message_list": list(data.get("message_list", []))}
+        with self._cond:
+            self._counters["scheduled"] += 1
+            previous = self._pending.get(key)
+            if previous is not None:
+                self._counters["coalesced"] += 1
+                replaces = replaces or previous[3]
+            self._pending[key] = (user_path, filename, snapshot, replaces, on_saved)
+            self._ensure_worker()
+            self._cond.notify_all()
+        return key
+
+    def flush(self, keys=None, timeout=30) -> dict:
+        # keys 가 없으면 대기 중인 모든 대화를 기록
+        # 기록하지 못한 대화의 {key: 예외} 반환 (기록 실패 / 시간 초과 시 TimeoutError) — 빈 dict 면 모두 기록됨
+        with self._cond:
+            targets = set(self._pending) if keys is None else set(keys)
+            if self._in_flight is not None and (keys is None or self._in_flight in targets):
+                targets.add(self._in_flight)
+            first_attempt = self._attempts + 1
+            self._flush_keys |= targets
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: not self._unsaved(targets, first_attempt, include_waiting=True), timeout)
+            self._flush_keys -= targets
+            return self._unsaved(targets, first_attempt)
+
+    def _unsaved(self, targets, first_attempt, include_waiting=False):
+        # flush 이후 시도에서 실패한 대화 (+ 기록을 기다리는 중인 대화)
+        unsaved = {}
+        for key in targets:
+            attempt, error = self._results.get(key, (0, None))
+            if attempt >= first_attempt and error is not None:
+                unsaved[key] = error
+            elif key in self._pending or key == self._in_flight:
+                unsaved[key] = TimeoutError("대화 저장이 제시간에 끝나지 않았습니다")
+        if include_waiting:
+            # 아직 기록 중인 대화만 기다리고, 이미 실패한 대화는 기다리지 않음
+            return {key: error for key, error in unsaved.items() if isinstance(error, TimeoutError)}
+        return unsaved
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {**self._counters, "pending": len(self._pending)}
+
+    # ----------------- 백그라운드 기록 -------------------
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="autosave-writer", daemon=True)
+            self._worker.start()
+
+    def _next_due(self):
+        # (바로 기록할 key, 다음 확인까지 대기 시간)
+        now = time.monotonic()
+        wait = None
+        for key in self._pending:
+            remaining = self._last_write.get(key, float("-inf")) + self.interval - now
+            if key in self._flush_keys or remaining <= 0:
+                return key, None
+            wait = remaining if wait is None else min(wait, remaining)
+        return None, wait
+
+    def _run(self):
+        while True:
+            with self._cond:
+                key, wait = self._next_due()
+                while key is None:
+                    self._cond.wait(wait)
+                    key, wait = self._next_due()
+                user_path, filename, data, replaces, on_saved = self._pending.pop(key)
+                self._in_flight = key
+            try:
+                save_conversation(user_path, filename, data, replaces=replaces)
+                if on_saved is not None:
+                    on_saved(filename, data, replaces)
+                error = None
+            except Exception as e:
+                print("🔥 대화 자동 저장 실패:", filename, e)
+                error = e
+            with self._cond:
+                self._counters["written" if error is None else "errors"] += 1
+                self._attempts += 1
+                self._results[key] = (self._attempts, error)
+                if error is not None:
+                    # 실패한 스냅샷은 interval 후 다시 시도 (그 사이 새 스냅샷이 오면 그쪽을 기록)
+                    # flush 대기 중이어도 바로 재시도하지 않고 실패를 알림 → 저장 버튼이 오류를 표시
+                    if key not in self._pending:
+                        self._pending[key] = (user_path, filename, data, replaces, on_saved)
+                    self._flush_keys.discard(key)
+                self._last_write[key] = time.monotonic()
+                if len(self._last_write) > 10000:
+                    self._last_write.clear()
+                    self._results.clear()
+                self._in_flight = None
+                self._cond.notify_all()
+
+autosave_writer = AutosaveWriter()
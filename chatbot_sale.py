@@ -1,27 +1,39 @@
 import streamlit as st
-from llm_sale import get_chatbot_response, get_script_response, get_kakao_response, get_random_customer_info
-import re
-import os, json
+import os
 from datetime import datetime, timedelta, timezone
 import uuid
-from langchain_community.chat_message_histories import ChatMessageHistory
-from llm_sale import store
+from functools import partial
+from llm_warmup import start_warmup
+from formatting import format_markdown, format_markdown_cached, snippet_markdown
+from history_catalog import get_catalog, HISTORY_PAGE_SIZE, HIGHLIGHT_START, HIGHLIGHT_END
+from chat_storage import load_conversation, forget_conversation, strip_suffix, assign_filename
+from chat_storage import autosave_writer, AUTOSAVE_ENABLED
+from assets import static_url, static_path, avatar_css
 
 # ----------------- 전역 변수 -------------------
 CHATBOT_TYPE = "sale"
+# 이미지는 static/ 폴더에서 제공 (브라우저가 캐시해 재실행마다 다시 받지 않음)
 URLS = {
-    "page_icon":"https://github.com/jssoleey/goodrich-chatbot-sale/blob/main/image/logo.png?raw=true",
-    "top_image": "https://github.com/jssoleey/goodrich-chatbot-sale/blob/main/image/top_box.png?raw=true",
-    "bottom_image": "https://github.com/jssoleey/goodrich-chatbot-sale/blob/main/image/bottom_box.png?raw=true",
-    "logo": "https://github.com/jssoleey/goodrich-chatbot-sale/blob/main/image/logo.png?raw=true",
-    "user_avatar": "https://github.com/jssoleey/goodrich-chatbot-sale/blob/main/image/user_avatar.png?raw=true",
-    "ai_avatar": "https://github.com/jssoleey/goodrich-chatbot-sale/blob/main/image/ai_avatar.png?raw=true"
+    "top_image": static_url("top_box.png"),
+    "bottom_image": static_url("bottom_box.png"),
+    "logo": static_url("logo.png"),
 }
 
+# ----------------- LLM 모듈 -------------------
+# langchain / OpenAI 클라이언트를 불러오는 모듈은 로그인 화면 표시를 늦추지 않도록 처음 필요할 때 import
+# (백그라운드에서 미리 불러왔으면 그대로 사용하고, 불러오는 중이면 끝날 때까지 기다림)
+def llm():
+    import llm_sale
+    return llm_sale
+
+def new_history(message_list):
+    from history_store import history_from_messages
+    return history_from_messages(message_list)
+
 # ----------------- config -------------------
 st.set_page_config( 
     page_title="스마트 컨설팅 매니저",
-    page_icon=URLS["page_icon"]
+    page_icon=static_path("logo.png")
 )
 
 # ----------------- CSS -------------------
@@ -69,6 +81,8 @@ st.markdown(
         height: 50px;
         border-radius: 0%;
         margin: 0 10px;
+        flex-shrink: 0;
+        background-size: 100% 100%;
     }
     .input-box {
         background: #ff9c01;
@@ -145,42 +159,8 @@ st.markdown(
     """,
     unsafe_allow_html=True
 )
-
-# ----------------- 마크다운 자동 정리 함수 -------------------
-def format_markdown(text: str) -> str:
-    lines = text.strip().splitlines()
-    formatted_lines = []
-    indent_next = False
-
-    for line in lines:
-        line = line.strip()
-        if not line:
-            formatted_lines.append("")
-            indent_next = False
-            continue
-
-        if re.match(r"^(▶️|✅|📌|❗|📝|📍)\s*[^:：]+[:：]?", line):
-            title = re.sub(r"[:：]\s*$", "", line.strip())
-            formatted_lines.append(f"**{title}**\n")
-            indent_next = False
-            continue
-
-        if re.match(r"^[-•]\s*\*\*.*\*\*", line):
-            formatted_lines.append(re.sub(r"^[-•]\s*", "- ", line))
-            indent_next = True
-            continue
-
-        if re.match(r"^[-•]\s*", line):
-            if indent_next:
-                formatted_lines.append("    " + re.sub(r"^[-•]\s*", "- ", line))
-            else:
-                formatted_lines.append(re.sub(r"^[-•]\s*", "- ", line))
-            continue
-
-        formatted_lines.append(line)
-        indent_next = False
-
-    return "\n".join(formatted_lines).strip() + "\n"
+# 아바타 이미지 (메시지마다 반복하지 않도록 클래스로 한 번만 정의)
+st.markdown(f"<style>\n{avatar_css()}\n</style>", unsafe_allow_html=True)
 
 # ----------------- 사이드바 설정 -------------------
 def render_sidebar():
@@ -202,12 +182,25 @@ def render_sidebar():
     if not os.path.exists(user_path):
         os.makedirs(user_path)
 
-    history_files = os.listdir(user_path)
-
-    if history_files:
-        search_keyword = st.sidebar.text_input("🔎 고객명으로 검색", placeholder="고객명 입력 후 ENTER", key="search_input")        
-        filtered_files = [f for f in history_files if search_keyword.lower() in f.lower()]
-        selected_chat = st.sidebar.selectbox("📂 저장된 대화 기록", filtered_files)
+    # 👉 색인에서 최근 저장 순으로 조회 (폴더가 외부에서 바뀐 경우에만 다시 스캔)
+    catalog = get_catalog(user_path)
+    catalog.sync()
+
+    if catalog.count():
+        search_keyword = st.sidebar.text_input("🔎 고객명 / 관심 보험 / 고객 반응으로 검색", placeholder="검색어 입력 후 ENTER", key="search_input")        
+        _, total = catalog.search(search_keyword, 0, 1)
+        page_count = max(1, -(-total // HISTORY_PAGE_SIZE))
+        page = 1
+        if page_count > 1:
+            page = st.sidebar.number_input(f"페이지 (전체 {total}건)", min_value=1, max_value=page_count, value=1, step=1)
+        rows, _ = catalog.search(search_keyword, page - 1)
+
+        filtered_files = [row[0] for row in rows]
+        labels = {
+            filename: f"{name or filename.split('_')[0]} · {interest[:15] or '관심 보험 없음'} · {datetime.fromtimestamp(saved_at, KST).strftime('%y.%m.%d %H:%M')}"
+            for filename, name, interest, saved_at in rows
+        }
+        selected_chat = st.sidebar.selectbox("📂 저장된 대화 기록", filtered_files, format_func=lambda f: labels.get(f, f))
 
         col1, col2 = st.sidebar.columns(2)
 
@@ -225,6 +218,23 @@ def render_sidebar():
                 "<div style='padding:6px; background-color:#f0f0f0; border-radius:5px;'>🔍 검색 결과가 없습니다.</div>",
                 unsafe_allow_html=True
             )
+
+        # 👉 상담 내용(스크립트 / 대화 / 고객 정보) 전문 검색 → 관련도 순 결과
+        content_query = st.sidebar.text_input("📜 상담 내용으로 검색", placeholder="예: 중입자 치료비", key="content_search_input")
+        if content_query.strip():
+            results = catalog.fulltext.search(content_query, user_folder=catalog.user_folder)
+            if results:
+                for i, (filename, name, snippet) in enumerate(results):
+                    # 저장된 상담 원문은 이스케이프해서 표시 (검색어 강조만 굵게)
+                    snippet = snippet_markdown(snippet, HIGHLIGHT_START, HIGHLIGHT_END)
+                    st.sidebar.markdown(f"**{snippet_markdown(name, HIGHLIGHT_START, HIGHLIGHT_END)}** · {strip_suffix(filename).rsplit('_', 1)[-1]}  \n{snippet}")
+                    if st.sidebar.button("불러오기", key=f"content_load_{i}_{filename}", use_container_width=True):
+                        load_chat_history(user_path, filename)
+            else:
+                st.sidebar.markdown(
+                    "<div style='padding:6px; background-color:#f0f0f0; border-radius:5px;'>🔍 검색 결과가 없습니다.</div>",
+                    unsafe_allow_html=True
+                )
     else:
         st.sidebar.info("저장된 대화가 없습니다.")
 
@@ -234,39 +244,34 @@ def render_sidebar():
         reset_session_for_new_case()
 
     if st.sidebar.button("로그아웃", use_container_width=True):
+        flush_autosave()
         st.session_state.page = "login"
         st.session_state.message_list = []
         st.experimental_rerun()
             
 # ----------------- 대화 불러오기 -------------------        
 def load_chat_history(user_path, selected_chat):
-    with open(f"{user_path}/{selected_chat}", "r", encoding="utf-8") as f:
-        loaded_data = json.load(f)
-        if isinstance(loaded_data, list):
-            st.session_state['script_context'] = ""
-            st.session_state.message_list = loaded_data
-            st.session_state['customer_name'] = "고객명미입력"
-        elif isinstance(loaded_data, dict):
-            st.session_state['script_context'] = loaded_data.get("script_context", "")
-            st.session_state.message_list = loaded_data.get("message_list", [])
-            st.session_state['customer_name'] = loaded_data.get("customer_name", selected_chat.split('_')[0])
-            st.session_state['customer_insurance'] = loaded_data.get("customer_insurance", "정보 없음")
-            st.session_state['customer_interest'] = loaded_data.get("customer_interest", "정보 없음")
-            st.session_state['customer_reaction'] = loaded_data.get("customer_reaction", "정보 없음")
-            st.session_state['customer_etc'] = loaded_data.get("customer_etc", "없음")
-        else:
-            st.error("❌ 불러온 파일 형식이 잘못되었습니다.")
-            st.stop()
-
-    # ⭐ chat_history 복원
-    chat_history = ChatMessageHistory()
-    for msg in st.session_state.message_list:
-        if isinstance(msg, dict) and 'role' in msg and 'content' in msg:
-            if msg['role'] == 'user':
-                chat_history.add_user_message(msg['content'])
-            elif msg['role'] == 'ai':
-                chat_history.add_ai_message(msg['content'])
-    store[st.session_state.session_id] = chat_history
+    # 새 로그 형식(.jsonl)과 구버전 list / dict 형식(.json) 모두 지원
+    loaded_data = load_conversation(f"{user_path}/{selected_chat}")
+    if isinstance(loaded_data, list):
+        st.session_state['script_context'] = ""
+        st.session_state.message_list = loaded_data
+        st.session_state['customer_name'] = "고객명미입력"
+    elif isinstance(loaded_data, dict):
+        st.session_state['script_context'] = loaded_data.get("script_context", "")
+        st.session_state.message_list = loaded_data.get("message_list", [])
+        st.session_state['customer_name'] = loaded_data.get("customer_name", selected_chat.split('_')[0])
+        st.session_state['customer_insurance'] = loaded_data.get("customer_insurance", "정보 없음")
+        st.session_state['customer_interest'] = loaded_data.get("customer_interest", "정보 없음")
+        st.session_state['customer_reaction'] = loaded_data.get("customer_reaction", "정보 없음")
+        st.session_state['customer_etc'] = loaded_data.get("customer_etc", "없음")
+    else:
+        st.error("❌ 불러온 파일 형식이 잘못되었습니다.")
+        st.stop()
+
+    # ⭐ chat_history 복원 (메모리에서 제거된 뒤에는 저장 파일에서 다시 복원)
+    llm().store[st.session_state.session_id] = new_history(st.session_state.message_list)
+    llm().store.register_source(st.session_state.session_id, f"{user_path}/{selected_chat}")
 
     st.session_state['current_file'] = selected_chat
     st.session_state.page = "chatbot"
@@ -277,7 +282,10 @@ def delete_chat_history(user_path, selected_chat):
     file_path = f"{user_path}/{selected_chat}"
     if os.path.exists(file_path):
         try:
+            autosave_writer.flush([file_path])  # 대기 중인 자동 저장이 삭제 후 파일을 다시 만들지 않도록
             os.remove(file_path)
+            forget_conversation(file_path)
+            get_catalog(user_path).remove(selected_chat)
             st.sidebar.success(f"{selected_chat} 삭제 완료!")
             st.experimental_rerun()
         except Exception as e:
@@ -285,8 +293,49 @@ def delete_chat_history(user_path, selected_chat):
     else:
         st.sidebar.warning("이미 삭제된 파일입니다.")
 
+# ----------------- 대화 저장 -------------------
+def save_current_conversation(wait=False):
+    # 현재 대화를 백그라운드 저장 대기열에 넣고 (파일명, 오류) 반환
+    # wait=True 면 기록이 끝날 때까지 기다리고, 기록 실패 / 시간 초과 시 오류(예외)를 함께 반환 (실패한 내용은 다시 시도)
+    if not st.session_state.get('message_list'):
+        return None, None
+    user_path = f"/data/{CHATBOT_TYPE}/history/{st.session_state['user_folder']}"
+    customer_name = st.session_state.get('customer_name') or '고객명미입력'
+    data_to_save = {
+        "customer_name": customer_name,
+        "customer_insurance": st.session_state.get('customer_insurance', ''),
+        "customer_interest": st.session_state.get('customer_interest', ''),
+        "customer_reaction": st.session_state.get('customer_reaction', ''),
+        "customer_etc": st.session_state.get('customer_etc', ''),
+        "script_context": st.session_state.get('script_context', ''),
+        "message_list": st.session_state.message_list
+    }
+
+    # 파일명은 예약 시점에 확정 → 기록 전에 다시 저장해도 같은 파일로 합쳐짐
+    filename, replaces = assign_filename(st.session_state.get('current_file'), customer_name)
+    key = autosave_writer.schedule(user_path, filename, data_to_save, replaces=replaces, on_saved=partial(update_catalog_after_save, user_path))
+    st.session_state['current_file'] = filename
+    llm().store.register_source(st.session_state.session_id, f"{user_path}/{filename}")
+    if wait:
+        return filename, autosave_writer.flush([key]).get(key)
+    return filename, None
+
+def update_catalog_after_save(user_path, filename, data, replaces):
+    # 저장 스레드에서 호출: 사이드바 목록 / 전문 검색 색인 갱신
+    catalog = get_catalog(user_path)
+    if replaces:
+        catalog.remove(replaces)
+    catalog.upsert(filename, data)
+
+def flush_autosave():
+    # 대기 중인 현재 대화 저장을 즉시 기록
+    if st.session_state.get('current_file') and st.session_state.get('user_folder'):
+        user_path = f"/data/{CHATBOT_TYPE}/history/{st.session_state['user_folder']}"
+        autosave_writer.flush([os.path.join(user_path, st.session_state['current_file'])])
+
 # ----------------- 세션 초기화 -------------------        
 def reset_session_for_new_case():
+    flush_autosave()
     st.session_state.page = "input"
     st.session_state.message_list = []
     st.session_state.script_context = ""
@@ -303,15 +352,15 @@ def reset_session_for_new_case():
     st.session_state['reaction_input'] = ''
     st.session_state['etc_input'] = ''
     
-    store[st.session_state.session_id] = ChatMessageHistory()
+    llm().store[st.session_state.session_id] = new_history([])
     st.experimental_rerun()
     
 # ----------------- 메시지 표시 함수 -------------------
-def display_message(role, content, avatar_url):
+def display_message(role, content):
     if role == "user":
         alignment = "user"
         message_class = "user-message"
-        avatar_html = f'<img src="{avatar_url}" class="avatar">'
+        avatar_html = '<div class="avatar avatar-user"></div>'
         message_html = f'<div class="{message_class}">{content}</div>'
         display_html = f"""
         <div class="message-container {alignment}">
@@ -323,15 +372,41 @@ def display_message(role, content, avatar_url):
     else:
         alignment = "ai"
         message_class = "ai-message"
-        avatar_html = f'<img src="{avatar_url}" class="avatar">'
+        avatar_html = '<div class="avatar avatar-ai"></div>'
         display_html = f"""
         <div class="message-container {alignment}">
             {avatar_html}
             <div class="{message_class}">
         """
         st.markdown(display_html, unsafe_allow_html=True)
-        st.markdown(format_markdown(content), unsafe_allow_html=False)
+        st.markdown(format_markdown_cached(content), unsafe_allow_html=False)
         st.markdown("</div></div>", unsafe_allow_html=True)
+
+# ----------------- 스트리밍 출력 함수 -------------------
+def stream_to_placeholder(response_stream, placeholder, waiting_text=None):
+    # 토큰이 도착하는 대로 placeholder 를 갱신하고, 완성된 전체 텍스트를 반환
+    if waiting_text:
+        placeholder.info(waiting_text)
+    text = ""
+    for chunk in response_stream:
+        text += chunk
+        placeholder.markdown(text + "▌")
+    placeholder.markdown(text)
+    return text
+
+def stream_message(response_stream, waiting_text=None):
+    display_html = """
+    <div class="message-container ai">
+        <div class="avatar avatar-ai"></div>
+        <div class="ai-message">
+    """
+    st.markdown(display_html, unsafe_allow_html=True)
+    placeholder = st.empty()
+    text = stream_to_placeholder(response_stream, placeholder, waiting_text)
+    formatted_text = format_markdown(text)
+    placeholder.markdown(formatted_text, unsafe_allow_html=False)
+    st.markdown("</div></div>", unsafe_allow_html=True)
+    return formatted_text
         
 # ----------------- 고객 정보 요약 함수 -------------------
 def render_customer_info():
@@ -420,6 +495,9 @@ if st.session_state.page == "login":
             else:
                 st.warning("이름과 전화번호를 모두 입력해 주세요.")
 
+    # 로그인 화면을 그린 뒤 LLM 모듈 / 클라이언트를 백그라운드에서 미리 불러옴
+    start_warmup()
+
 # ----------------- 고객 정보 입력 화면 -------------------
 if st.session_state.page == "input":
 
@@ -501,60 +579,74 @@ if st.session_state.page == "input":
             st.experimental_rerun()
 
     with col2:
-        if st.button("🚀 상담 스크립트 생성하기", use_container_width=True):
-            if (
-                name 
-                and insurance_status 
-                and interest 
-                and reaction 
-                and etc 
-                and age_group != "연령대를 선택하세요"
-                and gender != "성별을 선택하세요"
-            ):
-                # 💡 세션 초기화 추가
-                st.session_state.kakao_text = ""
-                st.session_state['current_file'] = ""
-                
-                # 고객 이름 세션에 저장
-                st.session_state['customer_name'] = name
-                st.session_state['customer_insurance'] = insurance_status
-                st.session_state['customer_interest'] = interest
-                st.session_state['customer_reaction'] = reaction
-                st.session_state['customer_etc'] = etc
-                
-                customer_info = f"""
-                    - 고객 이름: {name}
-                    - 고객 연령대: {age_group}
-                    - 고객 성별: {gender}
-                    - 기존 보험 상태: {insurance_status}
-                    - 고객 관심 보험: {interest}
-                    - 고객 반응: {reaction}
-                    - 기타 상황: {etc}
-                    """
-                with st.spinner("상담 스크립트를 생성 중입니다..."):
-                    ai_response = get_script_response(
-                        name,
-                        age_group,
-                        gender,
-                        insurance_status,
-                        interest,
-                        reaction,
-                        etc
-                    )
-                    script_text = "".join(ai_response)
-
-                    # 👉 스크립트 context 저장
-                    st.session_state['script_context'] = script_text
-
-                    # 상담 스크립트를 첫 메시지로 저장
-                    st.session_state.message_list = []
-                    st.session_state.message_list.append({"role": "ai", "content": script_text})
-
-                st.session_state.page = "chatbot"
-                st.experimental_rerun() 
-            else:
-                st.warning("모든 항목을 입력해 주세요.")
-                
+        generate_clicked = st.button("🚀 상담 스크립트 생성하기", use_container_width=True)
+
+    # 👉 캐시 사용 시, 저장된 결과를 무시하고 새로 생성하는 버튼
+    regenerate_clicked = False
+    if llm().script_cache is not None:
+        regenerate_clicked = st.button("🔄 스크립트 새로 생성하기 (저장된 결과 무시)", use_container_width=True)
+
+    if generate_clicked or regenerate_clicked:
+        if (
+            name 
+            and insurance_status 
+            and interest 
+            and reaction 
+            and etc 
+            and age_group != "연령대를 선택하세요"
+            and gender != "성별을 선택하세요"
+        ):
+            # 💡 세션 초기화 추가
+            st.session_state.kakao_text = ""
+            st.session_state['current_file'] = ""
+            
+            # 고객 이름 세션에 저장
+            st.session_state['customer_name'] = name
+            st.session_state['customer_insurance'] = insurance_status
+            st.session_state['customer_interest'] = interest
+            st.session_state['customer_reaction'] = reaction
+            st.session_state['customer_etc'] = etc
+            
+            customer_info = f"""
+                - 고객 이름: {name}
+                - 고객 연령대: {age_group}
+                - 고객 성별: {gender}
+                - 기존 보험 상태: {insurance_status}
+                - 고객 관심 보험: {interest}
+                - 고객 반응: {reaction}
+                - 기타 상황: {etc}
+                """
+            ai_response = llm().get_script_response(
+                name,
+                age_group,
+                gender,
+                insurance_status,
+                interest,
+                reaction,
+                etc,
+                use_cache=not regenerate_clicked
+            )
+            # 👉 생성되는 스크립트를 실시간으로 표시
+            script_text = stream_to_placeholder(
+                ai_response,
+                st.empty(),
+                waiting_text="상담 스크립트를 생성 중입니다..."
+            )
+
+            # 👉 스크립트 context 저장 (스트림 완료 후 한 번만 기록)
+            st.session_state['script_context'] = script_text
+
+            # 상담 스크립트를 첫 메시지로 저장
+            st.session_state.message_list = []
+            st.session_state.message_list.append({"role": "ai", "content": script_text})
+            if AUTOSAVE_ENABLED:
+                save_current_conversation()
+
+            st.session_state.page = "chatbot"
+            st.experimental_rerun() 
+        else:
+            st.warning("모든 항목을 입력해 주세요.")
+            
 # ----------------- 챗봇 화면 -------------------
 elif st.session_state.page == "chatbot":
         
@@ -564,9 +656,6 @@ elif st.session_state.page == "chatbot":
     # 고객 정보 요약
     render_customer_info()
         
-    user_avatar = URLS['user_avatar']
-    ai_avatar = URLS['ai_avatar']
-        
     messages = st.session_state.get("message_list", [])
 
     if isinstance(messages, list):
@@ -574,8 +663,7 @@ elif st.session_state.page == "chatbot":
             if isinstance(message, dict) and "role" in message and "content" in message:
                 role = message["role"]
                 content = message["content"]
-                avatar = user_avatar if role == "user" else ai_avatar
-                display_message(role, content, avatar)
+                display_message(role, content)
             else:
                 st.warning("⚠️ 불러온 메시지 형식이 잘못되었습니다.")
     else:
@@ -583,77 +671,72 @@ elif st.session_state.page == "chatbot":
 
     if user_question := st.chat_input("영업 관련 질문을 자유롭게 입력해 주세요."):
         st.session_state.message_list.append({"role": "user", "content": user_question})
-        display_message("user", user_question, user_avatar)
+        display_message("user", user_question)
 
-        with st.spinner("답변을 준비 중입니다..."):
-            ai_response = get_chatbot_response(user_question, st.session_state['script_context'])
-            formatted_response = format_markdown("".join(ai_response))
-            st.session_state.message_list.append({"role": "ai", "content": formatted_response})
-            display_message("ai", formatted_response, ai_avatar)
+        ai_response = llm().get_chatbot_response(user_question, st.session_state['script_context'])
+        formatted_response = stream_message(ai_response, waiting_text="답변을 준비 중입니다...")
+        st.session_state.message_list.append({"role": "ai", "content": formatted_response})
+        if AUTOSAVE_ENABLED:
+            save_current_conversation()
 
     # 👉 버튼 영역: 두 개의 버튼을 나란히 배치
     col1, col2 = st.columns([1, 1])
     
     with col1:               
-        if st.button("💬 카카오톡 발송용 문자 생성하기", use_container_width=True):
-            if not st.session_state.get('script_context'):
-                st.warning("⚠️ 상담 스크립트가 없습니다. 먼저 스크립트를 생성해 주세요.")
-            else:
-                with st.spinner("카카오톡 문자를 생성 중입니다..."):
-                    kakao_message = get_kakao_response(
-                        script_context = st.session_state['script_context'],
-                        message_list = st.session_state['message_list']
-                    )
-                    st.session_state['kakao_text'] = "".join(kakao_message)
-                    
-                # ✅ 안내 문구 출력
-                st.info("✅ 카카오톡 문자가 생성되었습니다! 계속해서 추가 질문을 이어가실 수 있습니다.")
+        kakao_clicked = st.button("💬 카카오톡 발송용 문자 생성하기", use_container_width=True)
                                 
     with col2:
         if st.button("💾 대화 저장하기", use_container_width=True):
-            user_path = f"/data/{CHATBOT_TYPE}/history/{st.session_state['user_folder']}"
-            if not os.path.exists(user_path):
-                os.makedirs(user_path)
             if st.session_state.message_list:
-                # 1️⃣ 고객 이름 확보
-                customer_name = st.session_state.get('customer_name', '고객명미입력')
-
-                # 2️⃣ 기존 파일명 여부 확인
-                if st.session_state.get('current_file'):
-                    # 기존 파일명에서 고객 이름 유지, 시간만 갱신
-                    KST = timezone(timedelta(hours=9))
-                    new_filename = f"{customer_name}_{datetime.now(KST).strftime('%y%m%d-%H%M%S')}.json"
-                    
-                    # 기존 파일 삭제 (덮어쓰기 효과)
-                    old_file = f"{user_path}/{st.session_state['current_file']}"
-                    if os.path.exists(old_file):
-                        os.remove(old_file)
+                new_filename, save_error = save_current_conversation(wait=True)
+                if save_error is None:
+                    st.success(f"대화가 저장되었습니다! ({new_filename})")
                 else:
-                    # 새로운 저장이라면
-                    KST = timezone(timedelta(hours=9))
-                    new_filename = f"{customer_name}_{datetime.now(KST).strftime('%y%m%d-%H%M%S')}.json"
-
-                # 3️⃣ 데이터 저장
-                data_to_save = {
-                    "customer_name": customer_name,
-                    "customer_insurance": st.session_state.get('customer_insurance', ''),
-                    "customer_interest": st.session_state.get('customer_interest', ''),
-                    "customer_reaction": st.session_state.get('customer_reaction', ''),
-                    "customer_etc": st.session_state.get('customer_etc', ''),
-                    "script_context": st.session_state.get('script_context', ''),
-                    "message_list": st.session_state.message_list
-                }
-
-                with open(f"{user_path}/{new_filename}", "w", encoding="utf-8") as f:
-                    json.dump(data_to_save, f, ensure_ascii=False, indent=4)
-
-                # 4️⃣ 파일명 업데이트
-                st.session_state['current_file'] = new_filename
-
-                st.success(f"대화가 저장되었습니다! ({new_filename})")
+                    st.error(f"❌ 대화를 저장하지 못했습니다. 잠시 후 다시 시도해 주세요. ({save_error})")
             else:
                 st.warning("저장할 대화가 없습니다.")
     
+    if kakao_clicked:
+        if not st.session_state.get('script_context'):
+            st.warning("⚠️ 상담 스크립트가 없습니다. 먼저 스크립트를 생성해 주세요.")
+        else:
+            if llm().KAKAO_PARALLEL:
+                # 👉 세 가지 유형을 동시에 생성하며 각 패널에 실시간 표시
+                kakao_panel = st.empty()
+                placeholders = []
+                with kakao_panel.container():
+                    for title, _ in llm().KAKAO_VARIANTS:
+                        st.markdown(f"##### {title}")
+                        placeholder = st.empty()
+                        placeholder.info("카카오톡 문자를 생성 중입니다...")
+                        placeholders.append(placeholder)
+
+                texts = [""] * len(llm().KAKAO_VARIANTS)
+                for index, chunk in llm().get_kakao_variant_responses(
+                    script_context = st.session_state['script_context'],
+                    message_list = st.session_state['message_list']
+                ):
+                    texts[index] += chunk
+                    placeholders[index].markdown(texts[index] + "▌")
+                kakao_panel.empty()
+                st.session_state['kakao_text'] = llm().assemble_kakao_variants(texts)
+            else:
+                kakao_message = llm().get_kakao_response(
+                    script_context = st.session_state['script_context'],
+                    message_list = st.session_state['message_list']
+                )
+                # 👉 생성 중인 문자를 실시간으로 표시하고, 완료되면 아래 복사용 영역으로 교체
+                kakao_placeholder = st.empty()
+                st.session_state['kakao_text'] = stream_to_placeholder(
+                    kakao_message,
+                    kakao_placeholder,
+                    waiting_text="카카오톡 문자를 생성 중입니다..."
+                )
+                kakao_placeholder.empty()
+
+            # ✅ 안내 문구 출력
+            st.info("✅ 카카오톡 문자가 생성되었습니다! 계속해서 추가 질문을 이어가실 수 있습니다.")
+
     # 👉 생성된 카카오톡 문자 출력 (있을 때만 표시)
     if st.session_state.get('kakao_text'):
         st.markdown("### 📩 카카오톡 발송용 문자")
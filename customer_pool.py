@@ -0,0 +1,213 @@
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from typing import List, Literal
+import threading
+import random
+import json
+import time
+import os
+
+# ======================== 설정 ========================
+CUSTOMER_POOL_PATH = os.getenv("CUSTOMER_POOL_PATH", "/data/sale/customer_pool.json")
+# 남은 프로필이 LOW_WATER 보다 적어지면 TARGET 개가 될 때까지 BATCH_SIZE 개씩 백그라운드로 생성
+CUSTOMER_POOL_LOW_WATER = int(os.getenv("CUSTOMER_POOL_LOW_WATER", "10"))
+CUSTOMER_POOL_TARGET = int(os.getenv("CUSTOMER_POOL_TARGET", "40"))
+CUSTOMER_POOL_BATCH_SIZE = int(os.getenv("CUSTOMER_POOL_BATCH_SIZE", "10"))
+# 생성 실패 후 다시 시도하기까지 대기 시간(초)
+CUSTOMER_POOL_RETRY_DELAY = float(os.getenv("CUSTOMER_POOL_RETRY_DELAY", "60"))
+
+PROFILE_FIELDS = ("name", "age_group", "gender", "insurance_status", "interest", "reaction", "etc")
+
+# ======================== 프로필 스키마 ========================
+class CustomerProfile(BaseModel):
+    model_config = ConfigDict(str_strip_whitespace=True)
+
+    name: str = Field(min_length=1, description="자연스러운 한글 고객 이름")
+    age_group: Literal["20대", "30대", "40대", "50대", "60대", "70대 이상"]
+    gender: Literal["남성", "여성"]
+    insurance_status: str = Field(min_length=1, description="기존에 가입하거나 보유한 보험")
+    interest: str = Field(min_length=1, description="고객이 관심을 갖고 있는 보험")
+    reaction: str = Field(min_length=1, description="상황과 관련된 고객의 주요 생각")
+    etc: str = Field(min_length=1, description="고객과 관련된 기타 상황")
+
+class CustomerProfileBatch(BaseModel):
+    customers: List[CustomerProfile]
+
+# 파싱 결과 집계 (첫 응답 파싱 실패 / 복구 성공 / 복구 후에도 실패)
+profile_parse_stats = {"parsed": 0, "parse_failures": 0, "repaired": 0, "repair_failures": 0}
+
+def parse_customer_profiles(text) -> List[dict]:
+    # 스키마로 한 번에 검증 (실패하면 ValidationError 발생)
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.strip("`").removeprefix("json").strip()
+    batch = CustomerProfileBatch.model_validate_json(text)
+    return [profile.model_dump() for profile in batch.customers]
+
+# ======================== 로컬 예비 생성기 ========================
+_SURNAMES = ["김", "이", "박", "최", "정", "강", "조", "윤", "장", "임", "한", "오", "서", "신", "권"]
+_GIVEN_NAMES = ["민준", "서연", "지훈", "하은", "도윤", "수빈", "현우", "지민", "영숙", "정호", "미경", "성민", "은정", "재현", "혜진"]
+_AGE_GROUPS = ["20대", "30대", "40대", "50대", "60대", "70대 이상"]
+_GENDERS = ["남성", "여성"]
+_INSURANCE_STATUSES = [
+    "10년 전 가입한 실손보험만 있음, 보장 내용은 잘 모름",
+    "갱신형 암보험과 실손보험 가입 중, 보험료 인상이 부담됨",
+    "회사 단체보험 외에 개인 보험 없음",
+    "종신보험 1건, 어린이보험(자녀) 1건 가입 중",
+    "부모님이 들어주신 종합보험 유지 중, 특약 구성은 모름",
+]
+_INTERESTS = [
+    "비갱신형 암보험 (표적항암·중입자 치료비 보장)",
+    "뇌·심장 질환 진단비 보험",
+    "간병인 지원 간병보험",
+    "치매보험",
+    "태아보험",
+    "운전자보험",
+]
+_REACTIONS = [
+    "보험료를 저렴하게 가입하고 싶어 함",
+    "최근 건강검진 후 필요성을 느껴 상담 신청",
+    "여러 보험사 상품을 비교해 보고 싶어 함",
+    "지인이 큰 병에 걸린 뒤 보장 점검을 원함",
+    "기존 보험 해지 여부를 고민 중",
+]
+_ETCS = [
+    "가족력(부친 고혈압) 있음",
+    "최근 대장 용종 제거, 이외 병력 없음",
+    "맞벌이 부부, 자녀 2명",
+    "자영업자로 소득이 일정하지 않음",
+    "기존 보험사에서 갈아타기 권유 연락을 받음",
+]
+
+def generate_local_profile(seed) -> dict:
+    # LLM 을 사용할 수 없을 때 사용하는 결정적(seed 고정) 예비 프로필
+    rng = random.Random(seed)
+    return {
+        "name": rng.choice(_SURNAMES) + rng.choice(_GIVEN_NAMES),
+        "age_group": rng.choice(_AGE_GROUPS),
+        "gender": rng.choice(_GENDERS),
+        "insurance_status": rng.choice(_INSURANCE_STATUSES),
+        "interest": rng.choice(_INTERESTS),
+        "reaction": rng.choice(_REACTIONS),
+        "etc": rng.choice(_ETCS),
+    }
+
+# ======================== 고객 프로필 풀 ========================
+class CustomerProfilePool:
+    # 미리 생성해 둔 랜덤 고객 프로필을 디스크에 보관하고 꺼내 쓰는 풀
+    # - pop() 은 로컬 리스트에서 꺼내기만 하므로 LLM 호출 없이 즉시 반환
+    # - 남은 수가 low_water 미만이면 백그라운드 스레드가 generate_batch 로 다시 채움
+    # - 풀이 비어 있으면 로컬 예비 생성기로 즉시 반환
+
+    def __init__(self, generate_batch, path=CUSTOMER_POOL_PATH, low_water=CUSTOMER_POOL_LOW_WATER,
+                 target=CUSTOMER_POOL_TARGET, batch_size=CUSTOMER_POOL_BATCH_SIZE,
+                 retry_delay=CUSTOMER_POOL_RETRY_DELAY, fallback=generate_local_profile):
+        self.generate_batch = generate_batch
+        self.path = path
+        self.low_water = low_water
+        self.target = target
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self.fallback = fallback
+        self._profiles = self._load()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._worker = None
+        self._dirty = False
+        self._fallback_seed = 0
+        self._retry_at = 0.0
+        self._counters = {"pops": 0, "fallbacks": 0, "generated": 0, "generate_errors": 0}
+
+    # ----------------- 조회 -------------------
+    def pop(self) -> dict:
+        with self._lock:
+            self._counters["pops"] += 1
+            if self._profiles:
+                profile = self._profiles.pop()
+                self._dirty = True
+            else:
+                self._counters["fallbacks"] += 1
+                self._fallback_seed += 1
+                profile = self.fallback(self._fallback_seed)
+        self._ensure_worker()
+        self._wakeup.set()
+        return profile
+
+    def __len__(self):
+        with self._lock:
+            return len(self._profiles)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._counters, "size": len(self._profiles)}
+
+    def start(self):
+        # 앱 시작 시 미리 채워두고 싶을 때 호출
+        self._ensure_worker()
+        self._wakeup.set()
+
+    # ----------------- 백그라운드 보충 -------------------
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="customer-pool-refill", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            self._refill()
+            self._save_if_dirty()
+
+    def _refill(self):
+        if len(self) >= self.low_water or time.monotonic() < self._retry_at:
+            return
+        while len(self) < self.target:
+            try:
+                batch = [profile for profile in self.generate_batch(self.batch_size) if _is_complete(profile)]
+            except Exception as e:
+                with self._lock:
+                    self._counters["generate_errors"] += 1
+                self._retry_at = time.monotonic() + self.retry_delay
+                print("🔥 고객 프로필 생성 실패:", e)
+                return
+            if not batch:
+                return
+            with self._lock:
+                self._profiles[:0] = batch
+                self._counters["generated"] += len(batch)
+                self._dirty = True
+            self._save_if_dirty()
+
+    # ----------------- 디스크 저장 -------------------
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                profiles = json.load(f)
+        except (OSError, ValueError):
+            return []
+        return [profile for profile in profiles if _is_complete(profile)] if isinstance(profiles, list) else []
+
+    def _save_if_dirty(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = list(self._profiles)
+            self._dirty = False
+        try:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print("🔥 고객 프로필 풀 저장 실패:", e)
+
+def _is_complete(profile):
+    try:
+        CustomerProfile.model_validate(profile)
+    except ValidationError:
+        return False
+    return True
@@ -0,0 +1,60 @@
+from functools import lru_cache
+import re
+
+# ======================== 정규식 (모듈 로드 시 한 번만 컴파일) ========================
+TITLE_PATTERN = re.compile(r"^(▶️|✅|📌|❗|📝|📍)\s*[^:：]+[:：]?")
+TITLE_COLON_PATTERN = re.compile(r"[:：]\s*$")
+BOLD_BULLET_PATTERN = re.compile(r"^[-•]\s*\*\*.*\*\*")
+BULLET_PATTERN = re.compile(r"^[-•]\s*")
+MARKDOWN_SPECIAL_PATTERN = re.compile(r"([\\`*_{}\[\]()#+\-.!|<>~$:])")
+
+# 렌더링 결과를 보관할 메시지 수 (긴 상담 여러 건을 오가도 충분한 크기)
+MARKDOWN_CACHE_SIZE = 4096
+
+# ======================== 마크다운 자동 정리 함수 ========================
+def format_markdown(text: str) -> str:
+    lines = text.strip().splitlines()
+    formatted_lines = []
+    indent_next = False
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            formatted_lines.append("")
+            indent_next = False
+            continue
+
+        if TITLE_PATTERN.match(line):
+            title = TITLE_COLON_PATTERN.sub("", line)
+            formatted_lines.append(f"**{title}**\n")
+            indent_next = False
+            continue
+
+        if BOLD_BULLET_PATTERN.match(line):
+            formatted_lines.append(BULLET_PATTERN.sub("- ", line))
+            indent_next = True
+            continue
+
+        if BULLET_PATTERN.match(line):
+            if indent_next:
+                formatted_lines.append("    " + BULLET_PATTERN.sub("- ", line))
+            else:
+                formatted_lines.append(BULLET_PATTERN.sub("- ", line))
+            continue
+
+        formatted_lines.append(line)
+        indent_next = False
+
+    return "\n".join(formatted_lines).strip() + "\n"
+
+@lru_cache(maxsize=MARKDOWN_CACHE_SIZE)
+def format_markdown_cached(text: str) -> str:
+    # 같은 메시지는 재실행(rerun)마다 다시 정리하지 않고 이전 결과를 재사용
+    return format_markdown(text)
+
+# ======================== 검색 결과 강조 ========================
+def snippet_markdown(snippet: str, start: str, end: str) -> str:
+    # 저장된 상담 원문은 마크다운(링크 / 이미지 / 서식)으로 해석되지 않도록 모두 이스케이프하고
+    # 검색어 강조 구간(start ~ end 표시 사이)만 굵게 표시
+    text = MARKDOWN_SPECIAL_PATTERN.sub(r"\\\1", " ".join(snippet.split()))
+    return text.replace(start, "**").replace(end, "**")
@@ -0,0 +1,409 @@
+from chat_storage import load_conversation, is_conversation_file
+from contextlib import closing
+import threading
+import sqlite3
+import re
+import time
+import os
+
+# ======================== 설정 ========================
+# 사이드바 목록 한 페이지에 표시할 대화 수
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "50"))
+# 같은 조건의 목록 조회 결과를 보관할 개수 (저장 폴더 / 색인 파일이 바뀌면 자동 무효화)
+HISTORY_QUERY_CACHE_SIZE = 256
+# 상담 내용 전문 검색 결과 수
+FULLTEXT_RESULT_LIMIT = int(os.getenv("FULLTEXT_RESULT_LIMIT", "10"))
+
+def catalog_path_for(user_path):
+    # /data/sale/history/<user_folder> → /data/sale/catalog/<user_folder>.db
+    history_root = os.path.dirname(os.path.normpath(user_path))
+    return os.path.join(os.path.dirname(history_root), "catalog", os.path.basename(os.path.normpath(user_path)) + ".db")
+
+def fulltext_path_for(user_path):
+    # 팀 전체가 공유하는 전문 검색 색인: /data/sale/catalog/fulltext.db
+    return os.path.join(os.path.dirname(catalog_path_for(user_path)), "fulltext.db")
+
+def read_catalog_fields(data):
+    # 저장된 대화 데이터(구버전 list / dict 형식)에서 색인할 필드 추출
+    if not isinstance(data, dict):
+        return {"customer_name": "", "customer_interest": "", "customer_reaction": ""}
+    return {
+        "customer_name": data.get("customer_name", "") or "",
+        "customer_interest": data.get("customer_interest", "") or "",
+        "customer_reaction": data.get("customer_reaction", "") or "",
+    }
+
+def like_pattern(keyword):
+    # 부분 문자열 검색용 LIKE 패턴 — 검색어의 % / _ 가 와일드카드로 해석되지 않도록 이스케이프 (ESCAPE '\' 와 함께 사용)
+    escaped = keyword.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+# ======================== 대화 목록 색인 ========================
+class HistoryCatalog:
+    # 상담원별 저장 대화 목록을 SQLite 로 색인
+    # - 저장 / 삭제 시 upsert() / remove() 로 갱신
+    # - 폴더가 외부에서 바뀐 경우(mtime 변경) sync() 가 차이만 반영
+    # - search() 결과는 폴더 / 색인 파일 mtime 기준으로 프로세스 내에 캐시
+
+    def __init__(self, user_path, db_path=None, fulltext=None):
+        self.user_path = user_path
+        self.user_folder = os.path.basename(os.path.normpath(user_path))
+        self.db_path = db_path or catalog_path_for(user_path)
+        self.fulltext = fulltext
+        self._lock = threading.Lock()
+        self._query_cache = {}
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS conversations ("
+                " filename TEXT PRIMARY KEY,"
+                " customer_name TEXT NOT NULL DEFAULT '',"
+                " customer_interest TEXT NOT NULL DEFAULT '',"
+                " customer_reaction TEXT NOT NULL DEFAULT '',"
+                " saved_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_conversations_saved_at ON conversations (saved_at DESC)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_conversations_customer ON conversations (customer_name)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    # ----------------- 갱신 -------------------
+    def upsert(self, filename, data, saved_at=None):
+        fields = read_catalog_fields(data)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO conversations"
+                " (filename, customer_name, customer_interest, customer_reaction, saved_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (filename, fields["customer_name"], fields["customer_interest"], fields["customer_reaction"],
+                 saved_at if saved_at is not None else time.time())
+            )
+            self._record_dir_mtime(conn)
+        if self.fulltext is not None:
+            self.fulltext.upsert(self.user_folder, filename, data)
+
+    def remove(self, filename):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM conversations WHERE filename = ?", (filename,))
+            self._record_dir_mtime(conn)
+        if self.fulltext is not None:
+            self.fulltext.remove(self.user_folder, filename)
+
+    def sync(self):
+        # 마지막 색인 이후 폴더가 바뀌었을 때만 파일 목록과 비교해 추가 / 삭제분 반영
+        dir_mtime = self._dir_mtime()
+        with closing(self._connect()) as conn, conn:
+            self._backfill_fulltext(conn)
+            row = conn.execute("SELECT value FROM meta WHERE key = 'dir_mtime'").fetchone()
+            if row is not None and float(row[0]) == dir_mtime:
+                return False
+
+            on_disk = (
+                {name for name in os.listdir(self.user_path) if is_conversation_file(name)}
+                if os.path.exists(self.user_path) else set()
+            )
+            added = []
+            indexed = {r[0] for r in conn.execute("SELECT filename FROM conversations")}
+            for filename in indexed - on_disk:
+                conn.execute("DELETE FROM conversations WHERE filename = ?", (filename,))
+                if self.fulltext is not None:
+                    self.fulltext.remove(self.user_folder, filename)
+            for filename in on_disk - indexed:
+                path = os.path.join(self.user_path, filename)
+                try:
+                    data = load_conversation(path)
+                    saved_at = os.path.getmtime(path)
+                except (OSError, ValueError) as e:
+                    print("⚠️ 대화 색인 실패:", filename, e)
+                    continue
+                fields = read_catalog_fields(data)
+                conn.execute(
+                    "INSERT OR REPLACE INTO conversations"
+                    " (filename, customer_name, customer_interest, customer_reaction, saved_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (filename, fields["customer_name"], fields["customer_interest"], fields["customer_reaction"], saved_at)
+                )
+                added.append((filename, data))
+            if self.fulltext is not None and added:
+                self.fulltext.upsert_many(self.user_folder, added)
+            self._record_dir_mtime(conn, dir_mtime)
+        return True
+
+    # ----------------- 조회 -------------------
+    def search(self, keyword="", page=0, page_size=HISTORY_PAGE_SIZE):
+        # 최근 저장 순으로 정렬된 (filename, customer_name, customer_interest, saved_at) 목록과 전체 건수 반환
+        # keyword 는 고객명 / 관심 보험 / 고객 반응 / 파일명 중 하나에 포함되면 일치
+        keyword = keyword.strip()
+        cache_key = (keyword.lower(), page, page_size)
+        version = self._version()
+        with self._lock:
+            cached = self._query_cache.get(cache_key)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+
+        where, params = "", []
+        if keyword:
+            pattern = like_pattern(keyword)
+            where = (
+                " WHERE customer_name LIKE ? ESCAPE '\\' OR customer_interest LIKE ? ESCAPE '\\'"
+                " OR customer_reaction LIKE ? ESCAPE '\\' OR filename LIKE ? ESCAPE '\\'"
+            )
+            params = [pattern] * 4
+        with closing(self._connect()) as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM conversations{where}", params).fetchone()[0]
+            rows = conn.execute(
+                "SELECT filename, customer_name, customer_interest, saved_at FROM conversations"
+                f"{where} ORDER BY saved_at DESC LIMIT ? OFFSET ?",
+                params + [page_size, page * page_size]
+            ).fetchall()
+
+        result = (rows, total)
+        with self._lock:
+            if len(self._query_cache) >= HISTORY_QUERY_CACHE_SIZE:
+                self._query_cache.clear()
+            self._query_cache[cache_key] = (version, result)
+        return result
+
+    def count(self):
+        return self.search("", 0, 1)[1]
+
+    # ----------------- 내부 처리 -------------------
+    def _dir_mtime(self):
+        try:
+            return os.stat(self.user_path).st_mtime
+        except OSError:
+            return 0.0
+
+    def _version(self):
+        # 폴더와 색인 파일(WAL 포함)의 mtime 조합 → 하나라도 바뀌면 캐시 무효화
+        mtimes = [self._dir_mtime()]
+        for path in (self.db_path, self.db_path + "-wal"):
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                mtimes.append(0)
+        return tuple(mtimes)
+
+    def _backfill_fulltext(self, conn):
+        # 전문 검색 도입 전에 색인된 대화를 한 번만 전문 검색 색인에 추가
+        if self.fulltext is None:
+            return
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'fulltext_indexed'").fetchone() is not None:
+            return
+        items = []
+        for (filename,) in conn.execute("SELECT filename FROM conversations").fetchall():
+            try:
+                items.append((filename, load_conversation(os.path.join(self.user_path, filename))))
+            except (OSError, ValueError) as e:
+                print("⚠️ 전문 검색 색인 실패:", filename, e)
+        self.fulltext.upsert_many(self.user_folder, items)
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('fulltext_indexed', '1')")
+
+    def _record_dir_mtime(self, conn, dir_mtime=None):
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('dir_mtime', ?)",
+            (str(self._dir_mtime() if dir_mtime is None else dir_mtime),)
+        )
+
+# ======================== 상담 내용 전문 검색 ========================
+_WORD_RE = re.compile(r"[^\W_]+")
+# 검색 결과 snippet 의 강조 구간 표시 (본문에 나올 수 없는 제어 문자 — 화면에서 마크다운으로 변환)
+HIGHLIGHT_START, HIGHLIGHT_END = "\x02", "\x03"
+
+def _trigram_supported():
+    try:
+        with closing(sqlite3.connect(":memory:")) as conn:
+            conn.execute("CREATE VIRTUAL TABLE t USING fts5(x, tokenize='trigram')")
+        return True
+    except sqlite3.Error:
+        return False
+
+def _fulltext_fields(filename, data):
+    # (customer_name, customer, script, messages) 색인 컬럼 값
+    if isinstance(data, dict):
+        customer = " ".join(
+            str(data.get(key, "") or "")
+            for key in ("customer_name", "customer_insurance", "customer_interest", "customer_reaction", "customer_etc")
+        )
+        customer_name = data.get("customer_name", "") or ""
+        script = data.get("script_context", "") or ""
+        message_list = data.get("message_list", [])
+    else:
+        customer_name, customer, script, message_list = "", "", "", data or []
+    messages = "\n".join(str(msg.get("content", "")) for msg in message_list if isinstance(msg, dict))
+    return customer_name or filename.split("_")[0], customer, script, messages
+
+class FullTextIndex:
+    # 저장된 상담(스크립트, 대화 내용, 고객 정보)을 SQLite FTS5 로 색인
+    # 한글은 띄어쓰기 / 조사 때문에 단어 단위 색인이 잘 맞지 않아 trigram(3글자 n-gram) 토크나이저 사용
+    # 2글자 검색어(한글 이름, 짧은 키워드)는 2글자 단위로 쪼개 둔 보조 색인(conversation_bigram)으로 찾고,
+    # 1글자 검색어는 색인으로 찾을 수 없어 무시합니다.
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.tokenizer = "trigram" if _trigram_supported() else "unicode61"
+        # unicode61 은 단어 단위라 짧은 검색어도 그대로 MATCH 가능 → 보조 색인 불필요
+        self.bigram = self.tokenizer == "trigram"
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS conversation_fts USING fts5("
+                " user_folder UNINDEXED, filename UNINDEXED, customer_name UNINDEXED,"
+                f" customer, script, messages, tokenize='{self.tokenizer}')"
+            )
+            # (상담원 폴더, 파일명) → FTS rowid (갱신 / 삭제 시 전체 스캔 방지, 검색 시 상담원 폴더로 먼저 범위 지정)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS conversation_docs ("
+                " doc_id INTEGER PRIMARY KEY, user_folder TEXT NOT NULL, filename TEXT NOT NULL,"
+                " UNIQUE (user_folder, filename))"
+            )
+            if self.bigram:
+                self._create_bigram_index(conn)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _create_bigram_index(self, conn):
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'conversation_bigram'"
+        ).fetchone()
+        conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS conversation_bigram USING fts5("
+            " customer, script, messages, tokenize='unicode61')"
+        )
+        if exists is None:
+            # 보조 색인이 없던 기존 색인 파일은 저장된 본문으로 한 번 채움
+            rows = conn.execute("SELECT rowid, customer, script, messages FROM conversation_fts").fetchall()
+            conn.executemany(
+                "INSERT INTO conversation_bigram (rowid, customer, script, messages) VALUES (?, ?, ?, ?)",
+                [(rowid, *map(_bigrams, texts)) for rowid, *texts in rows]
+            )
+
+    def upsert(self, user_folder, filename, data):
+        self.upsert_many(user_folder, [(filename, data)])
+
+    def upsert_many(self, user_folder, items):
+        # 여러 대화를 한 트랜잭션으로 색인 (폴더 동기화 / 최초 색인용)
+        with closing(self._connect()) as conn, conn:
+            for filename, data in items:
+                self._delete(conn, user_folder, filename)
+                doc_id = conn.execute(
+                    "INSERT INTO conversation_docs (user_folder, filename) VALUES (?, ?)", (user_folder, filename)
+                ).lastrowid
+                customer_name, *texts = _fulltext_fields(filename, data)
+                conn.execute(
+                    "INSERT INTO conversation_fts (rowid, user_folder, filename, customer_name, customer, script, messages)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (doc_id, user_folder, filename, customer_name, *texts)
+                )
+                if self.bigram:
+                    conn.execute(
+                        "INSERT INTO conversation_bigram (rowid, customer, script, messages) VALUES (?, ?, ?, ?)",
+                        (doc_id, *map(_bigrams, texts))
+                    )
+
+    def remove(self, user_folder, filename):
+        with closing(self._connect()) as conn, conn:
+            self._delete(conn, user_folder, filename)
+
+    def _delete(self, conn, user_folder, filename):
+        row = conn.execute(
+            "SELECT doc_id FROM conversation_docs WHERE user_folder = ? AND filename = ?", (user_folder, filename)
+        ).fetchone()
+        if row is not None:
+            conn.execute("DELETE FROM conversation_fts WHERE rowid = ?", row)
+            if self.bigram:
+                conn.execute("DELETE FROM conversation_bigram WHERE rowid = ?", row)
+            conn.execute("DELETE FROM conversation_docs WHERE doc_id = ?", row)
+
+    def search(self, query, user_folder=None, limit=FULLTEXT_RESULT_LIMIT):
+        # 관련도 순 (filename, customer_name, snippet) 목록 반환 (고객 정보 > 대화 > 스크립트 순으로 가중치)
+        # 상담원 폴더 조건은 conversation_docs 인덱스로 걸러 해당 폴더의 문서만 순위 계산
+        terms = query.split()
+        min_length = 3 if self.bigram else 1
+        match_terms = [_phrase(term) for term in terms if len(term) >= min_length]
+        short_terms = [term for term in terms if len(term) < min_length and _bigrams(term)]
+        if not match_terms and not short_terms:
+            return []
+
+        if match_terms:
+            conditions = ["conversation_fts MATCH ?"]
+            params = [" ".join(match_terms)]
+            if short_terms:
+                conditions.append("conversation_fts.rowid IN (SELECT rowid FROM conversation_bigram WHERE conversation_bigram MATCH ?)")
+                params.append(_bigram_query(short_terms))
+            sql = (
+                f"SELECT d.filename, customer_name, snippet(conversation_fts, -1, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}', '…', 16)"
+                " FROM conversation_fts JOIN conversation_docs d ON d.doc_id = conversation_fts.rowid"
+            )
+            order = "bm25(conversation_fts, 0, 0, 0, 5.0, 1.0, 2.0)"
+        else:
+            conditions = ["conversation_bigram MATCH ?"]
+            params = [_bigram_query(short_terms)]
+            sql = (
+                "SELECT d.filename, f.customer_name, f.customer, f.script, f.messages"
+                " FROM conversation_bigram JOIN conversation_docs d ON d.doc_id = conversation_bigram.rowid"
+                " JOIN conversation_fts f ON f.rowid = conversation_bigram.rowid"
+            )
+            order = "bm25(conversation_bigram, 5.0, 1.0, 2.0)"
+        if user_folder is not None:
+            conditions.append("d.user_folder = ?")
+            params.append(user_folder)
+
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"{sql} WHERE {' AND '.join(conditions)} ORDER BY {order} LIMIT ?", params + [limit]
+            ).fetchall()
+        if match_terms:
+            return rows
+        return [(filename, name, _short_snippet((customer, messages, script), short_terms))
+                for filename, name, customer, script, messages in rows]
+
+def _phrase(term):
+    return '"' + term.replace('"', '""') + '"'
+
+def _bigrams(text):
+    # "홍길동 보험" → "홍길 길동 보험" (unicode61 토크나이저가 2글자 조각을 하나의 토큰으로 색인)
+    return " ".join(word[i:i + 2] for word in _WORD_RE.findall(text) for i in range(len(word) - 1))
+
+def _bigram_query(terms):
+    return " ".join(_phrase(_bigrams(term)) for term in terms)
+
+def _short_snippet(texts, terms, width=24):
+    # 2글자 검색어는 FTS snippet 을 쓸 수 없으므로 처음 나오는 위치 주변을 잘라 강조
+    for text in texts:
+        lowered = (text or "").lower()
+        for term in terms:
+            pos = lowered.find(term.lower())
+            if pos < 0:
+                continue
+            start, end = max(0, pos - width), pos + len(term) + width
+            return (
+                ("…" if start > 0 else "") + text[start:pos] + HIGHLIGHT_START + text[pos:pos + len(term)] + HIGHLIGHT_END
+                + text[pos + len(term):end] + ("…" if end < len(text) else "")
+            ).replace("\n", " ")
+    return (texts[0] or "")[:60]
+
+_catalogs = {}
+_fulltext_indexes = {}
+_catalogs_lock = threading.Lock()
+
+def get_fulltext_index(user_path) -> FullTextIndex:
+    db_path = fulltext_path_for(user_path)
+    with _catalogs_lock:
+        if db_path not in _fulltext_indexes:
+            _fulltext_indexes[db_path] = FullTextIndex(db_path)
+        return _fulltext_indexes[db_path]
+
+def get_catalog(user_path) -> HistoryCatalog:
+    fulltext = get_fulltext_index(user_path)
+    with _catalogs_lock:
+        if user_path not in _catalogs:
+            _catalogs[user_path] = HistoryCatalog(user_path, fulltext=fulltext)
+        return _catalogs[user_path]
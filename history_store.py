@@ -0,0 +1,451 @@
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_community.chat_message_histories import ChatMessageHistory
+from langchain_core.messages import message_to_dict, messages_from_dict
+from chat_storage import load_conversation
+from collections import OrderedDict
+import threading
+import sqlite3
+import json
+import time
+import sys
+import os
+
+# ======================== 설정 ========================
+# 0 이하로 설정하면 해당 제한을 사용하지 않습니다.
+HISTORY_MAX_SESSIONS = int(os.getenv("HISTORY_MAX_SESSIONS", "500"))
+HISTORY_MAX_BYTES = int(os.getenv("HISTORY_MAX_BYTES", str(64 * 1024 * 1024)))
+HISTORY_IDLE_TTL = float(os.getenv("HISTORY_IDLE_TTL", str(2 * 60 * 60)))
+
+# memory: 프로세스 내 BoundedHistoryStore / sqlite: 여러 프로세스가 공유하는 디스크 저장소
+HISTORY_BACKEND = os.getenv("HISTORY_BACKEND", "memory")
+HISTORY_SQLITE_PATH = os.getenv("HISTORY_SQLITE_PATH", "/data/sale/session_history.db")
+# 마지막 메시지 이후 이 시간(초)이 지난 세션은 SQLite 에서 삭제 (저장된 대화 파일은 그대로 — 불러오면 다시 채워짐)
+HISTORY_SQLITE_TTL = float(os.getenv("HISTORY_SQLITE_TTL", str(24 * 60 * 60)))
+# 만료 세션 정리 주기(초) — 기록할 때 이 간격이 지났으면 함께 정리
+HISTORY_SQLITE_SWEEP_INTERVAL = float(os.getenv("HISTORY_SQLITE_SWEEP_INTERVAL", "600"))
+
+# ======================== 히스토리 변환 ========================
+def history_from_messages(message_list) -> ChatMessageHistory:
+    chat_history = ChatMessageHistory()
+    for msg in message_list:
+        if isinstance(msg, dict) and 'role' in msg and 'content' in msg:
+            if msg['role'] == 'user':
+                chat_history.add_user_message(msg['content'])
+            elif msg['role'] == 'ai':
+                chat_history.add_ai_message(msg['content'])
+    return chat_history
+
+def load_history_file(path) -> ChatMessageHistory:
+    # 저장된 대화 파일(구버전 list / dict 형식 모두)에서 히스토리 복원
+    loaded_data = load_conversation(path)
+    if isinstance(loaded_data, dict):
+        loaded_data = loaded_data.get("message_list", [])
+    if not isinstance(loaded_data, list):
+        raise ValueError(f"지원하지 않는 대화 파일 형식입니다: {path}")
+    return history_from_messages(loaded_data)
+
+def history_size(history: BaseChatMessageHistory) -> int:
+    return sum(sys.getsizeof(message.content) for message in history.messages)
+
+# ======================== 세션 저장소 ========================
+class _Entry:
+    __slots__ = ("session_id", "history", "view", "last_access", "size")
+
+    def __init__(self, session_id, history, last_access):
+        self.session_id = session_id
+        self.history = history
+        self.view = None
+        self.last_access = last_access
+        self.size = history_size(history)
+
+class _TrackedHistory(BaseChatMessageHistory):
+    # 저장소가 돌려주는 히스토리 — 메시지가 추가 / 삭제될 때 해당 세션의 크기만 다시 계산하도록 저장소에 알림
+    # (전체 세션을 다시 측정하지 않고 그 자리에서 max_bytes 제한을 적용)
+
+    def __init__(self, store, entry):
+        self._store = store
+        self._entry = entry
+
+    @property
+    def messages(self):
+        return self._entry.history.messages
+
+    async def aget_messages(self):
+        return self.messages
+
+    def add_messages(self, messages) -> None:
+        messages = list(messages)
+        self._entry.history.add_messages(messages)
+        self._store._resize(self._entry, self._entry.size + sum(sys.getsizeof(m.content) for m in messages))
+
+    async def aadd_messages(self, messages) -> None:
+        self.add_messages(messages)
+
+    def clear(self) -> None:
+        self._entry.history.clear()
+        self._store._resize(self._entry, 0)
+
+class BoundedHistoryStore:
+    # LRU + 유휴 TTL 기반으로 세션 히스토리를 보관하는 저장소
+    # - max_sessions: 보관할 최대 세션 수
+    # - max_bytes: 메시지 본문 기준 최대 메모리 사용량 (세션별 크기와 합계를 추가 시점에 갱신)
+    # - idle_ttl: 마지막 접근 이후 보관 시간(초)
+    # 제거된 세션이 다시 요청되면 등록된 저장 파일에서 히스토리를 복원합니다.
+
+    def __init__(self, max_sessions=HISTORY_MAX_SESSIONS, max_bytes=HISTORY_MAX_BYTES,
+                 idle_ttl=HISTORY_IDLE_TTL, history_factory=ChatMessageHistory, clock=time.monotonic):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self._history_factory = history_factory
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._sources = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "rehydrations": 0,
+            "rehydration_errors": 0,
+            "evictions_lru": 0,
+            "evictions_ttl": 0,
+            "evictions_bytes": 0,
+        }
+
+    # ----------------- 조회 / 갱신 -------------------
+    def get(self, session_id) -> BaseChatMessageHistory:
+        with self._lock:
+            now = self._clock()
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                self._counters["hits"] += 1
+                entry.last_access = now
+                self._entries.move_to_end(session_id)
+                self._evict(now)
+                return entry.view
+
+            self._counters["misses"] += 1
+            entry = self._insert(session_id, self._rehydrate(session_id), now)
+            self._evict(now)
+            return entry.view
+
+    def __getitem__(self, session_id):
+        return self.get(session_id)
+
+    def __setitem__(self, session_id, history):
+        with self._lock:
+            # 새로 지정된 히스토리가 기준이므로 이전 복원 경로는 무효화
+            self._sources.pop(session_id, None)
+            now = self._clock()
+            self._insert(session_id, history, now)
+            self._evict(now)
+
+    def __delitem__(self, session_id):
+        with self._lock:
+            self._remove(session_id)
+            self._sources.pop(session_id, None)
+
+    def __contains__(self, session_id):
+        with self._lock:
+            return session_id in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def pop(self, session_id, default=None):
+        with self._lock:
+            self._sources.pop(session_id, None)
+            if session_id not in self._entries:
+                return default
+            return self._remove(session_id).history
+
+    def register_source(self, session_id, path):
+        # 세션이 제거된 뒤 다시 요청될 때 복원할 저장 파일 경로 등록
+        with self._lock:
+            self._sources[session_id] = path
+            self._sources.move_to_end(session_id)
+            limit = self.max_sessions * 4 if self.max_sessions > 0 else 0
+            while limit and len(self._sources) > limit:
+                self._sources.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._counters,
+                "sessions": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    # ----------------- 내부 처리 -------------------
+    def _insert(self, session_id, history, now):
+        if isinstance(history, _TrackedHistory):
+            history = history._entry.history
+        if session_id in self._entries:
+            self._remove(session_id)
+        entry = _Entry(session_id, history, now)
+        entry.view = _TrackedHistory(self, entry)
+        self._entries[session_id] = entry
+        self._bytes += entry.size
+        return entry
+
+    def _remove(self, session_id):
+        entry = self._entries.pop(session_id)
+        self._bytes -= entry.size
+        return entry
+
+    def _resize(self, entry, size):
+        # 히스토리에 메시지가 추가되면 그 세션의 크기만 갱신하고 바로 제한 적용
+        # (이미 제거된 세션의 히스토리라면 집계하지 않음)
+        with self._lock:
+            if self._entries.get(entry.session_id) is not entry:
+                entry.size = size
+                return
+            self._bytes += size - entry.size
+            entry.size = size
+            now = self._clock()
+            entry.last_access = now
+            self._entries.move_to_end(entry.session_id)
+            self._evict(now)
+
+    def _rehydrate(self, session_id):
+        path = self._sources.get(session_id)
+        if path and os.path.exists(path):
+            try:
+                history = load_history_file(path)
+                self._counters["rehydrations"] += 1
+                return history
+            except Exception as e:
+                self._counters["rehydration_errors"] += 1
+                print("🔥 히스토리 복원 실패:", e)
+        return self._history_factory()
+
+    def _evict(self, now):
+        # 가장 오래 사용하지 않은 세션부터 제거 (방금 사용한 세션은 항상 유지)
+        if self.idle_ttl > 0:
+            while len(self._entries) > 1:
+                entry = next(iter(self._entries.values()))
+                if now - entry.last_access <= self.idle_ttl:
+                    break
+                self._remove(entry.session_id)
+                self._counters["evictions_ttl"] += 1
+
+        if self.max_sessions > 0:
+            while len(self._entries) > self.max_sessions:
+                self._remove(next(iter(self._entries)))
+                self._counters["evictions_lru"] += 1
+
+        if self.max_bytes > 0:
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                self._remove(next(iter(self._entries)))
+                self._counters["evictions_bytes"] += 1
+
+# ======================== SQLite 저장소 ========================
+class SQLiteHistoryDB:
+    # WAL 모드 SQLite 파일에 세션별 메시지를 저장 (스레드마다 별도 연결 사용)
+    # 같은 호스트의 여러 Streamlit 프로세스가 동일한 파일을 공유할 수 있습니다.
+    # 로그인마다 새 세션이 생기므로 sessions 테이블에 세션별 마지막 기록 시각을 두고 ttl 이 지난 세션을 주기적으로 삭제합니다.
+
+    def __init__(self, path=HISTORY_SQLITE_PATH, ttl=HISTORY_SQLITE_TTL, sweep_interval=HISTORY_SQLITE_SWEEP_INTERVAL):
+        self.path = path
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self.expired_sessions = 0
+        self._last_sweep = 0.0
+        self._sweep_lock = threading.Lock()
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " session_id TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " message TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, id)")
+            created = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sessions'").fetchone() is None
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " session_id TEXT PRIMARY KEY,"
+                " last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_last_access ON sessions (last_access)")
+            if created:
+                # sessions 테이블이 없던 기존 파일은 메시지 기록 시각으로 한 번 채움
+                conn.execute(
+                    "INSERT OR IGNORE INTO sessions (session_id, last_access)"
+                    " SELECT session_id, MAX(created_at) FROM messages GROUP BY session_id"
+                )
+        self.sweep()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def read(self, session_id):
+        rows = self._connect().execute(
+            "SELECT message FROM messages WHERE session_id = ? ORDER BY id", (session_id,)
+        ).fetchall()
+        return messages_from_dict([json.loads(row[0]) for row in rows])
+
+    def append(self, session_id, messages):
+        # 한 턴의 메시지(질문 + 답변)를 하나의 트랜잭션으로 기록
+        now = time.time()
+        rows = [
+            (session_id, now, json.dumps(message_to_dict(message), ensure_ascii=False))
+            for message in messages
+        ]
+        if not rows:
+            return
+        with self._connect() as conn:
+            conn.executemany("INSERT INTO messages (session_id, created_at, message) VALUES (?, ?, ?)", rows)
+            self._touch(conn, session_id, now)
+        self._maybe_sweep(now)
+
+    def replace(self, session_id, messages):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            conn.executemany(
+                "INSERT INTO messages (session_id, created_at, message) VALUES (?, ?, ?)",
+                [
+                    (session_id, now, json.dumps(message_to_dict(message), ensure_ascii=False))
+                    for message in messages
+                ]
+            )
+            self._touch(conn, session_id, now)
+        self._maybe_sweep(now)
+
+    def clear(self, session_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def _touch(self, conn, session_id, now):
+        conn.execute(
+            "INSERT INTO sessions (session_id, last_access) VALUES (?, ?)"
+            " ON CONFLICT (session_id) DO UPDATE SET last_access = excluded.last_access",
+            (session_id, now)
+        )
+
+    # ----------------- 만료 세션 정리 -------------------
+    def sweep(self, now=None) -> int:
+        # 마지막 기록 이후 ttl 이 지난 세션의 메시지 삭제 (last_access 인덱스로 대상만 조회), 삭제한 세션 수 반환
+        if self.ttl <= 0:
+            return 0
+        now = time.time() if now is None else now
+        cutoff = now - self.ttl
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM messages WHERE session_id IN (SELECT session_id FROM sessions WHERE last_access < ?)",
+                (cutoff,)
+            )
+            expired = conn.execute("DELETE FROM sessions WHERE last_access < ?", (cutoff,)).rowcount
+        self._last_sweep = now
+        if expired:
+            self.expired_sessions += expired
+            print(f"💾 만료된 세션 히스토리 {expired}개 삭제")
+        return expired
+
+    def _maybe_sweep(self, now):
+        # 기록하는 스레드 중 하나만 정리 (간격 안에서는 건너뜀)
+        if self.ttl <= 0 or now - self._last_sweep < self.sweep_interval:
+            return
+        if not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            if now - self._last_sweep >= self.sweep_interval:
+                self.sweep(now)
+        except sqlite3.Error as e:
+            print("⚠️ 세션 히스토리 정리 실패:", e)
+        finally:
+            self._sweep_lock.release()
+
+    def has_session(self, session_id):
+        row = self._connect().execute(
+            "SELECT 1 FROM messages WHERE session_id = ? LIMIT 1", (session_id,)
+        ).fetchone()
+        return row is not None
+
+    def count_sessions(self):
+        return self._connect().execute("SELECT COUNT(DISTINCT session_id) FROM messages").fetchone()[0]
+
+    def count_bytes(self):
+        row = self._connect().execute("SELECT COALESCE(SUM(LENGTH(message)), 0) FROM messages").fetchone()
+        return row[0]
+
+class SQLiteChatMessageHistory(BaseChatMessageHistory):
+    def __init__(self, session_id, db: SQLiteHistoryDB):
+        self.session_id = session_id
+        self.db = db
+
+    @property
+    def messages(self):
+        return self.db.read(self.session_id)
+
+    def add_messages(self, messages) -> None:
+        self.db.append(self.session_id, list(messages))
+
+    def clear(self) -> None:
+        self.db.clear(self.session_id)
+
+class SQLiteHistoryStore:
+    # BoundedHistoryStore 와 같은 인터페이스를 제공하는 디스크 기반 저장소
+    # 재시작 후에도 히스토리가 유지되므로 별도의 복원 경로가 필요하지 않습니다.
+
+    def __init__(self, path=HISTORY_SQLITE_PATH):
+        self.db = SQLiteHistoryDB(path)
+
+    def get(self, session_id) -> BaseChatMessageHistory:
+        return SQLiteChatMessageHistory(session_id, self.db)
+
+    def __getitem__(self, session_id):
+        return self.get(session_id)
+
+    def __setitem__(self, session_id, history):
+        self.db.replace(session_id, history.messages)
+
+    def __delitem__(self, session_id):
+        self.db.clear(session_id)
+
+    def __contains__(self, session_id):
+        return self.db.has_session(session_id)
+
+    def __len__(self):
+        return self.db.count_sessions()
+
+    def pop(self, session_id, default=None):
+        if not self.db.has_session(session_id):
+            return default
+        history = ChatMessageHistory(messages=self.db.read(session_id))
+        self.db.clear(session_id)
+        return history
+
+    def register_source(self, session_id, path):
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "backend": "sqlite",
+            "sessions": self.db.count_sessions(),
+            "bytes": self.db.count_bytes(),
+            "expired_sessions": self.db.expired_sessions,
+        }
+
+# ======================== 저장소 선택 ========================
+def create_history_store(backend=None):
+    backend = (backend or HISTORY_BACKEND).lower()
+    if backend == "sqlite":
+        return SQLiteHistoryStore()
+    if backend == "memory":
+        return BoundedHistoryStore()
+    raise ValueError(f"알 수 없는 HISTORY_BACKEND 값입니다: {backend}")
@@ -0,0 +1,96 @@
+from langchain_core.messages import SystemMessage
+from functools import lru_cache
+import re
+import os
+
+# ======================== 설정 ========================
+# 대화 히스토리에 사용할 최대 토큰 수와, 요약하지 않고 그대로 유지할 최근 턴 수
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "6000"))
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "4"))
+SUMMARY_LINE_CHARS = 120
+
+# 이전 버전에서 질문마다 스크립트 전체를 붙여 저장하던 형식
+LEGACY_SCRIPT_PREFIX = re.compile(r"^\[현재 상담 스크립트 요약\].*?\[질문\]\n", re.DOTALL)
+
+# ======================== 토큰 계산 ========================
+@lru_cache(maxsize=1)
+def _get_encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    # tiktoken 이 없을 때의 근사치 (한글은 대략 1.5자당 1토큰)
+    return int(len(text) / 1.5) + 1
+
+def count_message_tokens(messages) -> int:
+    return sum(count_tokens(message.content) + 4 for message in messages)
+
+# ======================== 히스토리 정리 ========================
+def _clean_messages(messages, script_context):
+    cleaned = []
+    for message in messages:
+        if message.type == "ai" and script_context and message.content.strip() == script_context.strip():
+            # 스크립트는 프롬프트에 별도로 포함되므로 히스토리에서는 제외
+            continue
+        if message.type == "human" and LEGACY_SCRIPT_PREFIX.match(message.content):
+            message = message.model_copy(update={"content": LEGACY_SCRIPT_PREFIX.sub("", message.content)})
+        cleaned.append(message)
+    return cleaned
+
+def _split_turns(messages):
+    turns = []
+    for message in messages:
+        if message.type == "human" or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+def _first_line(text):
+    for line in text.splitlines():
+        line = line.strip().lstrip("#>-• ").strip()
+        if line:
+            return line[:SUMMARY_LINE_CHARS]
+    return ""
+
+def _summarize_turn(turn):
+    lines = []
+    for message in turn:
+        if message.type == "human":
+            lines.append(f"- 상담원 요청: {_first_line(message.content)}")
+        elif message.type == "ai":
+            # 제안 멘트가 있으면 멘트를, 없으면 답변 첫 줄을 요약으로 사용
+            quotes = [line[2:].strip() for line in message.content.splitlines() if line.startswith("> ")]
+            summary = quotes[0][:SUMMARY_LINE_CHARS] if quotes else _first_line(message.content)
+            lines.append(f"- 제안 멘트: {summary}" if quotes else f"- 답변 요지: {summary}")
+    return lines
+
+def _summary_message(summary_lines):
+    return SystemMessage(content="[이전 대화 요약]\n" + "\n".join(summary_lines))
+
+def trim_history(messages, script_context="", budget=HISTORY_TOKEN_BUDGET, keep_turns=HISTORY_KEEP_TURNS):
+    # 1) 스크립트 중복 제거 2) 최근 keep_turns 턴은 그대로 유지 3) 이전 턴은 요약 메시지로 접기
+    # 4) 예산을 넘으면 오래된 턴부터 요약으로 옮기고, 그래도 넘으면 오래된 요약부터 버림
+    turns = _split_turns(_clean_messages(messages, script_context))
+    split = max(0, len(turns) - keep_turns)
+    older, recent = turns[:split], turns[split:]
+
+    summary_lines = [line for turn in older for line in _summarize_turn(turn)]
+
+    def build():
+        result = [_summary_message(summary_lines)] if summary_lines else []
+        return result + [message for turn in recent for message in turn]
+
+    trimmed = build()
+    while count_message_tokens(trimmed) > budget and len(recent) > 1:
+        summary_lines.extend(_summarize_turn(recent.pop(0)))
+        trimmed = build()
+    while count_message_tokens(trimmed) > budget and summary_lines:
+        summary_lines.pop(0)
+        trimmed = build()
+    return trimmed
@@ -0,0 +1,156 @@
+from contextlib import asynccontextmanager
+import threading
+import asyncio
+import weakref
+import queue
+import json
+import os
+
+# ======================== 설정 ========================
+# LLM_ASYNC=1 이면 Streamlit 화면의 LLM 호출도 공용 이벤트 루프에서 비동기로 처리
+LLM_ASYNC_ENABLED = os.getenv("LLM_ASYNC", "0") == "1"
+# 모델별 최대 동시 호출 수 (기본값 / 모델별 개별 설정은 JSON: {"gpt-4.1-mini": 32})
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_MODEL_CONCURRENCY = json.loads(os.getenv("LLM_MODEL_CONCURRENCY", "{}"))
+
+# ======================== 공용 이벤트 루프 ========================
+class AsyncLoopRunner:
+    # 프로세스 전체에서 하나의 이벤트 루프를 백그라운드 스레드로 실행하고,
+    # 동기 코드(Streamlit 스크립트 스레드)에서 코루틴 / 비동기 스트림을 사용할 수 있게 연결
+
+    _DONE = object()
+
+    def __init__(self):
+        self._loop = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self):
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="llm-async-loop", daemon=True)
+                thread.start()
+                self._loop = loop
+            return self._loop
+
+    def run(self, coro, timeout=None):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def iterate(self, async_iterable):
+        # 비동기 스트림의 각 항목을 받는 즉시 동기 제너레이터로 전달
+        items = queue.Queue()
+
+        async def pump():
+            try:
+                async for item in async_iterable:
+                    items.put((True, item))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                items.put((False, e))
+            finally:
+                items.put((True, self._DONE))
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self.loop)
+        try:
+            while True:
+                ok, item = items.get()
+                if item is self._DONE:
+                    break
+                if not ok:
+                    raise item
+                yield item
+        finally:
+            # 소비하는 쪽이 중간에 멈추면 비동기 작업도 함께 취소
+            future.cancel()
+
+# ======================== 모델별 동시 호출 제한 ========================
+class ModelLimiter:
+    # 모델(업스트림)별 세마포어로 동시 호출 수를 제한하고 대기 / 처리 현황을 집계
+    # 세마포어는 이벤트 루프마다 따로 만들어지므로 여러 루프에서 사용해도 안전합니다.
+
+    def __init__(self, default_limit=LLM_MAX_CONCURRENCY, model_limits=None):
+        self.default_limit = default_limit
+        self.model_limits = dict(LLM_MODEL_CONCURRENCY if model_limits is None else model_limits)
+        self._semaphores = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def limit_for(self, model):
+        return int(self.model_limits.get(model, self.default_limit))
+
+    def _semaphore(self, model):
+        loop = asyncio.get_running_loop()
+        per_loop = self._semaphores.setdefault(loop, {})
+        if model not in per_loop:
+            per_loop[model] = asyncio.Semaphore(self.limit_for(model))
+        return per_loop[model]
+
+    def _model_stats(self, model):
+        if model not in self._stats:
+            self._stats[model] = {"in_flight": 0, "waiting": 0, "peak_in_flight": 0, "completed": 0}
+        return self._stats[model]
+
+    @asynccontextmanager
+    async def acquire(self, model):
+        semaphore = self._semaphore(model)
+        with self._lock:
+            self._model_stats(model)["waiting"] += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            with self._lock:
+                self._model_stats(model)["waiting"] -= 1
+        with self._lock:
+            stats = self._model_stats(model)
+            stats["in_flight"] += 1
+            stats["peak_in_flight"] = max(stats["peak_in_flight"], stats["in_flight"])
+        try:
+            yield
+        finally:
+            semaphore.release()
+            with self._lock:
+                stats = self._model_stats(model)
+                stats["in_flight"] -= 1
+                stats["completed"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                model: {**stats, "limit": self.limit_for(model)}
+                for model, stats in self._stats.items()
+            }
+
+# ======================== 병렬 스트림 병합 ========================
+async def merge_async_streams(streams):
+    # 여러 비동기 스트림을 동시에 실행하고, 도착하는 순서대로 (스트림 번호, 항목)을 전달
+    # 한 스트림에서 예외가 발생하면 나머지 스트림을 취소하고 예외를 그대로 전달
+    merged = asyncio.Queue()
+    done = object()
+
+    async def pump(index, stream):
+        try:
+            async for item in stream:
+                await merged.put((index, item, None))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await merged.put((index, None, e))
+        finally:
+            await merged.put((index, done, None))
+
+    tasks = [asyncio.create_task(pump(index, stream)) for index, stream in enumerate(streams)]
+    remaining = len(tasks)
+    try:
+        while remaining:
+            index, item, error = await merged.get()
+            if error is not None:
+                raise error
+            if item is done:
+                remaining -= 1
+                continue
+            yield index, item
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,109 @@
+from langchain_openai import ChatOpenAI
+import threading
+import asyncio
+import weakref
+import httpx
+import os
+
+try:
+    import h2  # noqa: F401  (requirements.txt 의 httpx[http2] 로 설치됨)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# ======================== 설정 ========================
+# 모델별 연결 풀 크기 / keep-alive 유지 시간(초)
+LLM_POOL_MAX_CONNECTIONS = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "100"))
+LLM_POOL_MAX_KEEPALIVE = int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+# 연결 / 응답(스트리밍 청크 사이) 대기 시간(초)
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "60"))
+# HTTP/2 사용 (h2 패키지가 없는 개발 환경에서는 HTTP/1.1 keep-alive 로 동작)
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "1") == "1"
+
+def client_timeout():
+    return httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+
+def client_limits():
+    return httpx.Limits(
+        max_connections=LLM_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+    )
+
+# ======================== 이벤트 루프별 연결 풀 ========================
+class LoopLocalAsyncTransport(httpx.AsyncBaseTransport):
+    # 비동기 연결은 만들어진 이벤트 루프에 묶여 다른 루프에서 쓰면 "Event loop is closed" 오류가 나므로
+    # 실행 중인 이벤트 루프마다 연결 풀을 따로 둠 (루프가 정리되면 해당 연결 풀도 함께 정리)
+
+    def __init__(self, **transport_kwargs):
+        self.transport_kwargs = transport_kwargs
+        self._transports = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _transport(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            transport = self._transports.get(loop)
+            if transport is None:
+                transport = self._transports[loop] = httpx.AsyncHTTPTransport(**self.transport_kwargs)
+            return transport
+
+    async def handle_async_request(self, request):
+        return await self._transport().handle_async_request(request)
+
+    async def aclose(self):
+        # 현재 루프의 연결 풀만 닫을 수 있음
+        with self._lock:
+            transport = self._transports.pop(asyncio.get_running_loop(), None)
+        if transport is not None:
+            await transport.aclose()
+
+# ======================== 모델 레지스트리 ========================
+class ModelRegistry:
+    # 모델별로 ChatOpenAI 와 연결 풀(httpx 동기 / 비동기 클라이언트)을 하나씩 만들어 프로세스 전체에서 재사용
+    # - 다른 모델을 요청해도 기존 모델의 연결 풀은 그대로 유지되어 TLS 연결을 다시 맺지 않음
+    # - 비동기 클라이언트는 이벤트 루프별로 연결 풀을 따로 사용 (공용 루프 / uvicorn 워커 루프 / 테스트용 새 루프 모두 가능)
+
+    def __init__(self, callbacks=None, http2=LLM_HTTP2, **model_kwargs):
+        self.callbacks = list(callbacks or [])
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.model_kwargs = model_kwargs
+        self._models = {}
+        self._clients = {}
+        self._lock = threading.Lock()
+        if http2 and not HTTP2_AVAILABLE:
+            print("⚠️ h2 패키지가 없어 HTTP/1.1 keep-alive 로 연결합니다.")
+
+    def get(self, model) -> ChatOpenAI:
+        with self._lock:
+            if model not in self._models:
+                http_client = httpx.Client(http2=self.http2, limits=client_limits(), timeout=client_timeout())
+                http_async_client = httpx.AsyncClient(
+                    transport=LoopLocalAsyncTransport(http2=self.http2, limits=client_limits()),
+                    timeout=client_timeout(),
+                )
+                self._clients[model] = (http_client, http_async_client)
+                self._models[model] = ChatOpenAI(
+                    model=model,
+                    http_client=http_client,
+                    http_async_client=http_async_client,
+                    timeout=client_timeout(),
+                    stream_usage=True,
+                    callbacks=self.callbacks or None,
+                    **self.model_kwargs,
+                )
+            return self._models[model]
+
+    def models(self):
+        with self._lock:
+            return list(self._models)
+
+    def close(self):
+        # 동기 클라이언트만 닫음 (비동기 클라이언트는 이벤트 루프 종료 시 함께 정리)
+        with self._lock:
+            for http_client, _ in self._clients.values():
+                http_client.close()
+            self._models.clear()
+            self._clients.clear()
@@ -0,0 +1,251 @@
+from langchain_core.callbacks import BaseCallbackHandler
+from collections import OrderedDict, deque
+import threading
+import asyncio
+import time
+
+# ======================== 사용량 추출 ========================
+def extract_token_usage(response):
+    # LLMResult 에서 {"prompt_tokens", "completion_tokens", "cached_tokens"} 추출 — 사용량 정보가 없으면 None
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                details = usage.get("input_token_details") or {}
+                return {
+                    "prompt_tokens": usage.get("input_tokens", 0),
+                    "completion_tokens": usage.get("output_tokens", 0),
+                    "cached_tokens": details.get("cache_read", 0) or 0,
+                }
+
+    token_usage = (response.llm_output or {}).get("token_usage") or {}
+    if token_usage:
+        details = token_usage.get("prompt_tokens_details") or {}
+        return {
+            "prompt_tokens": token_usage.get("prompt_tokens", 0),
+            "completion_tokens": token_usage.get("completion_tokens", 0),
+            "cached_tokens": details.get("cached_tokens", 0) or 0,
+        }
+    return None
+
+def extract_prompt_usage(response):
+    # (프롬프트 토큰, 캐시된 프롬프트 토큰) — 사용량 정보가 없으면 None
+    usage = extract_token_usage(response)
+    return None if usage is None else (usage["prompt_tokens"], usage["cached_tokens"])
+
+# ======================== 프롬프트 캐시 집계 ========================
+class PromptCacheTracker(BaseCallbackHandler):
+    # 요청별 프롬프트 토큰 중 공급자 측 프롬프트 캐시에서 처리된 토큰 수를 기록하고 작업(task)별로 집계
+    # 작업 이름은 체인 metadata 의 "task" 값 (없으면 "llm")
+
+    run_inline = True
+
+    def __init__(self, verbose=True):
+        self.verbose = verbose
+        self._lock = threading.Lock()
+        self._tasks = {}
+        self._stats = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        with self._lock:
+            self._tasks[run_id] = (metadata or {}).get("task", "llm")
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        with self._lock:
+            self._tasks[run_id] = (metadata or {}).get("task", "llm")
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            self._tasks.pop(run_id, None)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            task = self._tasks.pop(run_id, "llm")
+        usage = extract_prompt_usage(response)
+        if usage is None:
+            return
+        prompt_tokens, cached_tokens = usage
+        with self._lock:
+            stats = self._stats.setdefault(task, {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0})
+            stats["requests"] += 1
+            stats["prompt_tokens"] += prompt_tokens
+            stats["cached_tokens"] += cached_tokens
+        if self.verbose:
+            ratio = cached_tokens / prompt_tokens if prompt_tokens else 0.0
+            print(f"💾 [{task}] 프롬프트 토큰 {prompt_tokens} (캐시 {cached_tokens}, {ratio:.0%})")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                task: {
+                    **stats,
+                    "uncached_tokens": stats["prompt_tokens"] - stats["cached_tokens"],
+                    "cached_ratio": stats["cached_tokens"] / stats["prompt_tokens"] if stats["prompt_tokens"] else 0.0,
+                }
+                for task, stats in self._stats.items()
+            }
+
+# ======================== 작업별 응답 시간 ========================
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+class LatencyTracker(BaseCallbackHandler):
+    # LLM 호출마다 작업(task) / 모델 / 세션 / 첫 토큰까지의 시간(TTFT) / 전체 응답 시간 / 토큰 사용량을 기록
+    # - 작업별로 최근 window 개의 요청만 보관해 p50 / p95 를 계산 (헤지 요청 지연 계산에도 사용)
+    # - 호출 기록(dict)은 sinks 의 각 함수로 전달 (JSONL 파일, Prometheus 집계 등: llm_telemetry.py)
+    # - 헤지 경쟁에서 진 시도(mark_hedge_lost)는 status "hedge_lost" 로 기록하고 응답 시간 / 토큰 집계에서 제외
+    # - 응답 캐시 적중(record_cache_hit)은 LLM 호출 없이 응답한 호출로 sinks 에만 전달 (cache_hit=True, 토큰 없음)
+
+    run_inline = True
+
+    def __init__(self, window=1000, verbose=True, sinks=None):
+        self.window = window
+        self.verbose = verbose
+        self.sinks = list(sinks or [])
+        self._lock = threading.Lock()
+        self._runs = {}
+        self._stats = {}
+        self._hedge_lost = OrderedDict()
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+
+    def _start(self, run_id, metadata, kwargs):
+        metadata = metadata or {}
+        params = kwargs.get("invocation_params") or {}
+        model = metadata.get("ls_model_name") or params.get("model") or params.get("model_name") or ""
+        with self._lock:
+            self._runs[run_id] = {
+                "task": metadata.get("task", "llm"),
+                "model": model,
+                # RunnableWithMessageHistory 의 configurable.session_id 는 metadata 로도 전달됨
+                "session_id": metadata.get("session_id"),
+                # llm_resilience.ResilientLLM 이 시도마다 붙이는 ID / 헤지 요청 여부
+                "attempt": metadata.get("llm_attempt"),
+                "hedge": bool(metadata.get("hedge")),
+                "start": time.perf_counter(),
+                "first_token": None,
+            }
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, metadata, kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, metadata, kwargs)
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is not None and run["first_token"] is None:
+                run["first_token"] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._finish(run_id, "ok", usage=extract_token_usage(response))
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        # 헤지 요청에서 진 쪽처럼 호출한 쪽이 중단한 요청은 응답 시간 집계에서 제외
+        if isinstance(error, (GeneratorExit, asyncio.CancelledError)):
+            self._finish(run_id, "cancelled")
+        else:
+            self._finish(run_id, "error", error=error)
+
+    def mark_hedge_lost(self, attempt_id):
+        # 헤지 경쟁에서 진 시도 — 끝날 때 status 를 hedge_lost 로 기록
+        with self._lock:
+            self._hedge_lost[attempt_id] = True
+            while len(self._hedge_lost) > 10000:
+                self._hedge_lost.popitem(last=False)
+
+    def _finish(self, run_id, status, usage=None, error=None):
+        now = time.perf_counter()
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+            if run is None:
+                return
+            if run["attempt"] is not None and self._hedge_lost.pop(run["attempt"], None):
+                status = "hedge_lost"
+            total = now - run["start"]
+            ttft = (run["first_token"] or now) - run["start"]
+            if status not in ("cancelled", "hedge_lost"):
+                stats = self._stats.setdefault(run["task"], {
+                    "model": run["model"], "requests": 0, "errors": 0,
+                    "latency": deque(maxlen=self.window), "ttft": deque(maxlen=self.window),
+                })
+                stats["model"] = run["model"]
+                stats["requests"] += 1
+                if status == "error":
+                    stats["errors"] += 1
+                else:
+                    stats["latency"].append(total)
+                    stats["ttft"].append(ttft)
+        if self.verbose and status == "ok":
+            print(f"⏱️ [{run['task']}] {run['model']} 첫 토큰 {ttft:.2f}s / 전체 {total:.2f}s")
+        if self.sinks:
+            self._emit({
+                "ts": round(time.time(), 3),
+                "task": run["task"],
+                "model": run["model"],
+                "session_id": run["session_id"],
+                "status": status,
+                "cache_hit": False,
+                "hedge": run["hedge"],
+                "ttft": round(ttft, 4) if run["first_token"] is not None else None,
+                "latency": round(total, 4),
+                "prompt_tokens": (usage or {}).get("prompt_tokens"),
+                "completion_tokens": (usage or {}).get("completion_tokens"),
+                "cached_tokens": (usage or {}).get("cached_tokens"),
+                "error": type(error).__name__ if error is not None else None,
+            })
+
+    def record_cache_hit(self, task, model, session_id, latency):
+        # 응답 캐시에서 바로 돌려준 호출 — 헤지 지연 계산(첫 토큰 p95)에는 넣지 않음
+        if self.sinks:
+            self._emit({
+                "ts": round(time.time(), 3),
+                "task": task,
+                "model": model,
+                "session_id": session_id,
+                "status": "ok",
+                "cache_hit": True,
+                "hedge": False,
+                "ttft": round(latency, 4),
+                "latency": round(latency, 4),
+                "prompt_tokens": None,
+                "completion_tokens": None,
+                "cached_tokens": None,
+                "error": None,
+            })
+
+    def _emit(self, record):
+        for sink in self.sinks:
+            try:
+                sink(record)
+            except Exception as e:
+                print("⚠️ 호출 기록 저장 실패:", e)
+
+    def ttft_percentile(self, task, q, min_samples=1):
+        # 기록이 min_samples 보다 적으면 None
+        with self._lock:
+            stats = self._stats.get(task)
+            if stats is None or len(stats["ttft"]) < min_samples:
+                return None
+            return percentile(stats["ttft"], q)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                task: {
+                    "model": stats["model"],
+                    "requests": stats["requests"],
+                    "errors": stats["errors"],
+                    "latency_p50": percentile(stats["latency"], 50),
+                    "latency_p95": percentile(stats["latency"], 95),
+                    "ttft_p50": percentile(stats["ttft"], 50),
+                    "ttft_p95": percentile(stats["ttft"], 95),
+                }
+                for task, stats in self._stats.items()
+            }
@@ -0,0 +1,448 @@
+from langchain_core.runnables import Runnable, ensure_config
+import contextvars
+import threading
+import asyncio
+import random
+import queue
+import time
+import uuid
+import os
+import httpx
+import openai
+
+# ======================== 설정 ========================
+# 재시도 횟수 (첫 토큰을 받기 전에 난 오류만 재시도) / 지수 백오프 기준·최대 대기(초, full jitter)
+LLM_RETRY_MAX = int(os.getenv("LLM_RETRY_MAX", "2"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "8"))
+# LLM_HEDGE=1 이면 첫 토큰이 작업별 p95 시간 안에 오지 않을 때 같은 요청을 한 번 더 보내 먼저 응답한 쪽을 사용
+# (p95 를 계산할 기록이 LLM_HEDGE_MIN_SAMPLES 보다 적으면 LLM_HEDGE_DELAY 초 사용)
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE", "0") == "1"
+LLM_HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "3"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+# 모델별 연속 실패 LLM_BREAKER_FAILURES 회면 LLM_BREAKER_RESET 초 동안 요청을 바로 실패 처리
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+
+RETRYABLE_STATUS = {408, 409, 429}
+
+# 재시도 / 헤지 / 차단 현황 (여러 스레드 / 이벤트 루프에서 갱신하므로 count_stat() 으로만 증가)
+resilience_stats = {
+    "calls": 0,
+    "retries": 0,
+    "hedges": 0,
+    "hedge_wins": 0,
+    "deadline_exceeded": 0,
+    "circuit_rejected": 0,
+}
+_stats_lock = threading.Lock()
+
+def count_stat(name):
+    with _stats_lock:
+        resilience_stats[name] += 1
+
+def get_resilience_stats() -> dict:
+    with _stats_lock:
+        return dict(resilience_stats)
+
+# ======================== 오류 분류 ========================
+class DeadlineExceeded(TimeoutError):
+    pass
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+def error_status(error):
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+def is_retryable(error):
+    # 429 / 408 / 409 / 5xx 와 연결·시간 초과 오류만 재시도 (400 등 요청 자체의 오류는 바로 실패)
+    status = error_status(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS or status >= 500
+    return isinstance(error, (openai.APIConnectionError, httpx.TransportError, ConnectionError)) or (
+        isinstance(error, TimeoutError) and not isinstance(error, DeadlineExceeded)
+    )
+
+def retry_after(error):
+    # 429 응답의 Retry-After(초) 헤더
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt, error=None, base=LLM_BACKOFF_BASE, cap=LLM_BACKOFF_MAX):
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    suggested = retry_after(error) if error is not None else None
+    return max(delay, min(cap, suggested)) if suggested else delay
+
+# ======================== 서킷 브레이커 ========================
+class CircuitBreaker:
+    # closed → (연속 실패) → open → (reset_timeout 경과) → half-open: 요청 하나만 통과시켜 결과로 닫거나 다시 엶
+
+    def __init__(self, name, failure_threshold=LLM_BREAKER_FAILURES, reset_timeout=LLM_BREAKER_RESET):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._probing or time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if self._probing or time.monotonic() - self._opened_at < self.reset_timeout:
+                count_stat("circuit_rejected")
+                raise CircuitOpenError(f"{self.name} 요청 차단 중 (연속 실패 {self._failures}회)")
+            self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or (self._opened_at is None and self._failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                self._probing = False
+                print(f"⚠️ [{self.name}] 연속 실패 {self._failures}회 → {self.reset_timeout:.0f}초 동안 요청 차단")
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(model):
+    with _breakers_lock:
+        if model not in _breakers:
+            _breakers[model] = CircuitBreaker(model)
+        return _breakers[model]
+
+# ======================== 시도 관리 ========================
+_END = object()
+
+class _ThreadAttempts:
+    # 원 요청과 헤지 요청의 스트림을 각각 스레드에서 읽어 하나의 큐로 모음 (동기 호출용)
+    # 스레드에서 읽으므로 응답이 멈춰도 호출한 쪽은 마감 시간에 맞춰 빠져나올 수 있음
+
+    def __init__(self, open_stream):
+        self.open_stream = open_stream
+        self.events = queue.Queue()
+        self.cancelled = set()
+        self.ids = []
+        self.count = 0
+
+    def start(self):
+        index = self.count
+        self.count += 1
+        self.ids.append(uuid.uuid4().hex)
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(self._pump, index), name="llm-attempt", daemon=True).start()
+        return index
+
+    def _pump(self, index):
+        stream = None
+        try:
+            stream = self.open_stream(self.ids[index], index > 0)
+            for chunk in stream:
+                if index in self.cancelled:
+                    return
+                self.events.put((index, "chunk", chunk))
+            self.events.put((index, "end", None))
+        except Exception as e:
+            self.events.put((index, "error", e))
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+
+    def get(self, until):
+        # until(monotonic) 까지 다음 이벤트를 기다림 (시간이 지나면 None)
+        timeout = None if until is None else max(0.0, until - time.monotonic())
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def cancel(self, index):
+        self.cancelled.add(index)
+
+    def cancel_all(self):
+        self.cancelled.update(range(self.count))
+
+class _TaskAttempts:
+    # 비동기 버전: 각 시도를 이벤트 루프의 태스크로 실행
+
+    def __init__(self, open_stream):
+        self.open_stream = open_stream
+        self.events = asyncio.Queue()
+        self.tasks = {}
+        self.ids = []
+
+    def start(self):
+        index = len(self.tasks)
+        self.ids.append(uuid.uuid4().hex)
+        self.tasks[index] = asyncio.ensure_future(self._pump(index))
+        return index
+
+    async def _pump(self, index):
+        try:
+            async for chunk in self.open_stream(self.ids[index], index > 0):
+                self.events.put_nowait((index, "chunk", chunk))
+            self.events.put_nowait((index, "end", None))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.events.put_nowait((index, "error", e))
+
+    async def get(self, until):
+        timeout = None if until is None else max(0.0, until - time.monotonic())
+        try:
+            return await asyncio.wait_for(self.events.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def cancel(self, index):
+        self.tasks[index].cancel()
+
+    def cancel_all(self):
+        for task in self.tasks.values():
+            task.cancel()
+
+# ======================== 재시도 / 헤지 래퍼 ========================
+class ResilientLLM(Runnable):
+    # LLM Runnable 을 감싸 작업별 마감 시간, 재시도(지수 백오프 + jitter), 헤지 요청, 서킷 브레이커를 적용
+    # - 재시도 / 헤지는 첫 토큰을 받기 전까지만 (이미 화면에 나간 내용이 중복되지 않도록)
+    # - 마감 시간은 재시도와 스트리밍을 포함한 전체 호출 시간
+    # - 헤지 지연은 latency(llm_metrics.LatencyTracker)의 작업별 첫 토큰 p95
+    # - 시도마다 metadata 에 llm_attempt(시도 ID) / hedge 를 붙이고, 헤지 경쟁에서 진 시도는 latency 에 알려
+    #   호출 기록 / 지표에서 한 번의 호출이 두 번 집계되지 않도록 함
+
+    def __init__(self, llm, model, task, deadline=None, max_retries=LLM_RETRY_MAX, hedge=LLM_HEDGE_ENABLED, breaker=None, latency=None):
+        self.llm = llm
+        self.model = model
+        self.task = task
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.hedge = hedge
+        self.breaker = breaker or get_breaker(model)
+        self.latency = latency
+
+    @property
+    def InputType(self):
+        return self.llm.InputType
+
+    @property
+    def OutputType(self):
+        return self.llm.OutputType
+
+    def hedge_delay(self):
+        if self.latency is not None:
+            p95 = self.latency.ttft_percentile(self.task, 95, min_samples=LLM_HEDGE_MIN_SAMPLES)
+            if p95 is not None:
+                return p95
+        return LLM_HEDGE_DELAY
+
+    def _on_error(self, error, attempt, deadline):
+        # 실패를 기록하고 재시도할 대기 시간을 반환 (재시도하지 않으면 None)
+        if isinstance(error, DeadlineExceeded):
+            count_stat("deadline_exceeded")
+        if is_retryable(error) or isinstance(error, DeadlineExceeded):
+            self.breaker.record_failure()
+        else:
+            # 요청 자체의 오류(400 등)는 업스트림이 응답한 것이므로 장애로 보지 않음
+            self.breaker.record_success()
+        if attempt >= self.max_retries or not is_retryable(error):
+            return None
+        delay = backoff_delay(attempt, error)
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            return None
+        count_stat("retries")
+        print(f"⚠️ [{self.task}] {self.model} 재시도 {attempt + 1}/{self.max_retries} ({delay:.1f}초 후): {error}")
+        return delay
+
+    def _hedge_at(self):
+        return time.monotonic() + self.hedge_delay() if self.hedge else None
+
+    def _deadline_error(self):
+        return DeadlineExceeded(f"[{self.task}] {self.model} 응답 마감 시간 {self.deadline:.0f}초 초과")
+
+    def _on_winner(self, index, pending, attempts):
+        for other in pending - {index}:
+            if self.latency is not None:
+                self.latency.mark_hedge_lost(attempts.ids[other])
+            attempts.cancel(other)
+        if index > 0:
+            count_stat("hedge_wins")
+
+    @staticmethod
+    def _attempt_config(config, attempt_id, hedge):
+        config = ensure_config(config)
+        return {**config, "metadata": {**config.get("metadata", {}), "llm_attempt": attempt_id, "hedge": hedge}}
+
+    # ---------------- 동기 ----------------
+    def _first_event(self, attempts, deadline):
+        # 가장 먼저 도착한 첫 토큰(또는 빈 응답)의 시도 번호와 내용을 반환
+        pending = {attempts.start()}
+        hedge_at = self._hedge_at()
+        error = None
+        while pending:
+            until = deadline if hedge_at is None or (deadline is not None and deadline < hedge_at) else hedge_at
+            event = attempts.get(until)
+            if event is None:
+                if hedge_at is not None and time.monotonic() >= hedge_at:
+                    hedge_at = None
+                    pending.add(attempts.start())
+                    count_stat("hedges")
+                    continue
+                raise self._deadline_error()
+            index, kind, payload = event
+            if kind == "error":
+                pending.discard(index)
+                error = payload
+                continue
+            self._on_winner(index, pending, attempts)
+            return index, payload if kind == "chunk" else _END
+        raise error
+
+    def _run(self, open_stream):
+        deadline = time.monotonic() + self.deadline if self.deadline else None
+        count_stat("calls")
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            attempts = _ThreadAttempts(open_stream)
+            try:
+                winner, first = self._first_event(attempts, deadline)
+                break
+            except Exception as e:
+                attempts.cancel_all()
+                delay = self._on_error(e, attempt, deadline)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+        self.breaker.record_success()
+
+        try:
+            if first is _END:
+                return
+            yield first
+            while True:
+                event = attempts.get(deadline)
+                if event is None:
+                    count_stat("deadline_exceeded")
+                    raise self._deadline_error()
+                index, kind, payload = event
+                if index != winner:
+                    continue
+                if kind == "chunk":
+                    yield payload
+                elif kind == "end":
+                    return
+                else:
+                    raise payload
+        finally:
+            attempts.cancel_all()
+
+    def invoke(self, input, config=None, **kwargs):
+        return list(self._run(
+            lambda attempt_id, hedge: iter([self.llm.invoke(input, self._attempt_config(config, attempt_id, hedge), **kwargs)])
+        ))[0]
+
+    def stream(self, input, config=None, **kwargs):
+        yield from self._run(
+            lambda attempt_id, hedge: self.llm.stream(input, self._attempt_config(config, attempt_id, hedge), **kwargs)
+        )
+
+    # ---------------- 비동기 ----------------
+    async def _afirst_event(self, attempts, deadline):
+        pending = {attempts.start()}
+        hedge_at = self._hedge_at()
+        error = None
+        while pending:
+            until = deadline if hedge_at is None or (deadline is not None and deadline < hedge_at) else hedge_at
+            event = await attempts.get(until)
+            if event is None:
+                if hedge_at is not None and time.monotonic() >= hedge_at:
+                    hedge_at = None
+                    pending.add(attempts.start())
+                    count_stat("hedges")
+                    continue
+                raise self._deadline_error()
+            index, kind, payload = event
+            if kind == "error":
+                pending.discard(index)
+                error = payload
+                continue
+            self._on_winner(index, pending, attempts)
+            return index, payload if kind == "chunk" else _END
+        raise error
+
+    async def _arun(self, open_stream):
+        deadline = time.monotonic() + self.deadline if self.deadline else None
+        count_stat("calls")
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            attempts = _TaskAttempts(open_stream)
+            try:
+                winner, first = await self._afirst_event(attempts, deadline)
+                break
+            except Exception as e:
+                attempts.cancel_all()
+                delay = self._on_error(e, attempt, deadline)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+        self.breaker.record_success()
+
+        try:
+            if first is _END:
+                return
+            yield first
+            while True:
+                event = await attempts.get(deadline)
+                if event is None:
+                    count_stat("deadline_exceeded")
+                    raise self._deadline_error()
+                index, kind, payload = event
+                if index != winner:
+                    continue
+                if kind == "chunk":
+                    yield payload
+                elif kind == "end":
+                    return
+                else:
+                    raise payload
+        finally:
+            attempts.cancel_all()
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        async def single(attempt_id, hedge):
+            yield await self.llm.ainvoke(input, self._attempt_config(config, attempt_id, hedge), **kwargs)
+
+        return [output async for output in self._arun(single)][0]
+
+    async def astream(self, input, config=None, **kwargs):
+        async for chunk in self._arun(
+            lambda attempt_id, hedge: self.llm.astream(input, self._attempt_config(config, attempt_id, hedge), **kwargs)
+        ):
+            yield chunk
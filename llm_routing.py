@@ -0,0 +1,62 @@
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Dict, Optional
+import json
+import os
+
+# ======================== 설정 ========================
+# 작업별 모델 라우팅 (우선순위: LLM_ROUTES > LLM_ROUTES_FILE > 기본값, 작업 단위로 덮어씀)
+# 예) LLM_ROUTES='{"chat": {"model": "gpt-4.1-nano", "max_tokens": 800}}'
+LLM_ROUTES_FILE = os.getenv("LLM_ROUTES_FILE", "")
+LLM_ROUTES = os.getenv("LLM_ROUTES", "")
+
+# ======================== 라우팅 스키마 ========================
+class Route(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
+    model: str = Field(min_length=1)
+    max_tokens: Optional[int] = Field(default=None, gt=0)
+    temperature: Optional[float] = Field(default=None, ge=0, le=2)
+    # 재시도와 스트리밍을 포함한 전체 응답 마감 시간(초)
+    deadline: Optional[float] = Field(default=None, gt=0)
+
+    def bind_kwargs(self) -> dict:
+        # 값이 있는 호출 옵션만 전달 (없으면 모델 기본값)
+        return {key: value for key, value in (("max_tokens", self.max_tokens), ("temperature", self.temperature)) if value is not None}
+
+# 6단계 스크립트 / 카카오톡 문자는 기본 모델, 랜덤 고객 정보처럼 가벼운 작업은 빠른 모델
+DEFAULT_ROUTES: Dict[str, Route] = {
+    "script": Route(model="gpt-4.1-mini", deadline=120),
+    "chat": Route(model="gpt-4.1-mini", deadline=90),
+    "kakao": Route(model="gpt-4.1-mini", deadline=60),
+    "kakao_variant": Route(model="gpt-4.1-mini", max_tokens=1200, deadline=60),
+    "customer_profile": Route(model="gpt-4.1-nano", temperature=1.0, deadline=30),
+}
+
+def load_routes(routes_file=LLM_ROUTES_FILE, routes_json=LLM_ROUTES) -> Dict[str, Route]:
+    routes = dict(DEFAULT_ROUTES)
+    overrides = []
+    if routes_file:
+        with open(routes_file, "r", encoding="utf-8") as f:
+            overrides.append(json.load(f))
+    if routes_json:
+        overrides.append(json.loads(routes_json))
+    for override in overrides:
+        for task, route in override.items():
+            # 일부 항목만 지정하면 기존 값(기본값 또는 파일 설정)에 덮어씀
+            base = routes[task].model_dump() if task in routes else {}
+            routes[task] = Route.model_validate({**base, **route})
+    return routes
+
+class ModelRouter:
+    def __init__(self, routes=None, default_task="chat"):
+        self.routes = load_routes() if routes is None else dict(routes)
+        self.default_task = default_task
+
+    def route(self, task) -> Route:
+        return self.routes.get(task) or self.routes[self.default_task]
+
+    def model_for(self, task) -> str:
+        return self.route(task).model
+
+    def table(self) -> dict:
+        return {task: route.model_dump() for task, route in self.routes.items()}
@@ -0,0 +1,183 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging.handlers import RotatingFileHandler
+import threading
+import logging
+import json
+import os
+
+# ======================== 설정 ========================
+# LLM 호출 기록(JSONL) 경로 — 빈 값이면 기록하지 않음 / 파일 크기 기준 교체(최대 크기, 보관 개수)
+LLM_CALL_LOG = os.getenv("LLM_CALL_LOG", "/data/sale/metrics/llm_calls.jsonl")
+LLM_CALL_LOG_MAX_BYTES = int(os.getenv("LLM_CALL_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LLM_CALL_LOG_BACKUPS = int(os.getenv("LLM_CALL_LOG_BACKUPS", "5"))
+# METRICS_PORT 를 지정하면 http://METRICS_HOST:METRICS_PORT/metrics 에서 Prometheus 형식으로 제공
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
+# 응답 시간 히스토그램 구간(초)
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)
+
+# ======================== JSONL 호출 기록 ========================
+class CallLogWriter:
+    # 호출 기록을 한 줄에 하나씩 JSON 으로 추가 (max_bytes 를 넘으면 .1, .2 ... 로 교체)
+
+    def __init__(self, path=LLM_CALL_LOG, max_bytes=LLM_CALL_LOG_MAX_BYTES, backup_count=LLM_CALL_LOG_BACKUPS):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True)
+        self._handler.setFormatter(logging.Formatter("%(message)s"))
+        self._logger = logging.getLogger(f"llm_calls.{path}")
+        self._logger.setLevel(logging.INFO)
+        self._logger.propagate = False
+        self._logger.addHandler(self._handler)
+
+    def __call__(self, record):
+        self._logger.info(json.dumps(record, ensure_ascii=False))
+
+    def close(self):
+        self._logger.removeHandler(self._handler)
+        self._handler.close()
+
+def call_log_files(path=LLM_CALL_LOG):
+    # 교체된 파일(.N ... .1)부터 현재 파일 순서 = 오래된 기록부터
+    directory = os.path.dirname(path) or "."
+    name = os.path.basename(path)
+    backups = []
+    for filename in os.listdir(directory) if os.path.isdir(directory) else []:
+        suffix = filename[len(name) + 1:]
+        if filename.startswith(name + ".") and suffix.isdigit():
+            backups.append((int(suffix), os.path.join(directory, filename)))
+    files = [file for _, file in sorted(backups, reverse=True)]
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+# ======================== Prometheus 집계 ========================
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(**labels):
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+class PrometheusMetrics:
+    # 호출 기록을 작업 / 모델별 카운터와 히스토그램으로 누적해 Prometheus 텍스트 형식으로 출력
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._tokens = {}
+        self._cache_hits = {}
+        self._histograms = {"llm_request_duration_seconds": {}, "llm_time_to_first_token_seconds": {}}
+
+    def __call__(self, record):
+        key = (record["task"], record["model"])
+        with self._lock:
+            status_key = key + (record["status"],)
+            self._requests[status_key] = self._requests.get(status_key, 0) + 1
+            if record.get("cache_hit"):
+                self._cache_hits[key] = self._cache_hits.get(key, 0) + 1
+            if record["status"] != "ok":
+                return
+            for kind in ("prompt_tokens", "completion_tokens", "cached_tokens"):
+                if record.get(kind):
+                    token_key = key + (kind,)
+                    self._tokens[token_key] = self._tokens.get(token_key, 0) + record[kind]
+            self._observe("llm_request_duration_seconds", key, record["latency"])
+            if record.get("ttft") is not None:
+                self._observe("llm_time_to_first_token_seconds", key, record["ttft"])
+
+    def _observe(self, name, key, value):
+        histogram = self._histograms[name].setdefault(key, {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                histogram["counts"][i] += 1
+        histogram["sum"] += value
+        histogram["count"] += 1
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            lines.append("# HELP llm_requests_total LLM calls by task, model and status (ok / error / cancelled / hedge_lost)")
+            lines.append("# TYPE llm_requests_total counter")
+            for (task, model, status), count in sorted(self._requests.items()):
+                lines.append(f"llm_requests_total{_labels(task=task, model=model, status=status)} {count}")
+
+            lines.append("# HELP llm_tokens_total Tokens by task, model and kind (prompt / completion / cached)")
+            lines.append("# TYPE llm_tokens_total counter")
+            for (task, model, kind), count in sorted(self._tokens.items()):
+                lines.append(f"llm_tokens_total{_labels(task=task, model=model, kind=kind.replace('_tokens', ''))} {count}")
+
+            lines.append("# HELP llm_cache_hits_total Calls answered from the response cache without an LLM request")
+            lines.append("# TYPE llm_cache_hits_total counter")
+            for (task, model), count in sorted(self._cache_hits.items()):
+                lines.append(f"llm_cache_hits_total{_labels(task=task, model=model)} {count}")
+
+            for name, histograms in self._histograms.items():
+                lines.append(f"# TYPE {name} histogram")
+                for (task, model), histogram in sorted(histograms.items()):
+                    for bound, count in zip(self.buckets, histogram["counts"]):
+                        lines.append(f"{name}_bucket{_labels(task=task, model=model, le=bound)} {count}")
+                    lines.append(f"{name}_bucket{_labels(task=task, model=model, le='+Inf')} {histogram['count']}")
+                    lines.append(f"{name}_sum{_labels(task=task, model=model)} {histogram['sum']:.6f}")
+                    lines.append(f"{name}_count{_labels(task=task, model=model)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+class MetricsServer:
+    # /metrics 요청에 Prometheus 텍스트를 응답하는 HTTP 서버를 백그라운드 스레드로 실행
+
+    def __init__(self, render, host=METRICS_HOST, port=METRICS_PORT):
+        self.render = render
+        self.host = host
+        self.port = port
+        self._server = None
+
+    def start(self):
+        render = self.render
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_port
+        threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+# ======================== 연결 ========================
+def install_telemetry(tracker, call_log=LLM_CALL_LOG, metrics_port=METRICS_PORT):
+    # tracker(llm_metrics.LatencyTracker)의 호출 기록을 JSONL 파일과 Prometheus 집계로 전달
+    # 파일 / 포트를 사용할 수 없어도 앱은 계속 동작하도록 경고만 출력
+    metrics = PrometheusMetrics()
+    tracker.add_sink(metrics)
+    if call_log:
+        try:
+            tracker.add_sink(CallLogWriter(call_log))
+        except OSError as e:
+            print("⚠️ LLM 호출 기록 파일을 열 수 없습니다:", e)
+    if metrics_port:
+        try:
+            MetricsServer(metrics.render, port=metrics_port).start()
+            print(f"📈 LLM 지표: http://{METRICS_HOST}:{metrics_port}/metrics")
+        except OSError as e:
+            # Streamlit 을 여러 프로세스로 띄우면 두 번째부터는 포트가 이미 사용 중
+            print("⚠️ 지표 서버를 시작할 수 없습니다:", e)
+    return metrics
@@ -0,0 +1,63 @@
+import threading
+import time
+import os
+
+# 로그인 화면은 langchain / OpenAI 클라이언트 없이 바로 그리고,
+# 그동안 백그라운드 스레드에서 LLM 모듈을 불러와 모델별 클라이언트와 체인을 미리 만들어 둠
+# (로그인 후 첫 화면에서 같은 모듈을 import 하면 이미 불러온 것을 그대로 사용하거나, 진행 중이면 끝날 때까지 기다림)
+
+# ======================== 설정 ========================
+LLM_WARMUP_ENABLED = os.getenv("LLM_WARMUP", "1") == "1"
+# 예시 고객 정보 풀도 미리 채울지 여부 — 채우려면 LLM 호출(비용)이 발생하므로 기본은 처음 사용할 때 채움
+LLM_WARMUP_CUSTOMER_POOL = os.getenv("LLM_WARMUP_CUSTOMER_POOL", "0") == "1"
+
+_lock = threading.Lock()
+_thread = None
+_status = {"state": "idle", "seconds": None, "error": None}
+
+def start_warmup():
+    # 여러 번 호출해도 프로세스당 한 번만 실행 (Streamlit 재실행마다 호출해도 됨)
+    global _thread
+    if not LLM_WARMUP_ENABLED:
+        return None
+    with _lock:
+        if _thread is None:
+            _status["state"] = "running"
+            _thread = threading.Thread(target=_run, name="llm-warmup", daemon=True)
+            _thread.start()
+        return _thread
+
+def wait_warmup(timeout=None) -> bool:
+    thread = _thread
+    if thread is not None:
+        thread.join(timeout)
+    return _status["state"] == "done"
+
+def warmup_status() -> dict:
+    with _lock:
+        return dict(_status)
+
+def _run():
+    started = time.perf_counter()
+    try:
+        import sale_core
+
+        # 작업별로 지정된 모델의 클라이언트(연결 풀) 생성
+        for model in sorted({route["model"] for route in sale_core.model_router.table().values()}):
+            sale_core.get_llm(model)
+        sale_core.get_script_chain()
+        sale_core.get_chatbot_chain()
+        sale_core.get_kakao_chain()
+        sale_core.get_kakao_variant_chain()
+        # 예시 고객 정보 풀은 LLM_WARMUP_CUSTOMER_POOL=1 일 때만 미리 채움 (아니면 처음 꺼낼 때 채움)
+        if LLM_WARMUP_CUSTOMER_POOL:
+            sale_core.customer_pool.start()
+    except Exception as e:
+        print("⚠️ LLM 미리 불러오기 실패:", e)
+        with _lock:
+            _status.update(state="error", error=str(e), seconds=time.perf_counter() - started)
+        return
+    elapsed = time.perf_counter() - started
+    with _lock:
+        _status.update(state="done", seconds=elapsed)
+    print(f"⚡ LLM 모듈 / 클라이언트 미리 불러오기 완료 ({elapsed:.2f}s)")
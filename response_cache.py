@@ -0,0 +1,124 @@
+from collections import OrderedDict
+import threading
+import hashlib
+import json
+import time
+import os
+
+# ======================== 설정 ========================
+# 스크립트 응답 캐시는 기본 비활성화 (SCRIPT_CACHE_ENABLED=1 로 사용)
+SCRIPT_CACHE_ENABLED = os.getenv("SCRIPT_CACHE_ENABLED", "0") == "1"
+SCRIPT_CACHE_MAX_ENTRIES = int(os.getenv("SCRIPT_CACHE_MAX_ENTRIES", "256"))
+SCRIPT_CACHE_TTL = float(os.getenv("SCRIPT_CACHE_TTL", str(24 * 60 * 60)))
+# 비워두면 메모리에만 저장, 경로를 지정하면 디스크에도 저장 (여러 프로세스 간 공유)
+SCRIPT_CACHE_DIR = os.getenv("SCRIPT_CACHE_DIR", "")
+
+# ======================== 캐시 키 ========================
+def normalize_field(value) -> str:
+    # 공백/줄바꿈 차이와 대소문자 차이는 같은 입력으로 취급
+    return " ".join(str(value or "").split()).lower()
+
+def make_cache_key(fields: dict, consultant_name: str, prompt_version: str) -> str:
+    payload = {
+        "fields": {key: normalize_field(value) for key, value in sorted(fields.items())},
+        "consultant_name": normalize_field(consultant_name),
+        "prompt_version": prompt_version,
+    }
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+# ======================== 응답 캐시 ========================
+class ResponseCache:
+    # 메모리 LRU + (선택) 디스크 저장소를 사용하는 TTL 캐시
+
+    def __init__(self, max_entries=SCRIPT_CACHE_MAX_ENTRIES, ttl=SCRIPT_CACHE_TTL,
+                 directory=SCRIPT_CACHE_DIR, clock=time.time):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.directory = directory or None
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "disk_hits": 0, "writes": 0, "expired": 0}
+        if self.directory and not os.path.exists(self.directory):
+            os.makedirs(self.directory, exist_ok=True)
+
+    def get(self, key):
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created_at, text = entry
+                if now - created_at <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return text
+                del self._entries[key]
+                self._counters["expired"] += 1
+
+        entry = self._read_disk(key, now)
+        with self._lock:
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            self._counters["hits"] += 1
+            self._counters["disk_hits"] += 1
+            self._put_memory(key, entry)
+            return entry[1]
+
+    def set(self, key, text):
+        entry = (self._clock(), text)
+        with self._lock:
+            self._put_memory(key, entry)
+            self._counters["writes"] += 1
+        self._write_disk(key, entry)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                **self._counters,
+                "entries": len(self._entries),
+                "hit_rate": self._counters["hits"] / lookups if lookups else 0.0,
+            }
+
+    # ----------------- 내부 처리 -------------------
+    def _put_memory(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _disk_path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _read_disk(self, key, now):
+        if not self.directory:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if now - data.get("created_at", 0) > self.ttl:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            with self._lock:
+                self._counters["expired"] += 1
+            return None
+        return data["created_at"], data["text"]
+
+    def _write_disk(self, key, entry):
+        if not self.directory:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"created_at": entry[0], "text": entry[1]}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print("🔥 스크립트 캐시 저장 실패:", e)
@@ -0,0 +1,604 @@
+# Streamlit 에 의존하지 않는 상담 지원 핵심 로직 (프롬프트 / 체인 / 모델 호출 / 세션 히스토리)
+# 화면(llm_sale.py, chatbot_sale.py)과 API 서버(api_sale.py)가 함께 사용합니다.
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables import RunnablePassthrough
+from langchain_core.runnables.history import RunnableWithMessageHistory
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import HumanMessage, AIMessage
+from functools import lru_cache
+from history_store import create_history_store
+from history_window import trim_history, count_tokens, count_message_tokens
+from response_cache import ResponseCache, make_cache_key, SCRIPT_CACHE_ENABLED
+from customer_pool import CustomerProfilePool, CustomerProfileBatch, parse_customer_profiles, profile_parse_stats
+from llm_async import AsyncLoopRunner, ModelLimiter, merge_async_streams
+from llm_metrics import PromptCacheTracker, LatencyTracker
+from llm_clients import ModelRegistry
+from llm_routing import ModelRouter
+from llm_telemetry import install_telemetry
+from llm_resilience import ResilientLLM, CircuitOpenError, DeadlineExceeded, LLM_BREAKER_RESET
+import json
+import time
+import os
+from dotenv import load_dotenv
+
+# ======================== 설정 ========================
+load_dotenv(dotenv_path=".envfile", override=True)
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+os.environ["OPENAI_API_KEY"] = OPENAI_API_KEY
+
+# 카카오톡 메시지 3가지 유형을 동시에 생성 (KAKAO_PARALLEL=1)
+KAKAO_PARALLEL = os.getenv("KAKAO_PARALLEL", "0") == "1"
+
+# ======================== 전역 저장소 ========================
+# HISTORY_BACKEND=memory (기본, HISTORY_MAX_SESSIONS / HISTORY_MAX_BYTES / HISTORY_IDLE_TTL 로 제한)
+# HISTORY_BACKEND=sqlite (HISTORY_SQLITE_PATH 파일에 저장, 재시작 및 여러 프로세스 간 공유)
+store = create_history_store()
+
+# 스크립트 응답 캐시 (SCRIPT_CACHE_ENABLED=1 일 때만 사용)
+# 프롬프트를 수정하면 SCRIPT_PROMPT_VERSION 을 올려 이전 캐시를 무효화하세요.
+SCRIPT_PROMPT_VERSION = "script-v2"
+script_cache = ResponseCache() if SCRIPT_CACHE_ENABLED else None
+
+# 비동기 LLM 호출용 공용 이벤트 루프와 모델별 동시 호출 제한 (LLM_ASYNC=1, LLM_MAX_CONCURRENCY)
+async_runner = AsyncLoopRunner()
+model_limiter = ModelLimiter()
+
+# 요청별 프롬프트 토큰 중 공급자 측 캐시에서 처리된 토큰 수 집계 (작업별: prompt_cache_tracker.stats())
+prompt_cache_tracker = PromptCacheTracker()
+# 작업별 첫 토큰 / 전체 응답 시간 (p50, p95: latency_tracker.stats())
+latency_tracker = LatencyTracker()
+# 호출별 기록을 JSONL 파일(LLM_CALL_LOG)과 Prometheus 지표(METRICS_PORT)로 내보냄
+telemetry_metrics = install_telemetry(latency_tracker)
+
+# ======================== 전역 프롬프트 ========================
+SYSTEM_PROMPT_SCRIPT = (
+    """
+    [상담 스크립트 출력 형식 - 반드시 아래 순서와 마크다운 제목 형식을 지켜주세요]
+    각 단계는 다음과 같이 출력하세요:
+    - `#### 1. 첫 인사 및 친근한 접근`
+    - `#### 2. 상담 목적 확인 및 공감 형성`
+    - `#### ✅ 2-1. 상담 목적 확인 – 고객 응대 버전`
+      - 아래 두 상황에 대한 멘트를 반드시 모두 출력하세요:
+        - `💬 [상황 A: 기억을 못함]` → 고객이 상담 신청이나 이유를 기억하지 못할 때 사용하는 멘트
+        - `💬 [상황 B: 바쁨 또는 거절]` → 고객이 지금 바쁘거나 '괜찮다'며 거절할 때 사용하는 멘트. 보장 내용을 카카오톡 메세지로 발송해준다는 내용으로 마무리.
+    - `#### 3. 기존 보험 체크 및 간단 분석`
+    - `#### 4. 새로운 보험 상품 설명`
+    - `#### 5. 맞춤 제안 및 고객 중심 상담`
+    - `#### 6. 가입 유도 및 부드러운 마무리`
+
+    [작성 스타일]
+    - 각 항목 제목은 반드시 마크다운 형식(`####`)으로 작성하고, 하단에 자연스럽게 말하듯 이어주세요.
+    - 고객 이름은 중간중간 자연스럽게 포함시켜 친근함을 표현해주세요.
+    - 문장은 실제 상담원이 전화로 말하듯 구어체로 작성해주세요. 번역투/딱딱한 표현은 피해주세요.
+    - 고객의 상황과 감정에 공감하는 표현을 포함해주세요. 현실적인 말투와 예시, 감정 표현이 중요합니다.
+    - 이모지(😊 🙇‍♀️ 👍 😅 등)는 너무 과하지 않게, 자연스럽게 사용해주세요.
+    - `2-1` 항목에서는 `💬 [상황 A: ...]`와 `💬 [상황 B: ...]`를 반드시 **모두 출력**해주세요.
+    - 전체 흐름이 자연스럽게 이어지도록 각 단계 사이를 부드럽게 연결해주세요.
+    - 마지막 단계는 선택이 부담스럽지 않도록 부드럽게 마무리하는 표현으로 작성해주세요. 그리고 상담 내용을 카카오톡 메세지로 발송해준다는 내용으로 스크랩트를 마무리해주세요.
+    
+    [연령대 및 성별 반영 지침]
+    - 고객의 연령대와 성별에 따라 상담 톤과 설명 포인트를 조절하세요.
+    - 예시
+    - 20~30대 고객: 부담을 줄이는 방향, 가벼운 보장, 실속형 상담을 강조하세요.
+    - 40~50대 고객: 가족 보호, 건강 관리의 중요성을 자연스럽게 언급하세요.
+    - 60대 이상 고객: 노후 대비, 간병, 치매 보장의 필요성을 공감하며 설명하세요.
+    - 남성 고객: 실용적이고 간결한 설명을 선호하므로, 핵심 보장을 중심으로 전달하세요.
+    - 여성 고객: 간병, 생활 속 위험 대비 등을 강조하며, 공감 표현을 조금 더 활용하세요.
+    - 단, 성별에 대한 고정관념은 피하고, 상담이 자연스럽고 친근하게 이어지도록 하세요.
+
+    [출력 목표]
+    상담 상황 입력을 바탕으로, 위 1~6단계 형식을 그대로 따르며,
+    현실적인 전화 상담 멘트로 구성된 스크립트를 생성하세요.
+    `2-1` 단계에서는 두 가지 상황(A, B)에 대해 각각 따로 쓸 수 있도록 **항상 두 버전을 모두 출력**하세요.
+    전체 멘트는 상담원이 바로 사용할 수 있을 만큼 자연스럽고 실용적이어야 합니다.
+    
+    **스크립트 출력 이후 상황에 맞는 핵심 팁**을 제시하세요.
+
+    [출력 형식 지침]
+    - 반드시 아래 형식을 따르세요:
+    📌 상담 TIP
+    ▶️ (간결하고 명확한 팁)
+    ▶️ (간결하고 명확한 팁)
+    ▶️ (간결하고 명확한 팁)
+
+    - 각 팁은 1~2문장으로 구체적으로 작성하세요.
+    - 너무 일반적인 조언이 아니라, **해당 상담 상황**에 맞는 팁을 제공하세요.
+    - 상담 멘트 활용법, 고객 대응 전략, 설득 스킬, 주의사항 등을 포함할 수 있습니다.
+    """
+)
+
+SYSTEM_PROMPT_CHATBOT = (
+    """
+    당신은 보험 전화 상담원을 지원하는 AI 어시스턴트입니다.
+    이미 생성된 상담 스크립트를 바탕으로, 상담원이 추가 질문이나 멘트 보완 요청을 하면
+    현현실적이고 실무에 도움이 되는 답변을 제공해야 합니다.
+
+    [역할]
+    - 상담원이 고객과의 대화를 더 잘 이끌어갈 수 있도록 보조합니다.
+    - 추가 멘트 제안, 고객 반응에 따른 대응 방법, 상담 흐름 조언 등을 제공합니다.
+    - 상담원이 요청할 경우, 지금까지 대화를 반영하여 새로운 상담 스크립트를 작성합니다.
+    - 보험 상품, 상담 기법, 대화 스킬 등 실무적인 팁을 알려줍니다.
+
+    [답변 지침]
+    1. 질문에 대해 구체적이고 상담원의 입장에 공감하며 답변해주세요.
+    2. 필요할 경우, 실제 상담에 활용할 수 있는 자연스러운 멘트를 예시로 제시하세요.
+    3. 상담원이 요청하면, 지금까지 대화 내용과 고객 정보를 반영하여 새로운 스크립트를 작성하세요.
+    4. 문장은 구어체로 작성하며, 친절하고 신뢰감 있는 톤을 유지하세요.
+    5. 고객의 입장을 공감하는 표현을 적절히 포함하세요.
+    6. 모호하거나 애매한 질문일 경우, 상담에서 활용할 수 있는 보완 멘트를 제안하세요.
+    7. 이모지는 자연스럽게 사용하되 과도하게 넣지 마세요.
+    8. 단순한 멘트 제시에 그치지 말고, 왜 그런 방식이 효과적인지 간단한 설명을 함께 덧붙여 상담사에게 실질적인 학습이 되도록 도와주세요.
+    9. 상담 흐름을 자연스럽게 이어가기 위한 전략(예: 질문 유도, 감정 리프레이밍 등)을 제시해 주세요.
+    
+    [형식 지침]
+    - 상담 멘트를 제시할 때는 다음 형식을 지켜주세요:
+    **👉 상담 멘트 예시**
+    > \"여기에 실제 상담에서 활용할 수 있는 자연스러운 멘트를 작성하세요.\"
+    - 멘트 앞에는 반드시 '**👉 상담 멘트 예시**' 라는 제목을 넣어 시각적으로 구분하세요.
+    - 멘트는 인용구 형태(`> `)로 작성해 주세요.
+    - 멘트 이후에는 간단한 활용 팁이나 주의사항을 덧붙이세요.
+
+    질문을 입력받으면 위 지침에 따라 현실적이고 실용적인 답변을 제공하세요.
+    """
+)
+
+# ======================== 모델 호출 ========================
+DEFAULT_MODEL = 'gpt-4.1-mini'
+
+# 모델별 클라이언트 / 연결 풀 (LLM_POOL_MAX_CONNECTIONS, LLM_CONNECT_TIMEOUT, LLM_READ_TIMEOUT, LLM_HTTP2)
+# 스트리밍 응답에서도 토큰 사용량(캐시된 프롬프트 토큰 포함)을 받도록 stream_usage 사용
+# 재시도는 ResilientLLM 에서 처리하므로 SDK 자체 재시도(max_retries)는 끔
+model_registry = ModelRegistry(callbacks=[prompt_cache_tracker, latency_tracker], max_retries=0)
+
+# 작업별 모델 / max_tokens / temperature (LLM_ROUTES, LLM_ROUTES_FILE 로 변경: llm_routing.py 참고)
+model_router = ModelRouter()
+
+def get_llm(model=DEFAULT_MODEL):
+    return model_registry.get(model)
+
+def get_task_llm(task):
+    # 라우팅 테이블에 따라 작업에 맞는 모델을 선택하고 호출 옵션을 고정
+    # 마감 시간 / 재시도 / 헤지 요청 / 서킷 브레이커 적용 (LLM_RETRY_MAX, LLM_HEDGE 등: llm_resilience.py 참고)
+    route = model_router.route(task)
+    llm = get_llm(route.model)
+    kwargs = route.bind_kwargs()
+    return ResilientLLM(llm.bind(**kwargs) if kwargs else llm, route.model, task, deadline=route.deadline, latency=latency_tracker)
+
+def llm_error_message(error, default):
+    # 서킷 브레이커 / 마감 시간 초과는 다시 시도하면 되는 상황임을 안내
+    if isinstance(error, CircuitOpenError):
+        return f"⚠️ AI 서버 응답이 불안정해 잠시 요청을 멈췄습니다. {LLM_BREAKER_RESET:.0f}초 정도 후 다시 시도해 주세요."
+    if isinstance(error, DeadlineExceeded):
+        return "⚠️ AI 응답이 너무 오래 걸려 요청을 중단했습니다. 다시 시도해 주세요."
+    return default
+
+# ======================== 스트리밍 ========================
+def session_config(session_id):
+    # 히스토리 조회용 configurable 과 함께 호출 기록(llm_telemetry)에 남길 세션 ID 를 metadata 로 전달
+    return {"configurable": {"session_id": session_id}, "metadata": {"session_id": session_id}}
+
+def stream_chain(chain, inputs, session_id, on_complete=None):
+    # chain.stream 이 토큰을 내보내는 즉시 전달 (히스토리는 스트림이 끝나면 RunnableWithMessageHistory 가 기록)
+    # on_complete 는 스트림이 오류 없이 끝났을 때 전체 텍스트로 호출 (예외는 호출한 쪽에서 처리)
+    chunks = []
+    for chunk in chain.stream(inputs, config=session_config(session_id)):
+        chunks.append(chunk)
+        yield chunk
+    if on_complete is not None:
+        on_complete("".join(chunks))
+
+async def astream_chain(chain, inputs, session_id, on_complete=None, model=DEFAULT_MODEL):
+    # 비동기 버전: 모델별 동시 호출 수 제한 안에서 chain.astream 결과를 전달 (예외는 호출한 쪽에서 처리)
+    async with model_limiter.acquire(model):
+        chunks = []
+        async for chunk in chain.astream(inputs, config=session_config(session_id)):
+            chunks.append(chunk)
+            yield chunk
+        if on_complete is not None:
+            on_complete("".join(chunks))
+
+# ======================== 세션 관리 ========================
+def get_session_history(session_id: str) -> BaseChatMessageHistory:
+    return store.get(session_id)
+
+# ======================== 랜덤 고객정보 생성 ========================
+CUSTOMER_PROFILE_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """
+    당신은 보험 영업을 위한 가상의 고객 정보를 생성하는 AI 어시스턴트입니다.
+    
+    [출력 지침]
+    보험 상담 고객 정보를 서로 겹치지 않게 랜덤 생성하세요:
+    - name (고객 이름): 자연스러운 한글 이름을 생성하세요.
+    - age_group (연령대): 20대, 30대, 40대, 50대, 60대, 70대 이상 중 하나
+    - gender (성별): 남성 또는 여성
+    - insurance_status (기존 보험 상태): 기존에 가입하거나 보유한 보험을 구체적으로 작성해주세요.
+    - interest (관심 보험): 가상의 고객이 관심을 갖고 있는 보험을 구체적으로 작성해주세요.
+    - reaction (고객 반응): 상황과 관련된 현재 고객의 주요 생각을 구체적으로 작성해주세요.
+    - etc (기타 상황): 현재 고객과 관련된 기타 상황을 구체적으로 작성해주세요.
+
+    출력은 반드시 다음 JSON 스키마를 따르는 JSON 객체 하나로만 해주세요:
+    {schema}
+    """),
+    ("human", "랜덤 고객 정보 {count}명을 생성해 주세요.")
+])
+
+CUSTOMER_PROFILE_REPAIR_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """
+    아래 JSON 출력이 스키마 검증에 실패했습니다. 오류 내용을 참고해 스키마에 맞는 JSON 객체 하나로만 다시 출력하세요.
+    값이 비어 있거나 허용되지 않은 값이면 자연스러운 값으로 채워 넣으세요.
+
+    [스키마]
+    {schema}
+    """),
+    ("human", "[출력]\n{output}\n\n[오류]\n{error}")
+])
+
+def generate_customer_profiles(count):
+    # JSON 모드로 count 명의 가상 고객 정보를 생성하고 스키마로 검증
+    # 검증에 실패하면 오류 내용을 전달해 한 번만 복구를 요청
+    llm = get_task_llm("customer_profile").bind(response_format={"type": "json_object"})
+    schema = json.dumps(CustomerProfileBatch.model_json_schema(), ensure_ascii=False)
+
+    config = {"metadata": {"task": "customer_profile"}}
+    output = (CUSTOMER_PROFILE_PROMPT | llm | StrOutputParser()).invoke({"count": count, "schema": schema}, config=config)
+    try:
+        profiles = parse_customer_profiles(output)
+        profile_parse_stats["parsed"] += 1
+        return profiles
+    except ValueError as e:
+        profile_parse_stats["parse_failures"] += 1
+        print("⚠️ 고객 프로필 파싱 실패, 복구 요청:", e)
+        error = str(e)
+
+    repaired = (CUSTOMER_PROFILE_REPAIR_PROMPT | llm | StrOutputParser()).invoke(
+        {"schema": schema, "output": output, "error": error}, config=config
+    )
+    try:
+        profiles = parse_customer_profiles(repaired)
+    except ValueError:
+        profile_parse_stats["repair_failures"] += 1
+        raise
+    profile_parse_stats["repaired"] += 1
+    return profiles
+
+# CUSTOMER_POOL_PATH 에 보관, CUSTOMER_POOL_LOW_WATER / CUSTOMER_POOL_TARGET / CUSTOMER_POOL_BATCH_SIZE 로 조정
+customer_pool = CustomerProfilePool(generate_customer_profiles)
+
+def get_random_customer_info():
+    # 미리 생성해 둔 프로필 풀에서 즉시 꺼내고, 부족해지면 백그라운드에서 보충
+    return customer_pool.pop()
+
+# ======================== 스크립트 생성 ========================
+def build_customer_info(name, age_group, gender, insurance_status, interest, reaction, etc):
+    return (
+        f"- 고객 이름: {name}\n"
+        f"- 연령대: {age_group}\n"
+        f"- 성별: {gender}\n"
+        f"- 기존 보험: {insurance_status}\n"
+        f"- 관심 보험: {interest}\n"
+        f"- 고객 반응: {reaction}\n"
+        f"- 기타 상황: {etc}"
+    )
+
+def build_script_cache_key(consultant_name, name, age_group, gender, insurance_status, interest, reaction, etc):
+    if script_cache is None:
+        return None
+    return make_cache_key(
+        {
+            "name": name,
+            "age_group": age_group,
+            "gender": gender,
+            "insurance_status": insurance_status,
+            "interest": interest,
+            "reaction": reaction,
+            "etc": etc,
+        },
+        consultant_name,
+        # 스크립트 모델을 바꾸면 이전 모델의 캐시는 사용하지 않음
+        f"{SCRIPT_PROMPT_VERSION}|{model_router.model_for('script')}"
+    )
+
+def get_cached_script(cache_key, session_id, customer_info):
+    # 동일한 고객 정보로 생성한 스크립트가 캐시에 있으면 히스토리에 기록 후 반환
+    # 적중한 호출도 호출 기록 / 지표에 남김 (cache_hit=True, 토큰 없음)
+    started = time.perf_counter()
+    cached_script = script_cache.get(cache_key)
+    if cached_script is not None:
+        print("⚡ [script-cache] hit", script_cache.stats())
+        get_session_history(session_id).add_messages([
+            HumanMessage(content=customer_info),
+            AIMessage(content=cached_script)
+        ])
+        latency_tracker.record_cache_hit("script", model_router.model_for("script"), session_id, time.perf_counter() - started)
+    return cached_script
+
+# 공급자 측 프롬프트 캐시(동일한 앞부분 재사용)를 위해 고정 지침을 앞에, 상담원 / 고객 정보를 뒤에 배치
+# 상담원 이름 / 고객 정보는 템플릿 변수로 전달 (프롬프트와 체인은 프로세스당 한 번만 생성)
+SCRIPT_SYSTEM_PROMPT = """
+    당신은 보험 민원 대응을 전문으로 하는 AI 상담 지원 도우미입니다.
+    상담원이 입력한 민원 상황과 고객 감정 상태를 바탕으로, 고객의 불만을 효과적으로 완화하고 신뢰를 줄 수 있는 **맞춤형 응대 스크립트**와 실무에 도움이 되는 **상담 TIP**을 함께 제공하세요.
+    실제 사람이 말하듯 자연스럽고 실용적인 멘트를 작성해야 하며, 상담원이 현장에서 그대로 사용할 수 있을 정도로 현실적이어야 합니다.
+    고객 이름과 상담원 이름을 혼동하지 말고, 반드시 각 정보에 맞게 사용하세요.
+    
+    ⚠️ 절대 지침
+    - 상담원 이름은 반드시 아래 [상담원 정보]의 이름만 사용하세요.
+    - 상담원 이름을 임의로 생성하거나 변경하지 마세요.
+    - 고객 이름은 반드시 [고객 정보]의 이름만 사용하세요.
+    - 다른 이름, 가상의 이름을 절대 생성하지 마세요.
+    - 스크립트의 시작 부분에서는 상담원이 본인의 이름을 말하며 밝게 인사하도록 작성하세요.
+    """ + SYSTEM_PROMPT_SCRIPT
+
+SCRIPT_CONTEXT_TEMPLATE = """
+    [상담원 정보]
+    - 상담원 이름: {consultant_name}
+    - 인사 예시: "안녕하세요, 저는 굿리치 상담사 **{consultant_name}**입니다!"
+
+    [고객 정보]
+    {customer_info}
+    """
+
+SCRIPT_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", SCRIPT_SYSTEM_PROMPT),
+    ("system", SCRIPT_CONTEXT_TEMPLATE),
+    MessagesPlaceholder("chat_history"),
+    ("human", "{customer_info}")
+])
+
+@lru_cache(maxsize=1)
+def get_script_chain():
+    return RunnableWithMessageHistory(
+        SCRIPT_PROMPT | get_task_llm("script") | StrOutputParser(),
+        get_session_history,
+        input_messages_key="customer_info",
+        history_messages_key="chat_history",
+    ).with_config(metadata={"task": "script"})
+
+def stream_script(name, age_group, gender, insurance_status, interest, reaction, etc,
+                  consultant_name, session_id, use_cache=True):
+    # 동기 버전: 동일한 고객 정보의 스크립트가 캐시에 있으면 바로 반환, 없으면 생성하며 스트리밍
+    customer_info = build_customer_info(name, age_group, gender, insurance_status, interest, reaction, etc)
+
+    cache_key = build_script_cache_key(
+        consultant_name, name, age_group, gender, insurance_status, interest, reaction, etc
+    )
+    if cache_key and use_cache:
+        cached_script = get_cached_script(cache_key, session_id, customer_info)
+        if cached_script is not None:
+            yield cached_script
+            return
+
+    yield from stream_chain(
+        get_script_chain(),
+        {"customer_info": customer_info, "consultant_name": consultant_name},
+        session_id,
+        on_complete=(lambda text: script_cache.set(cache_key, text)) if cache_key else None
+    )
+
+async def aget_script_response(name, age_group, gender, insurance_status, interest, reaction, etc,
+                               consultant_name, session_id, use_cache=True):
+    # 비동기 버전: 모델별 동시 호출 제한 안에서 생성
+    customer_info = build_customer_info(name, age_group, gender, insurance_status, interest, reaction, etc)
+
+    cache_key = build_script_cache_key(
+        consultant_name, name, age_group, gender, insurance_status, interest, reaction, etc
+    )
+    if cache_key and use_cache:
+        cached_script = get_cached_script(cache_key, session_id, customer_info)
+        if cached_script is not None:
+            yield cached_script
+            return
+
+    async for chunk in astream_chain(
+        get_script_chain(),
+        {"customer_info": customer_info, "consultant_name": consultant_name},
+        session_id,
+        on_complete=(lambda text: script_cache.set(cache_key, text)) if cache_key else None,
+        model=model_router.model_for("script")
+    ):
+        yield chunk
+
+# ======================== 대화 챗봇 ========================
+def trim_chat_history(inputs):
+    # 스크립트 중복 제거 + 토큰 예산에 맞춰 히스토리 축약 (요청별 프롬프트 토큰 기록)
+    script_context = inputs.get("script_context", "")
+    chat_history = inputs["chat_history"]
+    trimmed = trim_history(chat_history, script_context)
+
+    fixed_tokens = count_tokens(SYSTEM_PROMPT_CHATBOT) + count_tokens(script_context) + count_tokens(inputs["input"])
+    before = fixed_tokens + count_message_tokens(chat_history)
+    after = fixed_tokens + count_message_tokens(trimmed)
+    print(f"📏 [chat] 프롬프트 토큰 {before} → {after} (히스토리 메시지 {len(chat_history)} → {len(trimmed)})")
+    return trimmed
+
+CHATBOT_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", SYSTEM_PROMPT_CHATBOT),
+    ("system", "[현재 상담 스크립트 요약]\n{script_context}"),
+    MessagesPlaceholder("chat_history"),
+    ("human", "{input}")
+])
+
+@lru_cache(maxsize=1)
+def get_chatbot_chain():
+    # 스크립트는 프롬프트 변수로만 전달하고, 히스토리에는 질문만 기록
+    return RunnableWithMessageHistory(
+        RunnablePassthrough.assign(chat_history=trim_chat_history) | CHATBOT_PROMPT | get_task_llm("chat") | StrOutputParser(),
+        get_session_history,
+        input_messages_key="input",
+        history_messages_key="chat_history",
+    ).with_config(metadata={"task": "chat"})
+
+def stream_chatbot(user_message, script_context="", session_id=None):
+    return stream_chain(
+        get_chatbot_chain(),
+        {"input": user_message, "script_context": script_context},
+        session_id
+    )
+
+async def aget_chatbot_response(user_message, script_context="", session_id=None):
+    async for chunk in astream_chain(
+        get_chatbot_chain(),
+        {"input": user_message, "script_context": script_context},
+        session_id,
+        model=model_router.model_for("chat")
+    ):
+        yield chunk
+
+# ======================== 카카오톡 문자 발송 ========================
+def generate_conversation_summary(message_list):
+    summary_points = []
+    for message in message_list:
+        if message['role'] == 'user':
+            summary_points.append(f"- 상담원 요청: {message['content']}")
+        elif message['role'] == 'ai' and "👉 상담 멘트 예시" in message['content']:
+            lines = message['content'].split('\n')
+            for line in lines:
+                if line.startswith("> "):
+                    summary_points.append(f"- 제안 멘트: {line[2:]}")
+    return "\n".join(summary_points)
+    
+KAKAO_SYSTEM_PROMPT = """
+        ⚠️ 반드시 아래 [상담 요약]과 [추가 대화 요약] 내용을 반영하여 고객 발송용 카카오톡 메시지를 작성하세요.
+        
+        - 당신은 보험 상담 후 고객에게 발송할 카카오톡 메시지를 작성하는 상담사입니다.
+        - 상담 내용을 바탕으로 고객 성향에 맞게 다음 [출력 형식]과 [작성 지침]에 따라 총 **3가지 유형**의 메시지를 작성하세요.
+
+        "[출력 형식]\n"
+        "각 메시지는 아래 제목과 형식을 반드시 지켜 작성하세요.\n\n"
+
+        "### 1️⃣ 전문성 강조형\n"
+        "(보험 전문가로서 핵심 보장 내용과 필요한 이유를 논리적으로 전달하는 메시지)\n\n"
+
+        "### 2️⃣ 감성형\n"
+        "(따뜻하고 배려 있는 말투로, 고객의 마음을 편안하게 해주는 메시지)\n\n"
+
+        "### 3️⃣ 실제 사례형\n"
+        "(실제 보험금 지급 사례나 주변 사례를 언급하며 필요성을 자연스럽게 강조하는 메시지)\n\n"
+        
+        [작성 지침]            
+        1. 각 메시지는 **15줄 내외**로 작성하세요.
+        2. 문장은 반드시 **문장 단위로 줄바꿈**하여 가독성을 높이세요.
+        2-1. 한 문장이 너무 길어져도 **적절하게 줄바꿈**하여 가독성을 높이세요.
+        2-2. 내용이 바뀌는 문단은 반드시 **두 번 줄바꿈**하여 가독성을 높이세요.
+        3. 고객 이름을 자연스럽게 포함하고, 상황에 맞는 맞춤형 표현을 사용하세요.
+        4. 문장은 정중하면서도 부담 없는 톤으로 작성하세요.
+        5. 상담한 보험의 구체적인 내용(예: 치매보험의 주요 보장, 간병보험의 활용 사례 등)을 간단히 언급하세요.
+        6. 고객이 이해하기 쉽게, 너무 추상적인 표현은 피하고 **실질적인 도움이 되는 설명**을 포함하세요.
+        7. 상담한 보험 종류, 보완이 필요한 내용, 고객이 관심을 보인 내용용 등을 반영하세요.
+        8. 가입을 강요하지 말고, '편하게 문의 주세요'와 같은 표현으로 마무리하세요.
+        9. 이모지는 과하지 않게 사용해주세요.
+    """
+
+KAKAO_CONTEXT_TEMPLATE = "[상담 요약]\n{script_context}\n\n[추가 대화 요약]\n{conversation_summary}"
+
+KAKAO_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", KAKAO_SYSTEM_PROMPT),
+    ("system", KAKAO_CONTEXT_TEMPLATE),
+    MessagesPlaceholder("chat_history"),
+    ("human", "{input}")
+])
+
+@lru_cache(maxsize=1)
+def get_kakao_chain():
+    # 상담 요약 / 추가 대화 요약은 템플릿 변수(script_context, conversation_summary)로 전달
+    return RunnableWithMessageHistory(
+        KAKAO_PROMPT | get_task_llm("kakao") | StrOutputParser(),
+        get_session_history,
+        input_messages_key="input",
+        history_messages_key="chat_history",
+    ).with_config(metadata={"task": "kakao"})
+
+def build_kakao_inputs(script_context, message_list):
+    return {
+        "input": "카카오톡 메시지를 생성해 주세요.",
+        "script_context": script_context,
+        "conversation_summary": generate_conversation_summary(message_list),
+    }
+
+def stream_kakao(script_context, message_list, session_id=None):
+    # 카카오톡 메시지 히스토리는 상담 세션과 분리된 "{session_id}_kakao" 세션에 기록
+    return stream_chain(
+        get_kakao_chain(),
+        build_kakao_inputs(script_context, message_list),
+        f"{session_id}_kakao"
+    )
+
+async def aget_kakao_response(script_context, message_list, session_id=None):
+    async for chunk in astream_chain(
+        get_kakao_chain(),
+        build_kakao_inputs(script_context, message_list),
+        f"{session_id}_kakao",
+        model=model_router.model_for("kakao")
+    ):
+        yield chunk
+
+# ======================== 카카오톡 문자 병렬 생성 ========================
+KAKAO_VARIANTS = [
+    ("1️⃣ 전문성 강조형", "보험 전문가로서 핵심 보장 내용과 필요한 이유를 논리적으로 전달하는 메시지"),
+    ("2️⃣ 감성형", "따뜻하고 배려 있는 말투로, 고객의 마음을 편안하게 해주는 메시지"),
+    ("3️⃣ 실제 사례형", "실제 보험금 지급 사례나 주변 사례를 언급하며 필요성을 자연스럽게 강조하는 메시지"),
+]
+
+KAKAO_VARIANT_GUIDE = """
+    - 당신은 보험 상담 후 고객에게 발송할 카카오톡 메시지를 작성하는 상담사입니다.
+    - 아래 [상담 요약]과 [추가 대화 요약] 내용을 반영하여, 요청받은 **한 가지 유형**의 메시지만 작성하세요.
+    - 제목(### ...)은 쓰지 말고 메시지 본문만 작성하세요.
+
+    [작성 지침]
+    1. 메시지는 **15줄 내외**로 작성하세요.
+    2. 문장은 반드시 **문장 단위로 줄바꿈**하여 가독성을 높이세요.
+    2-1. 한 문장이 너무 길어져도 **적절하게 줄바꿈**하여 가독성을 높이세요.
+    2-2. 내용이 바뀌는 문단은 반드시 **두 번 줄바꿈**하여 가독성을 높이세요.
+    3. 고객 이름을 자연스럽게 포함하고, 상황에 맞는 맞춤형 표현을 사용하세요.
+    4. 문장은 정중하면서도 부담 없는 톤으로 작성하세요.
+    5. 상담한 보험의 구체적인 내용(예: 치매보험의 주요 보장, 간병보험의 활용 사례 등)을 간단히 언급하세요.
+    6. 고객이 이해하기 쉽게, 너무 추상적인 표현은 피하고 **실질적인 도움이 되는 설명**을 포함하세요.
+    7. 상담한 보험 종류, 보완이 필요한 내용, 고객이 관심을 보인 내용 등을 반영하세요.
+    8. 가입을 강요하지 말고, '편하게 문의 주세요'와 같은 표현으로 마무리하세요.
+    9. 이모지는 과하지 않게 사용해주세요.
+"""
+
+KAKAO_VARIANT_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", KAKAO_VARIANT_GUIDE),
+    ("system", KAKAO_CONTEXT_TEMPLATE),
+    ("human", "### {title}\n({description})\n\n위 유형의 카카오톡 메시지를 작성해 주세요.")
+])
+
+@lru_cache(maxsize=1)
+def get_kakao_variant_chain():
+    # 세 유형이 모두 같은 system 메시지(작성 지침 + 상담 요약)를 공유하고, 유형 지시만 human 메시지로 전달
+    return (KAKAO_VARIANT_PROMPT | get_task_llm("kakao_variant") | StrOutputParser()).with_config(metadata={"task": "kakao_variant"})
+
+def assemble_kakao_variants(texts):
+    return "\n\n".join(
+        f"### {title}\n{text.strip()}" for (title, _), text in zip(KAKAO_VARIANTS, texts)
+    )
+
+async def astream_kakao_variants(script_context, message_list, session_id=None):
+    # 세 유형을 동시에 요청하고, 도착하는 순서대로 (유형 번호, 텍스트 조각)을 전달
+    # 모두 완료되면 순서대로 합친 메시지를 카카오톡 세션 히스토리에 기록
+    chain = get_kakao_variant_chain()
+    shared_inputs = {
+        "script_context": script_context,
+        "conversation_summary": generate_conversation_summary(message_list),
+    }
+
+    async def variant_stream(title, description):
+        async with model_limiter.acquire(model_router.model_for("kakao_variant")):
+            async for chunk in chain.astream(
+                {**shared_inputs, "title": title, "description": description},
+                config={"metadata": {"session_id": f"{session_id}_kakao"}}
+            ):
+                yield chunk
+
+    texts = [""] * len(KAKAO_VARIANTS)
+    async for index, chunk in merge_async_streams(
+        [variant_stream(title, description) for title, description in KAKAO_VARIANTS]
+    ):
+        texts[index] += chunk
+        yield index, chunk
+
+    get_session_history(f"{session_id}_kakao").add_messages([
+        HumanMessage(content="카카오톡 메시지를 생성해 주세요."),
+        AIMessage(content=assemble_kakao_variants(texts))
+    ])